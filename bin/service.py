@@ -1,10 +1,177 @@
 # -*- coding: UTF-8 -*-
 # **********************************************************************************#
-#     File:
+#     File: Service entry: development server, or prefork workers with cooperative I/O.
 # **********************************************************************************#
 import sys
-from lib.web import server
+import time
+import signal
+import argparse
+import threading
+from multiprocessing import Process
+from lib.configs import (
+    logger,
+    server_port,
+    server_workers,
+    server_worker_class,
+    server_worker_connections,
+    server_timeout
+)
+
+
+BACKGROUND_RESTART_DELAY = 5
+# handlers of the gunicorn master only queue these signals for its arbiter loop, which never runs in a child
+MASTER_SIGNALS = [signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGQUIT, signal.SIGCHLD]
+
+
+def run_development_server(port=server_port):
+    """
+    Flask built-in server, threaded in one process.
+    """
+    from lib.web import server, start_background_workers
+    start_background_workers()
+    server.run(host='0.0.0.0', debug=False, threaded=True, port=port)
+
+
+def _reset_master_signals():
+    for signal_number in MASTER_SIGNALS:
+        signal.signal(signal_number, signal.SIG_DFL)
+
+
+def run_background_workers():
+    """
+    Feedback and database workers of prefork serving, in their own process, returning once all of them exit.
+    """
+    _reset_master_signals()
+    from lib.web import start_background_workers
+    start_background_workers()
+    # a process started by multiprocessing exits as soon as its target returns, taking worker threads with it
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread() and not thread.daemon:
+            thread.join()
+
+
+def supervise_background_workers(restart_delay=BACKGROUND_RESTART_DELAY):
+    """
+    Run background workers in a child process, restarted whenever it exits, until the supervisor is stopped
+    by SIGTERM, SIGINT or SIGQUIT, which also terminates the child.
+
+    Args:
+        restart_delay(float): seconds before restarting exited background workers
+    """
+    _reset_master_signals()
+
+    def _stop(signal_number, frame):
+        # exiting terminates the daemonic child
+        raise SystemExit(0)
+
+    for signal_number in (signal.SIGTERM, signal.SIGINT, signal.SIGQUIT):
+        signal.signal(signal_number, _stop)
+    while True:
+        process = Process(target=run_background_workers, name='background-workers')
+        process.daemon = True
+        process.start()
+        process.join()
+        logger.error('[SERVICE] background workers exited with code {}, restarting in {} seconds.'.format(
+            process.exitcode, restart_delay))
+        time.sleep(restart_delay)
+
+
+def prefork_options(port=server_port, workers=server_workers, worker_class=server_worker_class,
+                    worker_connections=server_worker_connections, timeout=server_timeout):
+    """
+    Gunicorn options of prefork serving.
+
+    The application is not preloaded: every worker imports lib.web after fork, so PMS singletons, event engines
+    and connections are built inside the worker and never inherited from the master. Background workers run once,
+    under a supervisor process started by the master when it is ready, so that the master forks workers without
+    any thread running. The supervisor resets the signal handlers inherited from the master, restarts background
+    workers when they exit, and is terminated by the master on exit. Connections a worker may still inherit are
+    dropped after fork.
+
+    Args:
+        port(int): port
+        workers(int): worker processes
+        worker_class(string): gunicorn worker class, 'gevent' for cooperative I/O in each worker
+        worker_connections(int): concurrent greenlets of each gevent worker
+        timeout(int): seconds before a silent worker is restarted
+
+    Returns:
+        dict: gunicorn options
+    """
+    supervisors = list()
+
+    def _when_ready(arbiter):
+        # not daemonic, as daemonic processes may not start the background workers as children
+        supervisor = Process(target=supervise_background_workers, name='background-supervisor')
+        supervisor.start()
+        supervisors.append(supervisor)
+
+    def _on_exit(arbiter):
+        for supervisor in supervisors:
+            supervisor.terminate()
+            supervisor.join(timeout)
+
+    def _post_fork(arbiter, worker):
+        from lib.data.connections import connections
+        connections.reset()
+
+    return {
+        'bind': '0.0.0.0:{}'.format(port),
+        'workers': workers,
+        'worker_class': worker_class,
+        'worker_connections': worker_connections,
+        'timeout': timeout,
+        'preload_app': False,
+        'when_ready': _when_ready,
+        'post_fork': _post_fork,
+        'on_exit': _on_exit,
+    }
+
+
+def run_prefork_server(**options):
+    """
+    Prefork serving by gunicorn workers, see prefork_options.
+    """
+    from gunicorn.app.base import BaseApplication
+
+    class PreforkApplication(BaseApplication):
+
+        def __init__(self, gunicorn_options):
+            self.gunicorn_options = gunicorn_options
+            super(PreforkApplication, self).__init__()
+
+        def load_config(self):
+            for key, value in self.gunicorn_options.iteritems():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from lib.web import server
+            return server
+
+    # order id nodes of a node base are allocated from shared memory created with the order id generator, which
+    # has to exist in the master so that every worker forked from it claims its own node
+    from lib.trade.order import Order
+    Order.get_id_generator()
+    gunicorn_options = prefork_options(**options)
+    logger.info('[SERVICE] prefork serving on {bind} with {workers} {worker_class} workers.'.format(**gunicorn_options))
+    PreforkApplication(gunicorn_options).run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='metadeal service')
+    parser.add_argument('--prefork', action='store_true', help='serve by prefork workers instead of the dev server')
+    parser.add_argument('--port', type=int, default=server_port)
+    parser.add_argument('--workers', type=int, default=server_workers)
+    parser.add_argument('--worker-class', default=server_worker_class)
+    parser.add_argument('--worker-connections', type=int, default=server_worker_connections)
+    parser.add_argument('--timeout', type=int, default=server_timeout)
+    args = parser.parse_args(argv)
+    if args.prefork:
+        run_prefork_server(port=args.port, workers=args.workers, worker_class=args.worker_class,
+                           worker_connections=args.worker_connections, timeout=args.timeout)
+    else:
+        run_development_server(port=args.port)
 
 
 if __name__ == "__main__":
-    server.run(host='0.0.0.0', debug=False, threaded=True, port=8888)
+    main(sys.argv[1:])
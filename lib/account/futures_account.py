@@ -20,7 +20,7 @@ class FuturesAccount(BaseAccount):
                                              account_id=account_id)
         self.account_type = 'futures'
 
-    def order(self, symbol, amount, direction=None, offset_flag="open", order_type="market", price=0.):
+    def order(self, symbol, amount, direction=None, offset_flag="open", order_type="market", price=0., tick=None):
         """
         Order.
 
@@ -31,6 +31,7 @@ class FuturesAccount(BaseAccount):
             offset_flag(str): optional, 'open' --> open， 'close' --> close
             order_type(str): optional, 'market' --> market price， 'limit' --> limit price
             price(float): optional, limit price definition
+            tick(Tick): optional, tick triggering the order, whose received time is carried by the order
         """
         direction_offset_map = {
             ('long', 'open'): ('buy', 'open'),
@@ -57,7 +58,7 @@ class FuturesAccount(BaseAccount):
         order_type = 'limit' if price else order_type
         order = Order(symbol=symbol, order_amount=amount, offset_flag=offset_flag, order_type=order_type,
                       price=price, direction=direction_map.get(direction, 1), order_time=order_time,
-                      state=OrderState.ORDER_SUBMITTED)
+                      state=OrderState.ORDER_SUBMITTED, tick_time=getattr(tick, 'received_time', None))
         self.submitted_orders.append(order)
         return order.order_id
 
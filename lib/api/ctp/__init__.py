@@ -1,8 +1,13 @@
 # encoding: UTF-8
 
+from importlib import import_module
+from utils.dict import LazyDict
 from vnctpmd import MdApi
 from vnctptd import TdApi
-from ctp_data_type import defineDict
+
+
+# the generated data type module defines thousands of entries, import it on first lookup only
+defineDict = LazyDict(lambda: import_module('.ctp_data_type', __name__).defineDict)
 
 
 __all__ = [
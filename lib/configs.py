@@ -29,6 +29,9 @@ logger = logging.getLogger("main")
 ################################################################
 redis_host = config.get('redis', 'host')
 redis_port = int(config.get('redis', 'port'))
+redis_max_connections = int(config.get('redis', 'max_connections'))
+redis_socket_timeout = float(config.get('redis', 'socket_timeout'))
+redis_pool_timeout = float(config.get('redis', 'pool_timeout'))
 
 
 ################################################################
@@ -42,6 +45,13 @@ mongodb_db_name = config.get('mongodb', 'db_name')
 mongodb_authenticate = config.get('mongodb', 'authenticate') == '1'
 mongodb_username = config.get('mongodb', 'username')
 mongodb_password = config.get('mongodb', 'password')
+mongodb_max_pool_size = int(config.get('mongodb', 'max_pool_size'))
+
+
+################################################################
+# Connections
+################################################################
+connection_health_check_interval = float(config.get('connections', 'health_check_interval'))
 
 
 ################################################################
@@ -57,6 +67,36 @@ feedback_worker_enable = config.get('workers', 'feedback_worker_enable')
 database_worker_enable = config.get('workers', 'database_worker_enable')
 
 
+################################################################
+# Server
+################################################################
+server_port = int(config.get('server', 'port'))
+server_workers = int(config.get('server', 'workers'))
+server_worker_class = config.get('server', 'worker_class')
+server_worker_connections = int(config.get('server', 'worker_connections'))
+server_timeout = int(config.get('server', 'timeout'))
+
+
+################################################################
+# Settlement
+################################################################
+settlement_shards = int(config.get('settlement', 'shards'))
+settlement_mode = config.get('settlement', 'mode')
+
+
+################################################################
+# Tracing
+################################################################
+tracing_enable = config.get('tracing', 'enable') == '1'
+tracing_dump_interval = float(config.get('tracing', 'dump_interval'))
+
+
+################################################################
+# Metrics
+################################################################
+metrics_trading_port = int(config.get('metrics', 'trading_port') or 0) or None
+
+
 ################################################################
 # Working time
 ################################################################
@@ -76,12 +116,27 @@ __all__ = [
     'logger',
     'redis_host',
     'redis_port',
+    'redis_max_connections',
+    'redis_socket_timeout',
+    'redis_pool_timeout',
     'mongodb_host',
     'mongodb_port',
     'mongodb_path',
+    'mongodb_max_pool_size',
+    'connection_health_check_interval',
     'api_token',
     'feedback_worker_enable',
     'database_worker_enable',
+    'server_port',
+    'server_workers',
+    'server_worker_class',
+    'server_worker_connections',
+    'server_timeout',
+    'settlement_shards',
+    'settlement_mode',
+    'tracing_enable',
+    'tracing_dump_interval',
+    'metrics_trading_port',
     'futures_pre_trading_task_time',
     'futures_post_trading_task_time',
     'futures_market_close_time',
@@ -87,7 +87,32 @@ class Context(object):
 
     def history(self, symbol='all', attribute='closePrice', time_range=1, freq='d', style='sat', rtype='frame',
                 f_adj=None, s_adj='pre_adj', **options):
-        raise NotImplementedError
+        """
+        历史行情：日线截止前一交易日，分钟线截止当前分钟，直接取自MarketRoller缓存
+
+        Args:
+            symbol(str or list): 'all' or symbol list
+            attribute(str or list): 字段
+            time_range(int): 窗口长度
+            freq(str): 'd', 'm' or multiple frequency such as '5m'
+            style(str): 'sat', 'ast', or 'tas' for daily history
+            rtype(str): 'array'(dict of array views) or 'frame'(dict of DataFrame, built on first access)
+            f_adj(str): 期货复权类型
+            s_adj(str): 股票复权类型
+
+        Returns:
+            dict: 格式视style与rtype参数输入
+        """
+        if symbol == 'all':
+            symbols = None
+        else:
+            symbols = [symbol] if isinstance(symbol, basestring) else list(symbol)
+        fields = [attribute] if isinstance(attribute, basestring) else list(attribute)
+        if freq == 'd':
+            return self.market_roller.daily_history(symbols, fields, self.previous_date, time_range,
+                                                    style=style, rtype=rtype, f_adj=f_adj, s_adj=s_adj)
+        return self.market_roller.minute_history(symbols, fields, self.current_date, self.current_minute,
+                                                 time_range, freq=freq, style=style, rtype=rtype)
 
     def get_universe(self, asset_type=AssetType.DIGITAL_CURRENCY, exclude_halt=False, with_position=False):
         if isinstance(asset_type, basestring):
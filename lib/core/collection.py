@@ -11,10 +11,10 @@ class MongodbCollections(object):
     """
     Mongodb Collections
     """
-    portfolio = mongodb_database['portfolio']
-    order = mongodb_database['order']
-    position = mongodb_database['position']
-    trade = mongodb_database['trade']
+    portfolio = mongodb_collection('portfolio')
+    order = mongodb_collection('order')
+    position = mongodb_collection('position')
+    trade = mongodb_collection('trade')
 
 
 class RedisCollections(object):
@@ -2,33 +2,88 @@
 # **********************************************************************************#
 #     File:
 # **********************************************************************************#
+from string import Template
 from utils.coding import (
     hump_to_underline
 )
 from . objects import ValueObject
 
 
+_CTP_DECODERS = dict()
+CTP_DECODER_TEMPLATE = Template("""def decode(item, obj=None):
+    if obj is None:
+        obj = new(cls)
+${assignments}
+    return obj
+""")
+
+
+def compile_ctp_decoder(object_class, ctp_fields, aliases=None):
+    """
+    Compile a specialized decoder for a ctp struct, which assigns every slot of object_class
+    straight from the ctp item without any per-field string transform.
+
+    Args:
+        object_class(class): CTPObject sub class
+        ctp_fields(iterable): ctp field names of the struct
+        aliases(dict): ctp field name --> slot name, for fields not following hump convention
+
+    Returns:
+        func: decode(item, obj=None) --> obj
+    """
+    aliases = aliases or dict()
+    slot_to_field = dict()
+    for field in ctp_fields:
+        slot = aliases.get(field) or hump_to_underline(field)
+        if slot not in object_class.__slots__:
+            raise AttributeError('{} has no attribute {} for ctp field {}.'.format(
+                object_class.__name__, slot, field))
+        slot_to_field[slot] = field
+    assignments = '\n'.join(
+        ['    obj.{} = item.get({!r})'.format(slot, slot_to_field[slot])
+         if slot in slot_to_field else '    obj.{} = None'.format(slot)
+         for slot in object_class.__slots__])
+    namespace = {'new': object.__new__, 'cls': object_class}
+    exec(CTP_DECODER_TEMPLATE.substitute(assignments=assignments), namespace)
+    return namespace['decode']
+
+
 class CTPObject(ValueObject):
 
+    __ctp_aliases__ = {}
+    # field names of the ctp struct, in the order of ThostFtdcUserApiStruct.h
+    __ctp_fields__ = []
+
     @classmethod
-    def from_ctp(cls, item):
+    def from_ctp(cls, item, obj=None):
         """
         Generate from ctp.
 
         Args:
             item(dict): ctp item data
+            obj(CTPObject): optional pre-allocated instance to be filled in place
 
         Returns:
             obj: instance
         """
-        underline_item = {
-            hump_to_underline(key): value for key, value in item.iteritems()
-        }
-        return cls(**underline_item)
+        decoder = _CTP_DECODERS.get(cls)
+        if decoder is None:
+            decoder = _CTP_DECODERS[cls] = compile_ctp_decoder(
+                cls, cls.__ctp_fields__, aliases=cls.__ctp_aliases__)
+        return decoder(item, obj)
 
 
 class Tick(CTPObject):
 
+    __ctp_aliases__ = {'UpdateMillisec': 'update_millisecond'}
+    __ctp_fields__ = [
+        'TradingDay', 'InstrumentID', 'ExchangeID', 'ExchangeInstID', 'LastPrice', 'PreSettlementPrice',
+        'PreClosePrice', 'PreOpenInterest', 'OpenPrice', 'HighestPrice', 'LowestPrice', 'Volume', 'Turnover',
+        'OpenInterest', 'ClosePrice', 'SettlementPrice', 'UpperLimitPrice', 'LowerLimitPrice', 'PreDelta', 'CurrDelta',
+        'UpdateTime', 'UpdateMillisec', 'BidPrice1', 'BidVolume1', 'AskPrice1', 'AskVolume1', 'BidPrice2', 'BidVolume2',
+        'AskPrice2', 'AskVolume2', 'BidPrice3', 'BidVolume3', 'AskPrice3', 'AskVolume3', 'BidPrice4', 'BidVolume4',
+        'AskPrice4', 'AskVolume4', 'BidPrice5', 'BidVolume5', 'AskPrice5', 'AskVolume5', 'AveragePrice', 'ActionDay'
+    ]
     __slots__ = [
         'bid_price3',
         'bid_price2',
@@ -74,6 +129,8 @@ class Tick(CTPObject):
         'instrument_id',
         'exchange_inst_id',
         'turnover',
+        # not a ctp field: local time the tick is received, carried by the orders it triggers
+        'received_time',
     ]
 
     def __init__(self, bid_price3=None, bid_price2=None, bid_price1=None, pre_delta=None,
@@ -88,7 +145,7 @@ class Tick(CTPObject):
                  ask_price3=None, ask_price2=None, open_price=None, ask_price4=None,
                  close_price=None, trading_day=None, volume=None, average_price=None,
                  settlement_price=None, ask_price5=None, instrument_id=None,
-                 exchange_inst_id=None, turnover=None):
+                 exchange_inst_id=None, turnover=None, received_time=None):
         self.bid_price3 = bid_price3
         self.bid_price2 = bid_price2
         self.bid_price1 = bid_price1
@@ -133,27 +190,22 @@ class Tick(CTPObject):
         self.instrument_id = instrument_id
         self.exchange_inst_id = exchange_inst_id
         self.turnover = turnover
+        self.received_time = received_time
 
-    @classmethod
-    def from_ctp(cls, item):
-        """
-        Generate from ctp.
-
-        Args:
-            item(dict): ctp tick data
-
-        Returns:
-            obj: Tick instance
-        """
-        item['update_millisecond'] = item.pop('UpdateMillisec')
-        underline_item = {
-            hump_to_underline(key): value for key, value in item.iteritems()
-        }
-        return cls(**underline_item)
 
 
 class AccountResponse(CTPObject):
 
+    __ctp_fields__ = [
+        'BrokerID', 'AccountID', 'PreMortgage', 'PreCredit', 'PreDeposit', 'PreBalance', 'PreMargin', 'InterestBase',
+        'Interest', 'Deposit', 'Withdraw', 'FrozenMargin', 'FrozenCash', 'FrozenCommission', 'CurrMargin', 'CashIn',
+        'Commission', 'CloseProfit', 'PositionProfit', 'Balance', 'Available', 'WithdrawQuota', 'Reserve', 'TradingDay',
+        'SettlementID', 'Credit', 'Mortgage', 'ExchangeMargin', 'DeliveryMargin', 'ExchangeDeliveryMargin',
+        'ReserveBalance', 'CurrencyID', 'PreFundMortgageIn', 'PreFundMortgageOut', 'FundMortgageIn', 'FundMortgageOut',
+        'FundMortgageAvailable', 'MortgageableFund', 'SpecProductMargin', 'SpecProductFrozenMargin',
+        'SpecProductCommission', 'SpecProductFrozenCommission', 'SpecProductPositionProfit', 'SpecProductCloseProfit',
+        'SpecProductPositionProfitByAlg', 'SpecProductExchangeMargin', 'BizType'
+    ]
     __slots__ = [
         'spec_product_position_profit_by_alg',
         'pre_fund_mortgage_out',
@@ -272,6 +324,12 @@ class AccountResponse(CTPObject):
 
 class TradeResponse(CTPObject):
 
+    __ctp_fields__ = [
+        'BrokerID', 'InvestorID', 'InstrumentID', 'OrderRef', 'UserID', 'ExchangeID', 'TradeID', 'Direction',
+        'OrderSysID', 'ParticipantID', 'ClientID', 'TradingRole', 'ExchangeInstID', 'OffsetFlag', 'HedgeFlag', 'Price',
+        'Volume', 'TradeDate', 'TradeTime', 'TradeType', 'PriceSource', 'TraderID', 'OrderLocalID', 'ClearingPartID',
+        'BusinessUnit', 'SequenceNo', 'TradingDay', 'SettlementID', 'BrokerOrderSeq', 'TradeSource'
+    ]
     __slots__ = [
         'instrument_id',
         'trader_id',
@@ -345,8 +403,159 @@ class TradeResponse(CTPObject):
         self.settlement_id = settlement_id
 
 
+class OrderResponse(CTPObject):
+
+    __ctp_aliases__ = {'GTDDate': 'gtd_date', 'ZCETotalTradedVolume': 'zce_total_traded_volume'}
+    __ctp_fields__ = [
+        'BrokerID', 'InvestorID', 'InstrumentID', 'OrderRef', 'UserID', 'OrderPriceType', 'Direction', 'CombOffsetFlag',
+        'CombHedgeFlag', 'LimitPrice', 'VolumeTotalOriginal', 'TimeCondition', 'GTDDate', 'VolumeCondition',
+        'MinVolume', 'ContingentCondition', 'StopPrice', 'ForceCloseReason', 'IsAutoSuspend', 'BusinessUnit',
+        'RequestID', 'OrderLocalID', 'ExchangeID', 'ParticipantID', 'ClientID', 'ExchangeInstID', 'TraderID',
+        'InstallID', 'OrderSubmitStatus', 'NotifySequence', 'TradingDay', 'SettlementID', 'OrderSysID', 'OrderSource',
+        'OrderStatus', 'OrderType', 'VolumeTraded', 'VolumeTotal', 'InsertDate', 'InsertTime', 'ActiveTime',
+        'SuspendTime', 'UpdateTime', 'CancelTime', 'ActiveTraderID', 'ClearingPartID', 'SequenceNo', 'FrontID',
+        'SessionID', 'UserProductInfo', 'StatusMsg', 'UserForceClose', 'ActiveUserID', 'BrokerOrderSeq',
+        'RelativeOrderSysID', 'ZCETotalTradedVolume', 'IsSwapOrder', 'BranchID'
+    ]
+    __slots__ = [
+        'broker_id',
+        'investor_id',
+        'instrument_id',
+        'order_ref',
+        'user_id',
+        'order_price_type',
+        'direction',
+        'comb_offset_flag',
+        'comb_hedge_flag',
+        'limit_price',
+        'volume_total_original',
+        'time_condition',
+        'gtd_date',
+        'volume_condition',
+        'min_volume',
+        'contingent_condition',
+        'stop_price',
+        'force_close_reason',
+        'is_auto_suspend',
+        'business_unit',
+        'request_id',
+        'order_local_id',
+        'exchange_id',
+        'participant_id',
+        'client_id',
+        'exchange_inst_id',
+        'trader_id',
+        'install_id',
+        'order_submit_status',
+        'notify_sequence',
+        'trading_day',
+        'settlement_id',
+        'order_sys_id',
+        'order_source',
+        'order_status',
+        'order_type',
+        'volume_traded',
+        'volume_total',
+        'insert_date',
+        'insert_time',
+        'active_time',
+        'suspend_time',
+        'update_time',
+        'cancel_time',
+        'active_trader_id',
+        'clearing_part_id',
+        'sequence_no',
+        'front_id',
+        'session_id',
+        'user_product_info',
+        'status_msg',
+        'user_force_close',
+        'active_user_id',
+        'broker_order_seq',
+        'relative_order_sys_id',
+        'zce_total_traded_volume',
+        'is_swap_order',
+        'branch_id',
+    ]
+
+    def __init__(self, broker_id=None, investor_id=None, instrument_id=None, order_ref=None, user_id=None,
+                 order_price_type=None, direction=None, comb_offset_flag=None, comb_hedge_flag=None, limit_price=None,
+                 volume_total_original=None, time_condition=None, gtd_date=None, volume_condition=None, min_volume=None,
+                 contingent_condition=None, stop_price=None, force_close_reason=None, is_auto_suspend=None,
+                 business_unit=None, request_id=None, order_local_id=None, exchange_id=None, participant_id=None,
+                 client_id=None, exchange_inst_id=None, trader_id=None, install_id=None, order_submit_status=None,
+                 notify_sequence=None, trading_day=None, settlement_id=None, order_sys_id=None, order_source=None,
+                 order_status=None, order_type=None, volume_traded=None, volume_total=None, insert_date=None,
+                 insert_time=None, active_time=None, suspend_time=None, update_time=None, cancel_time=None,
+                 active_trader_id=None, clearing_part_id=None, sequence_no=None, front_id=None, session_id=None,
+                 user_product_info=None, status_msg=None, user_force_close=None, active_user_id=None,
+                 broker_order_seq=None, relative_order_sys_id=None, zce_total_traded_volume=None, is_swap_order=None,
+                 branch_id=None):
+        self.broker_id = broker_id
+        self.investor_id = investor_id
+        self.instrument_id = instrument_id
+        self.order_ref = order_ref
+        self.user_id = user_id
+        self.order_price_type = order_price_type
+        self.direction = direction
+        self.comb_offset_flag = comb_offset_flag
+        self.comb_hedge_flag = comb_hedge_flag
+        self.limit_price = limit_price
+        self.volume_total_original = volume_total_original
+        self.time_condition = time_condition
+        self.gtd_date = gtd_date
+        self.volume_condition = volume_condition
+        self.min_volume = min_volume
+        self.contingent_condition = contingent_condition
+        self.stop_price = stop_price
+        self.force_close_reason = force_close_reason
+        self.is_auto_suspend = is_auto_suspend
+        self.business_unit = business_unit
+        self.request_id = request_id
+        self.order_local_id = order_local_id
+        self.exchange_id = exchange_id
+        self.participant_id = participant_id
+        self.client_id = client_id
+        self.exchange_inst_id = exchange_inst_id
+        self.trader_id = trader_id
+        self.install_id = install_id
+        self.order_submit_status = order_submit_status
+        self.notify_sequence = notify_sequence
+        self.trading_day = trading_day
+        self.settlement_id = settlement_id
+        self.order_sys_id = order_sys_id
+        self.order_source = order_source
+        self.order_status = order_status
+        self.order_type = order_type
+        self.volume_traded = volume_traded
+        self.volume_total = volume_total
+        self.insert_date = insert_date
+        self.insert_time = insert_time
+        self.active_time = active_time
+        self.suspend_time = suspend_time
+        self.update_time = update_time
+        self.cancel_time = cancel_time
+        self.active_trader_id = active_trader_id
+        self.clearing_part_id = clearing_part_id
+        self.sequence_no = sequence_no
+        self.front_id = front_id
+        self.session_id = session_id
+        self.user_product_info = user_product_info
+        self.status_msg = status_msg
+        self.user_force_close = user_force_close
+        self.active_user_id = active_user_id
+        self.broker_order_seq = broker_order_seq
+        self.relative_order_sys_id = relative_order_sys_id
+        self.zce_total_traded_volume = zce_total_traded_volume
+        self.is_swap_order = is_swap_order
+        self.branch_id = branch_id
+
+
 class SettlementConfirmResponse(CTPObject):
 
+    __ctp_fields__ = [
+        'BrokerID', 'InvestorID', 'ConfirmDate', 'ConfirmTime'
+    ]
     __slots__ = [
         'confirm_time',
         'confirm_date',
@@ -363,6 +572,16 @@ class SettlementConfirmResponse(CTPObject):
 
 class PositionResponse(CTPObject):
 
+    __ctp_aliases__ = {'PosiDirection': 'position_direction'}
+    __ctp_fields__ = [
+        'InstrumentID', 'BrokerID', 'InvestorID', 'PosiDirection', 'HedgeFlag', 'PositionDate', 'YdPosition',
+        'Position', 'LongFrozen', 'ShortFrozen', 'LongFrozenAmount', 'ShortFrozenAmount', 'OpenVolume', 'CloseVolume',
+        'OpenAmount', 'CloseAmount', 'PositionCost', 'PreMargin', 'UseMargin', 'FrozenMargin', 'FrozenCash',
+        'FrozenCommission', 'CashIn', 'Commission', 'CloseProfit', 'PositionProfit', 'PreSettlementPrice',
+        'SettlementPrice', 'TradingDay', 'SettlementID', 'OpenCost', 'ExchangeMargin', 'CombPosition', 'CombLongFrozen',
+        'CombShortFrozen', 'CloseProfitByDate', 'CloseProfitByTrade', 'TodayPosition', 'MarginRateByMoney',
+        'MarginRateByVolume', 'StrikeFrozen', 'StrikeFrozenAmount', 'AbandonFrozen', 'ExchangeID', 'YdStrikeFrozen'
+    ]
     __slots__ = [
         'instrument_id',
         'use_margin',
@@ -458,28 +677,13 @@ class PositionResponse(CTPObject):
         self.position = position
         self.open_volume = open_volume
 
-    @classmethod
-    def from_ctp(cls, item):
-        """
-        Generate from ctp.
-
-        Args:
-            item(dict): ctp tick data
-
-        Returns:
-            obj: Tick instance
-        """
-        item['position_direction'] = item.pop('PosiDirection')
-        underline_item = {
-            hump_to_underline(key): value for key, value in item.iteritems()
-        }
-        return cls(**underline_item)
-
 
 __all__ = [
+    'compile_ctp_decoder',
     'Tick',
     'AccountResponse',
     'TradeResponse',
+    'OrderResponse',
     'SettlementConfirmResponse',
     'PositionResponse'
 ]
@@ -198,9 +198,12 @@ class PositionSchema(ValueObject):
                    pre_portfolio_value=pre_portfolio_value,
                    benchmark_return=benchmark_return, daily_return=daily_return)
 
-    def to_redis_item(self):
+    def to_redis_item(self, to_dict=True):
         """
         To redis item
+
+        Args:
+            to_dict(boolean): not used, positions are always converted
         """
         return {
             'portfolio_id': self.portfolio_id,
@@ -287,15 +290,18 @@ class OrderSchema(ValueObject):
                     orders[order_id] = order
         return cls(portfolio_id=portfolio_id, date=date, orders=orders)
 
-    def to_redis_item(self):
+    def to_redis_item(self, to_dict=True):
         """
         To redis item
+
+        Args:
+            to_dict(boolean): whether orders are to convert, False if they are dicts already
         """
         return {
             'portfolio_id': self.portfolio_id,
             'date': self.date,
             'orders': {
-                order_id: order.to_dict() for order_id, order in self.orders.iteritems()
+                order_id: order.to_dict() if to_dict else order for order_id, order in self.orders.iteritems()
             }
         }
 
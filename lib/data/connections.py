@@ -0,0 +1,198 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Deferred and fork-safe connections.
+# **********************************************************************************#
+import os
+import time
+import traceback
+from threading import RLock
+from collections import OrderedDict
+from .. configs import logger, connection_health_check_interval
+
+
+class LazyConnection(object):
+    """
+    Proxy of a connection object: the object is built by factory on first use, and rebuilt when used in a
+    forked process, when its health check fails or when the connection it depends on is rebuilt, so that
+    workers never share sockets of their parent.
+    """
+    def __init__(self, name, factory, health_check=None, close=None,
+                 health_check_interval=connection_health_check_interval, depends_on=None):
+        """
+        Args:
+            name(string): connection name
+            factory(func): function without arguments building the connection object
+            health_check(func): function of connection object, raising or returning False if unhealthy
+            close(func): function of connection object releasing it, only called in its own process
+            health_check_interval(float): seconds between health checks, 0 to disable
+            depends_on(LazyConnection): connection whose object is used by factory, such as the client of a database
+        """
+        self._name = name
+        self._factory = factory
+        self._health_check = health_check
+        self._close = close
+        self._health_check_interval = health_check_interval
+        self._depends_on = depends_on
+        self._instance = None
+        self._pid = None
+        self._checked_at = 0
+        self._dependency_generation = None
+        self._lock = RLock()
+        self.generation = 0
+
+    def _outdated(self):
+        if self._instance is None or self._pid != os.getpid():
+            return True
+        if self._depends_on is not None:
+            self._depends_on.get()
+            return self._depends_on.generation != self._dependency_generation
+        return False
+
+    def get(self):
+        """
+        Connection object of current process.
+        """
+        instance = self._instance
+        if self._outdated():
+            with self._lock:
+                if self._outdated():
+                    self._build()
+                instance = self._instance
+        elif self._health_check is not None and self._health_check_interval and \
+                time.time() - self._checked_at > self._health_check_interval:
+            instance = self._check(instance)
+        return instance
+
+    def _build(self):
+        # an object inherited from the parent process is dropped without closing, since closing it would
+        # shut down sockets still used by the parent
+        if self._instance is not None and self._pid == os.getpid():
+            self._release(self._instance)
+        if self._depends_on is not None:
+            self._depends_on.get()
+            self._dependency_generation = self._depends_on.generation
+        self._instance = self._factory()
+        self._pid = os.getpid()
+        self._checked_at = time.time()
+        self.generation += 1
+
+    def _check(self, instance):
+        with self._lock:
+            if self._instance is not instance:
+                return self._instance
+            self._checked_at = time.time()
+            if not self.healthy():
+                logger.warn('[CONNECTION] {} failed health check, rebuilding.'.format(self._name))
+                self._build()
+            return self._instance
+
+    def _release(self, instance):
+        if self._close is None:
+            return
+        try:
+            self._close(instance)
+        except Exception:
+            logger.warn('[CONNECTION] closing {} failed: {}'.format(self._name, traceback.format_exc()))
+
+    def healthy(self):
+        """
+        Whether the built connection passes its health check, True if none or not built yet.
+        """
+        if self._health_check is None or self._instance is None:
+            return True
+        try:
+            return self._health_check(self._instance) is not False
+        except Exception:
+            return False
+
+    def set(self, instance):
+        """
+        Replace the connection object of current process, such as by a local stand-in.
+        """
+        with self._lock:
+            self._instance = instance
+            self._pid = os.getpid()
+            self._checked_at = time.time()
+            self.generation += 1
+            if self._depends_on is not None:
+                self._dependency_generation = self._depends_on.generation
+
+    def reset(self):
+        """
+        Drop the connection object, the next use builds a new one.
+        """
+        with self._lock:
+            if self._instance is not None and self._pid == os.getpid():
+                self._release(self._instance)
+            self._instance = None
+            self._pid = None
+
+    @property
+    def built(self):
+        return self._instance is not None and self._pid == os.getpid()
+
+    def __getattr__(self, item):
+        return getattr(self.get(), item)
+
+    def __getitem__(self, item):
+        return self.get()[item]
+
+    def __repr__(self):
+        return 'LazyConnection({}, built={})'.format(self._name, self.built)
+
+
+class ConnectionRegistry(object):
+    """
+    Registry of lazy connections by name.
+    """
+    def __init__(self):
+        self.connections = OrderedDict()
+
+    def register(self, name, factory, health_check=None, close=None,
+                 health_check_interval=connection_health_check_interval, depends_on=None):
+        """
+        Register connection, see LazyConnection.
+
+        Returns:
+            LazyConnection: connection proxy
+        """
+        connection = LazyConnection(name, factory, health_check=health_check, close=close,
+                                    health_check_interval=health_check_interval, depends_on=depends_on)
+        self.connections[name] = connection
+        return connection
+
+    def __getitem__(self, name):
+        return self.connections[name]
+
+    def check(self):
+        """
+        Health of built connections, rebuilding unhealthy ones.
+
+        Returns:
+            dict: name --> healthy
+        """
+        health = dict()
+        for name, connection in self.connections.iteritems():
+            if not connection.built:
+                continue
+            health[name] = connection.healthy()
+            if not health[name]:
+                connection.reset()
+        return health
+
+    def reset(self):
+        """
+        Drop all connection objects, such as in a post fork hook.
+        """
+        for connection in self.connections.itervalues():
+            connection.reset()
+
+
+connections = ConnectionRegistry()
+
+
+__all__ = [
+    'LazyConnection',
+    'ConnectionRegistry',
+    'connections'
+]
@@ -11,7 +11,9 @@ import pandas as pd
 from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import reduce
+from utils.tracing import traced
 from . api_client import Client
+from . connections import connections
 from . mongodb_api import (
     query_from_mongodb,
     dump_schema_to_mongodb
@@ -22,6 +24,7 @@ from . redis_api import (
     delete_keys_redis,
     delete_items_in_redis
 )
+from .. configs import api_token
 from .. const import (
     CONTINUOUS_FUTURES_PATTERN,
     MULTI_FREQ_PATTERN
@@ -39,9 +42,29 @@ FUTURES_DAILY_FIELDS = ['tradeDate', 'openPrice', 'highPrice', 'lowPrice', 'clos
                         'volume', 'openInterest', 'preSettlementPrice', 'turnoverVol', 'turnoverValue']
 FUTURES_MINUTE_FIELDS = ['tradeDate', 'clearingDate', 'barTime', 'openPrice', 'highPrice', 'lowPrice',
                          'closePrice', 'volume', 'tradeTime', 'turnoverVol', 'turnoverValue', 'openInterest']
-client = Client()
-client.init('602bada78f4eb803470a5b8754eb956da631fc072e116deb39b7c85b94d070dc')
-# client.init('12add2cfd90efc05ad9bb470362da2f6559f4c3b38839be9a72668bef4c7aad8')
+
+
+def _create_data_client():
+    """
+    DataAPI client initialized with the configured token.
+    """
+    data_client = Client()
+    data_client.init(api_token)
+    return data_client
+
+
+client = connections.register('data_api', _create_data_client)
+
+
+@traced('database_api.http_request')
+def _request_data(url):
+    """
+    Request DataAPI url through client.
+
+    Returns:
+        tuple: http code, response
+    """
+    return client.getData(url)
 
 
 def normalize_date(date):
@@ -84,7 +107,7 @@ def get_trading_days(start, end):
     start = normalize_date(start).strftime('%Y%m%d')
     end = normalize_date(end).strftime('%Y%m%d')
     url = '/api/master/getTradeCal.json?field=&exchangeCD=XSHG&beginDate={}&endDate={}'.format(start, end)
-    code, data = client.getData(url)
+    code, data = _request_data(url)
     if code != 200:
         raise Exception
     data = json.loads(data)['data']
@@ -114,6 +137,7 @@ def get_direct_trading_day(date, step, forward):
     return target_trading_days[target_index]
 
 
+@traced()
 def load_futures_daily_data(universe, trading_days, attributes=None):
     """
     Load futures daily data.
@@ -160,7 +184,7 @@ def load_futures_daily_data(universe, trading_days, attributes=None):
         ticker = ','.join(batch)
         begin_date, end_date = trading_days[0], trading_days[-1]
         url = '/api/market/getMktFutd.json?ticker={}&beginDate={}&endDate={}'.format(ticker, begin_date, end_date)
-        code, data = client.getData(url)
+        code, data = _request_data(url)
         if code != 200:
             raise Exception
         raw_data = pd.DataFrame(json.loads(data)['data'])
@@ -187,6 +211,7 @@ def load_futures_daily_data(universe, trading_days, attributes=None):
     return data_all
 
 
+@traced()
 def load_futures_minute_data(universe=None, trading_days=None, field=None, freq='m'):
     """
     Load futures minute data concurrently.
@@ -229,7 +254,7 @@ def load_futures_minute_data(universe=None, trading_days=None, field=None, freq=
                                                                        trading_days[0],
                                                                        trading_days[-1],
                                                                        unit)
-        code, resp_data = client.getData(url)
+        code, resp_data = _request_data(url)
         if code != 200:
             raise Exception
         frame = pd.DataFrame(json.loads(resp_data)['data'][0]['barBodys'])
@@ -284,6 +309,7 @@ def load_futures_minute_data(universe=None, trading_days=None, field=None, freq=
     return data_all
 
 
+@traced()
 def load_futures_rt_minute_data(universe):
     """
     Load futures real-time minute data of current date.
@@ -297,7 +323,7 @@ def load_futures_rt_minute_data(universe):
     assert isinstance(universe, (list, tuple, set))
     universe_string = ','.join(universe)
     url = '/api/market/getFutureBarRTIntraDay.json?instrumentID={}&unit=1'.format(universe_string)
-    code, data = client.getData(url)
+    code, data = _request_data(url)
     if code != 200:
         raise Exception
     data = json.loads(data)['data']
@@ -312,6 +338,7 @@ def load_futures_rt_minute_data(universe):
     return _transfer_bar(data)
 
 
+@traced()
 def load_futures_base_info(symbols=None):
     """
     Get futures base info.
@@ -322,9 +349,9 @@ def load_futures_base_info(symbols=None):
     url = '/api/future/getFutu.json'
     if symbols:
         url = '?'.join([url, 'ticker={}'.format(','.join(symbols))])
-        code, data = client.getData(url)
+        code, data = _request_data(url)
     else:
-        code, data = client.getData(url)
+        code, data = _request_data(url)
     if code != 200:
         raise Exception
     data = pd.DataFrame(json.loads(data)['data'])
@@ -336,6 +363,7 @@ def load_futures_base_info(symbols=None):
     return data
 
 
+@traced()
 def load_futures_main_contract(contract_objects=None, trading_days=None, start=None, end=None):
     """
     Get futures main contract
@@ -349,7 +377,7 @@ def load_futures_main_contract(contract_objects=None, trading_days=None, start=N
     start = normalize_date(start or trading_days[0]).strftime('%Y%m%d')
     end = normalize_date(end or trading_days[-1]).strftime('%Y%m%d')
     url = '/api/market/getMktMFutd.json?mainCon=1&startDate={}&endDate={}'.format(start, end)
-    code, data = client.getData(url)
+    code, data = _request_data(url)
     if code != 200:
         raise Exception
     data = pd.DataFrame(json.loads(data)['data'])
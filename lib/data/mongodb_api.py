@@ -2,6 +2,7 @@
 # **********************************************************************************#
 #     File: Mongodb api
 # **********************************************************************************#
+from utils.tracing import traced
 from .. core.schema import switch_schema
 from .. core.collection import switch_collection
 from .. core.batch_tool import switch_batch_tool
@@ -43,6 +44,7 @@ def _query_from_(collection, schema_cls, portfolio_id=None, date=None,
     return result
 
 
+@traced()
 def query_from_mongodb(schema_type, portfolio_id=None, date=None,
                        key='portfolio_id', query_parameters=None, **kwargs):
     """
@@ -65,6 +67,7 @@ def query_from_mongodb(schema_type, portfolio_id=None, date=None,
     return schemas
 
 
+@traced()
 def dump_schema_to_mongodb(schema_type, schema, unit_dump=True):
     """
     Dump schema to mongodb
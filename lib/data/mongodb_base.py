@@ -1,10 +1,12 @@
 from pymongo import MongoClient, UpdateOne
+from . connections import connections
 from .. configs import (
     mongodb_url,
     mongodb_db_name,
     mongodb_authenticate,
     mongodb_username,
-    mongodb_password
+    mongodb_password,
+    mongodb_max_pool_size
 )
 
 
@@ -32,14 +34,35 @@ class BatchTool(object):
         self.commit()
 
 
-mongodb_client = MongoClient(host=mongodb_url, connect=False)
-mongodb_database = mongodb_client[mongodb_db_name]
-if mongodb_authenticate:
-    mongodb_database.authenticate(mongodb_username, mongodb_password)
+def _create_mongodb_database():
+    """
+    Mongodb database on a client of the current process.
+    """
+    database = mongodb_client.get()[mongodb_db_name]
+    if mongodb_authenticate:
+        database.authenticate(mongodb_username, mongodb_password)
+    return database
+
+
+def mongodb_collection(name):
+    """
+    Lazy connection of mongodb collection name.
+    """
+    return connections.register('mongodb.{}'.format(name), lambda: mongodb_database.get()[name],
+                                health_check_interval=0, depends_on=mongodb_database)
+
+
+mongodb_client = connections.register('mongodb', lambda: MongoClient(host=mongodb_url, connect=False,
+                                                                     maxPoolSize=mongodb_max_pool_size),
+                                      health_check=(lambda client: client.admin.command('ismaster')),
+                                      close=(lambda client: client.close()))
+mongodb_database = connections.register('mongodb.database', _create_mongodb_database, health_check_interval=0,
+                                        depends_on=mongodb_client)
 
 
 __all__ = [
     'mongodb_client',
     'mongodb_database',
+    'mongodb_collection',
     'BatchTool'
 ]
@@ -7,6 +7,7 @@ import time
 from datetime import datetime
 from utils.error import Errors
 from utils.dict import DefaultDict
+from utils.tracing import traced
 from . redis_base import (
     redis_client,
     RedisCollection,
@@ -106,6 +107,7 @@ def _dump_to_(collection, mapping):
         redis_client.hmset(collection, mapping)
 
 
+@traced()
 def query_from_redis(schema_type, portfolio_id=None, **kwargs):
     """
     Query data from redis
@@ -143,6 +145,7 @@ def query_from_redis(schema_type, portfolio_id=None, **kwargs):
     raise Errors.INVALID_SCHEMA_TYPE
 
 
+@traced()
 def dump_schema_to_redis(schema_type, schema, **kwargs):
     """
     Dump schema to redis
@@ -167,6 +170,7 @@ def dump_schema_to_redis(schema_type, schema, **kwargs):
     _dump_to_(collection, data)
 
 
+@traced()
 def delete_keys_redis(*delete_keys):
     """
     Delete one or more keys in redis
@@ -192,6 +196,7 @@ def delete_keys_redis(*delete_keys):
     return result
 
 
+@traced()
 def delete_items_in_redis(schema_type, keys):
     """
     Delete items in redis
@@ -4,7 +4,15 @@
 # **********************************************************************************#
 import json
 import redis
-from .. configs import redis_host, redis_port
+from utils.metrics import METRIC_PREFIX, MetricFamily, registry
+from . connections import connections
+from .. configs import (
+    redis_host,
+    redis_port,
+    redis_max_connections,
+    redis_socket_timeout,
+    redis_pool_timeout
+)
 
 
 class RedisCollection(object):
@@ -151,7 +159,29 @@ class RedisQueue(object):
         self.client.ltrim(key, self.size(key), self.size(key))
 
 
-_pool = redis.ConnectionPool(host=redis_host, port=redis_port)
-redis_client = redis.Redis(connection_pool=_pool)
+def _create_redis_client():
+    """
+    Redis client on a pool of the current process. Requests beyond max_connections, e.g. from the
+    worker_connections greenlets of a gevent worker, wait up to pool_timeout for a free connection
+    instead of failing with too many connections.
+    """
+    pool = redis.BlockingConnectionPool(host=redis_host, port=redis_port, max_connections=redis_max_connections,
+                                        timeout=redis_pool_timeout, socket_timeout=redis_socket_timeout)
+    return redis.Redis(connection_pool=pool)
+
+
+redis_client = connections.register('redis', _create_redis_client,
+                                    health_check=(lambda client: client.ping()),
+                                    close=(lambda client: client.connection_pool.disconnect()))
 redis_queue = RedisQueue(redis_client)
 redis_set = RedisSet(redis_client)
+
+
+@registry.register_collector
+def collect_redis_queue_metrics():
+    """
+    Backlog sizes of redis queues.
+    """
+    samples = [(METRIC_PREFIX + 'redis_queue_backlog', {'queue': key}, redis_queue.size(key))
+               for key in sorted({redis_queue.key, RedisCollection.trade})]
+    return [MetricFamily(METRIC_PREFIX + 'redis_queue_backlog', 'gauge', 'Items waiting in redis queues.', samples)]
@@ -4,11 +4,18 @@
 # **********************************************************************************#
 from Queue import Queue, Empty
 from threading import Thread
+from weakref import WeakSet
 from utils.error import HandleDataException
 from utils.dict import DefaultDict
+from utils.metrics import METRIC_PREFIX, MetricFamily, registry
+from utils.tracing import tracer
 from . event_base import Event, EventType
 
 
+# live event engines reported by metrics
+_event_engines = WeakSet()
+
+
 class EventEngine(object):
     """
     Event engine: controller system of event.
@@ -23,6 +30,8 @@ class EventEngine(object):
         self._event_handlers = event_handlers or DefaultDict(list)
         self._processor = Thread(target=self._run)
         self._log = log
+        self.dispatch_counts = dict()
+        _event_engines.add(self)
 
     def start(self):
         """
@@ -62,6 +71,12 @@ class EventEngine(object):
         """
         self._event_queue.put(event)
 
+    def queue_depth(self):
+        """
+        Events waiting in the processing queue.
+        """
+        return self._event_queue.qsize()
+
     def register_handlers(self, event_type, handler):
         """
         Register handlers.
@@ -94,7 +109,12 @@ class EventEngine(object):
         while self._active:
             try:
                 event = self._event_queue.get(block=True, timeout=timeout)
-                self._process(event)
+                if tracer.enabled:
+                    with tracer.span('event_engine.{}'.format(event.event_type)):
+                        self._process(event)
+                else:
+                    self._process(event)
+                self.dispatch_counts[event.event_type] = self.dispatch_counts.get(event.event_type, 0) + 1
             except Empty:
                 pass
             except HandleDataException:
@@ -114,3 +134,19 @@ class EventEngine(object):
             map(lambda handler: handler(**event.event_parameters), self._event_handlers[event.event_type])
 
         map(lambda handler: handler(**event.event_parameters), self._event_handlers[EventType.general])
+
+
+@registry.register_collector
+def collect_event_engine_metrics():
+    """
+    Queue depth and dispatched events by type of live event engines.
+    """
+    depths, dispatches = list(), list()
+    for engine in list(_event_engines):
+        labels = {'engine': hex(id(engine))}
+        depths.append((METRIC_PREFIX + 'event_queue_depth', labels, engine.queue_depth()))
+        for event_type, count in sorted(engine.dispatch_counts.items()):
+            dispatches.append((METRIC_PREFIX + 'events_dispatched_total', dict(labels, event_type=event_type), count))
+    return [MetricFamily(METRIC_PREFIX + 'event_queue_depth', 'gauge', 'Events waiting in event engine queue.', depths),
+            MetricFamily(METRIC_PREFIX + 'events_dispatched_total', 'counter', 'Events dispatched by type.',
+                         dispatches)]
@@ -1,2 +1,4 @@
 from . market_gateway import CTPMarketGateway
 from . trader_gateway import CtpTraderGateway
+from . replay_gateway import CTPReplayGateway, CTPRecorder
+from . order_scheduler import OrderScheduler
@@ -3,6 +3,10 @@
 #     File:
 # **********************************************************************************#
 import os
+import threading
+
+
+DEFAULT_READINESS_TIMEOUT = 10
 
 
 def get_temp_path(file_name):
@@ -18,3 +22,150 @@ def get_temp_path(file_name):
 
     path = os.path.join(temp_path, file_name)
     return path
+
+
+class ReadinessStage(object):
+    """
+    Handshake stages of a ctp gateway.
+    """
+    connected = 'connected'
+    authenticated = 'authenticated'
+    logged_in = 'logged_in'
+    settlement_confirmed = 'settlement_confirmed'
+
+    ALL = [connected, authenticated, logged_in, settlement_confirmed]
+
+
+class GatewayReadiness(object):
+    """
+    Readiness state machine of a ctp gateway, driven by api callbacks instead of fixed sleeps.
+    Each stage is an event, set when its response callback arrives; a failed stage also sets
+    the event so that waiters return immediately instead of running into the timeout. Stages are
+    reset before they are requested again, so that a retry never returns the outcome of a former try.
+    """
+    def __init__(self, timeout=DEFAULT_READINESS_TIMEOUT):
+        self.timeout = timeout
+        self._stages = {stage: threading.Event() for stage in ReadinessStage.ALL}
+        self._failures = dict()
+        self._queries = dict()
+        self._aborted = set()
+        self._waiters = dict()
+        self._lock = threading.Lock()
+
+    def set(self, stage):
+        """
+        Mark stage as ready.
+
+        Args:
+            stage(string): readiness stage
+        """
+        self._failures.pop(stage, None)
+        self._stages[stage].set()
+
+    def fail(self, stage, error=None):
+        """
+        Mark stage as failed and wake up its waiters.
+
+        Args:
+            stage(string): readiness stage
+            error(dict): ctp error data
+        """
+        self._failures[stage] = error
+        self._stages[stage].set()
+
+    def reset(self, *stages):
+        """
+        Reset stages, all stages are reset if none specified, e.g. when the front disconnects.
+        Resetting logged_in ends the session: pending queries are aborted, their waiters wake up
+        and wait_query reports them as failed. Aborted ids are kept until their waiters are released,
+        or until the next session ends if nobody waits on them.
+
+        Args:
+            *stages: readiness stages
+        """
+        stages = stages or ReadinessStage.ALL
+        for stage in stages:
+            self._failures.pop(stage, None)
+            self._stages[stage].clear()
+        if ReadinessStage.logged_in not in stages:
+            return
+        with self._lock:
+            self._aborted = set(self._queries) | (self._aborted & set(self._waiters))
+            for event in self._queries.itervalues():
+                event.set()
+            self._queries.clear()
+
+    def is_ready(self, stage):
+        """
+        Whether stage is ready.
+
+        Args:
+            stage(string): readiness stage
+        """
+        return self._stages[stage].is_set() and stage not in self._failures
+
+    def wait(self, stage, timeout=None):
+        """
+        Wait until stage is ready, failed or timeout.
+
+        Args:
+            stage(string): readiness stage
+            timeout(float): seconds to wait, default to self.timeout
+
+        Returns:
+            boolean: whether stage is ready
+        """
+        self._stages[stage].wait(self.timeout if timeout is None else timeout)
+        return self.is_ready(stage)
+
+    def register_query(self, request_id):
+        """
+        Register a pending query, finished by its last response.
+
+        Args:
+            request_id(int): request id
+        """
+        with self._lock:
+            self._aborted.discard(request_id)
+            self._queries[request_id] = threading.Event()
+
+    def finish_query(self, request_id, last=True):
+        """
+        Finish a pending query on its last response.
+
+        Args:
+            request_id(int): request id
+            last(boolean): whether it is the last response of the query
+        """
+        if not last:
+            return
+        with self._lock:
+            event = self._queries.pop(request_id, None)
+        if event is not None:
+            event.set()
+
+    def wait_query(self, request_id, timeout=None):
+        """
+        Wait until the query of request id finishes or timeout.
+
+        Args:
+            request_id(int): request id
+            timeout(float): seconds to wait, default to self.timeout
+
+        Returns:
+            boolean: whether the query finished, False if it timed out or was aborted
+        """
+        with self._lock:
+            event = self._queries.get(request_id)
+            self._waiters[request_id] = self._waiters.get(request_id, 0) + 1
+        if event is not None:
+            event.wait(self.timeout if timeout is None else timeout)
+        with self._lock:
+            waiters = self._waiters.pop(request_id) - 1
+            if waiters:
+                self._waiters[request_id] = waiters
+            if request_id in self._aborted:
+                if not waiters:
+                    self._aborted.discard(request_id)
+                return False
+            return request_id not in self._queries
@@ -4,18 +4,25 @@
 # **********************************************************************************#
 import os
 import time
+import traceback
 from lib.api.ctp import *
 from lib.configs import logger
 from lib.core.ctp import *
 from lib.event.event_base import *
-from . ctp_base import get_temp_path
+from . ctp_base import (
+    get_temp_path,
+    GatewayReadiness,
+    ReadinessStage,
+    DEFAULT_READINESS_TIMEOUT
+)
 
 
 class CTPMarketGateway(MdApi):
     """
     CTP Market Gateway.
     """
-    def __init__(self, user_id=None, password=None, broker_id=None, address=None, event_engine=None):
+    def __init__(self, user_id=None, password=None, broker_id=None, address=None, event_engine=None,
+                 readiness_timeout=DEFAULT_READINESS_TIMEOUT, recorder=None):
         super(CTPMarketGateway, self).__init__()
         self.user_id = user_id
         self.password = password
@@ -26,6 +33,7 @@ class CTPMarketGateway(MdApi):
         self.connection_status = False  # 连接状态
         self.login_status = False  # 登录状态
         self.login_failed = False
+        self.login_error = None
         self.subscribed_symbols = set()  # 已订阅合约代码
         self.request_id = 0
         self.front_id = None
@@ -34,6 +42,8 @@ class CTPMarketGateway(MdApi):
         self.auth_status = False
         self.user_product_info = None
         self.session_id = None
+        self.readiness = GatewayReadiness(timeout=readiness_timeout)
+        self.recorder = recorder
 
     def __setattr__(self, attribute, value):
         """
@@ -54,15 +64,19 @@ class CTPMarketGateway(MdApi):
         else:
             object.__setattr__(self, attribute, value)
 
-    def connect(self, user_id=None, password=None, broker_id=None, address=None):
+    def connect(self, user_id=None, password=None, broker_id=None, address=None, timeout=None):
         """
-        Initialize connect.
+        Initialize connect, and wait until logged in.
 
         Args:
             user_id(string): user id.
             password(string): password.
             broker_id(string): broker id.
             address(string): address.
+            timeout(float): seconds to wait for login, default to readiness timeout.
+
+        Returns:
+            boolean: whether logged in
         """
         logger.info('[connect] user_id: {}, broker_id: {}, address: {}'.format(user_id, broker_id, address))
         self.user_id = user_id or self.user_id
@@ -70,6 +84,7 @@ class CTPMarketGateway(MdApi):
         self.broker_id = broker_id or self.broker_id
         self.address = address or self.address
         if not self.connection_status:
+            self.readiness.reset()
             path = get_temp_path(self.__class__.__name__ + '_')
             self.createFtdcMdApi(path)
             self.registerFront(self.address)
@@ -79,28 +94,31 @@ class CTPMarketGateway(MdApi):
         else:
             if not self.login_status:
                 self.login()
-        time.sleep(0.1)
+        ready = self.readiness.wait(ReadinessStage.logged_in, timeout=timeout)
+        if not ready:
+            logger.warn('[connect] not logged in, user_id: {}, broker_id: {}'.format(self.user_id, self.broker_id))
+        return ready
 
     def subscribe(self, symbols):
         """
-        Subscribe market data.
+        Subscribe market data, symbols not sent before login are subscribed once logged in.
 
         Args:
             symbols(string or list): subscribe symbol.
         """
         logger.info('[subscribe] symbols: {}'.format(symbols))
         symbols = [symbols] if isinstance(symbols, basestring) else symbols
+        self.subscribed_symbols |= set(symbols)
         if self.login_status:
             for symbol in symbols:
                 self.subscribeMarketData(str(symbol))
-        self.subscribed_symbols |= set(symbols)
-        time.sleep(0.1)
 
     def login(self):
         """
-        Request for logging in.
+        Request for logging in, a login that failed before fails again at once without a request.
         """
         if self.login_failed:
+            self.readiness.fail(ReadinessStage.logged_in, self.login_error)
             return
         if self.user_id and self.password and self.broker_id:
             logger.info('[login] user_id: {},'
@@ -110,6 +128,7 @@ class CTPMarketGateway(MdApi):
             request['UserID'] = self.user_id
             request['Password'] = self.password
             request['BrokerID'] = self.broker_id
+            self.readiness.reset(ReadinessStage.logged_in)
             self.reqUserLogin(request, self.request_id)
 
     def authenticate(self):
@@ -127,6 +146,7 @@ class CTPMarketGateway(MdApi):
             req['AuthCode'] = self.auth_code
             req['UserProductInfo'] = self.user_product_info
             self.request_id += 1
+            self.readiness.reset(ReadinessStage.authenticated, ReadinessStage.logged_in)
             self.reqAuthenticate(req, self.request_id)
 
     def onFrontConnected(self):
@@ -135,8 +155,18 @@ class CTPMarketGateway(MdApi):
         """
         logger.info('[onFrontConnected] connection status = True.')
         self.connection_status = True
+        self.readiness.set(ReadinessStage.connected)
         self.login()
 
+    def onFrontDisconnected(self, n):
+        """
+        Server disconnected, the api reconnects by itself and logs in again on onFrontConnected.
+        """
+        logger.info('[onFrontDisconnected] connection status = False. [n:{}]'.format(n))
+        self.connection_status = False
+        self.login_status = False
+        self.readiness.reset()
+
     def onRspUserLogin(self, data, error, n, last):
         """
         Login response, deal with user login.
@@ -154,9 +184,14 @@ class CTPMarketGateway(MdApi):
             self.session_id = str(data['SessionID'])
             self.login_status = True
             self.request_id += 1
+            for symbol in self.subscribed_symbols:
+                self.subscribeMarketData(str(symbol))
+            self.readiness.set(ReadinessStage.logged_in)
         else:
             # 标识登录失败，防止用错误信息连续重复登录
             self.login_failed = True
+            self.login_error = error
+            self.readiness.fail(ReadinessStage.logged_in, error)
 
     def onRspAuthenticate(self, data, error, n, last):
         """
@@ -172,9 +207,12 @@ class CTPMarketGateway(MdApi):
             self.front_id = str(data['FrontID'])
             self.session_id = str(data['SessionID'])
             self.auth_status = True
+            self.readiness.set(ReadinessStage.authenticated)
             self.login()
         else:
             self.auth_status = False
+            self.readiness.fail(ReadinessStage.authenticated, error)
+            self.readiness.fail(ReadinessStage.logged_in, error)
 
     def onRtnDepthMarketData(self, data):
         """
@@ -183,7 +221,13 @@ class CTPMarketGateway(MdApi):
         Args:
             data(dict): market data.
         """
+        if self.recorder is not None:
+            try:
+                self.recorder.record('onRtnDepthMarketData', data)
+            except Exception:
+                logger.error('[onRtnDepthMarketData] record failed: {}'.format(traceback.format_exc()))
         tick_data = Tick.from_ctp(data)
+        tick_data.received_time = time.time()
         parameters = {
             'tick': tick_data
         }
@@ -0,0 +1,270 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Outbound order scheduler in front of ctp trader gateways.
+# **********************************************************************************#
+import time
+import traceback
+from collections import OrderedDict
+from threading import Thread, Condition
+from lib.configs import logger
+
+
+# flow control of ctp front: requests per second and burst per session
+DEFAULT_ORDER_RATE = 6
+DEFAULT_ORDER_BURST = 6
+
+
+class TokenBucket(object):
+    """
+    Token bucket of one ctp session.
+    """
+    def __init__(self, rate=DEFAULT_ORDER_RATE, capacity=DEFAULT_ORDER_BURST, clock=time.time):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self._clock = clock
+        self._last_time = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last_time) * self.rate)
+        self._last_time = now
+
+    def consume(self, tokens=1):
+        """
+        Consume tokens if available.
+
+        Args:
+            tokens(int): tokens needed
+
+        Returns:
+            float: 0 if consumed, otherwise seconds to wait before enough tokens refilled
+        """
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.
+        return (tokens - self.tokens) / self.rate
+
+
+class OrderRequestType(object):
+
+    cancel = 'cancel'
+    order = 'order'
+
+    # lanes in priority order, cancels go ahead of new orders
+    LANES = [cancel, order]
+
+
+class SchedulerMetrics(object):
+    """
+    Queue depth and wait time metrics of an order scheduler.
+    """
+    def __init__(self):
+        self.submitted = {lane: 0 for lane in OrderRequestType.LANES}
+        self.dispatched = {lane: 0 for lane in OrderRequestType.LANES}
+        self.coalesced = 0
+        self.throttled = 0
+        self.total_wait = 0.
+        self.max_wait = 0.
+
+    def record_wait(self, wait):
+        """
+        Record wait time of one dispatched request.
+
+        Args:
+            wait(float): seconds queued
+        """
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self, queue_depth=None):
+        """
+        To dict.
+
+        Args:
+            queue_depth(dict): lane --> queue depth
+        """
+        dispatched = sum(self.dispatched.itervalues())
+        return {
+            'queue_depth': queue_depth or dict(),
+            'submitted': dict(self.submitted),
+            'dispatched': dict(self.dispatched),
+            'coalesced': self.coalesced,
+            'throttled': self.throttled,
+            'mean_wait': self.total_wait / dispatched if dispatched else 0.,
+            'max_wait': self.max_wait,
+        }
+
+
+class OrderScheduler(object):
+    """
+    Rate limited outbound order queue in front of a trader gateway (one ctp session).
+
+    * a token bucket keeps requests within the flow control of the front;
+    * cancels are dispatched ahead of new orders;
+    * a re-submitted order replaces its queued version, and a cancel of an order still
+      queued drops both, so neither ever reaches the front.
+    """
+    def __init__(self, trader_gateway, rate=DEFAULT_ORDER_RATE, burst=DEFAULT_ORDER_BURST):
+        self.trader_gateway = trader_gateway
+        self.token_bucket = TokenBucket(rate=rate, capacity=burst)
+        self.metrics = SchedulerMetrics()
+        self._lanes = {
+            OrderRequestType.cancel: OrderedDict(),
+            OrderRequestType.order: OrderedDict(),
+        }
+        self._condition = Condition()
+        self._active = False
+        self._thread = None
+        # whether the head request is already counted as throttled while waiting for its token
+        self._throttled = False
+
+    def submit_order(self, order):
+        """
+        Queue a new order, replacing the queued one with the same order id.
+
+        Args:
+            order(obj): order obj
+        """
+        with self._condition:
+            queued_orders = self._lanes[OrderRequestType.order]
+            if order.order_id in queued_orders:
+                self.metrics.coalesced += 1
+                queued_orders[order.order_id] = (order, queued_orders[order.order_id][1])
+            else:
+                self.metrics.submitted[OrderRequestType.order] += 1
+                queued_orders[order.order_id] = (order, time.time())
+            self._condition.notify()
+
+    def submit_cancel(self, order_id, **kwargs):
+        """
+        Queue a cancel order, kwargs are passed through to trader_gateway.cancel_order.
+
+        Args:
+            order_id(string): order id
+
+        Returns:
+            boolean: False if the order was still queued and dropped without reaching the front
+        """
+        with self._condition:
+            queued_orders = self._lanes[OrderRequestType.order]
+            if queued_orders.pop(order_id, None) is not None:
+                self.metrics.coalesced += 1
+                return False
+            queued_cancels = self._lanes[OrderRequestType.cancel]
+            if order_id in queued_cancels:
+                self.metrics.coalesced += 1
+            else:
+                self.metrics.submitted[OrderRequestType.cancel] += 1
+                queued_cancels[order_id] = (kwargs, time.time())
+            self._condition.notify()
+        return True
+
+    def queue_depth(self):
+        """
+        Queue depth of each lane.
+        """
+        with self._condition:
+            return {lane: len(requests) for lane, requests in self._lanes.iteritems()}
+
+    def get_metrics(self):
+        """
+        Scheduler metrics with current queue depth.
+        """
+        return self.metrics.to_dict(queue_depth=self.queue_depth())
+
+    def _next_request(self):
+        """
+        Pop the next request by lane priority, must be called within the condition.
+        """
+        for lane in OrderRequestType.LANES:
+            requests = self._lanes[lane]
+            if requests:
+                order_id, (item, queued_time) = requests.popitem(last=False)
+                return lane, order_id, item, queued_time
+        return None
+
+    def _dispatch(self, lane, order_id, item, queued_time):
+        """
+        Dispatch one request to the trader gateway.
+        """
+        self.metrics.dispatched[lane] += 1
+        self.metrics.record_wait(time.time() - queued_time)
+        try:
+            if lane == OrderRequestType.cancel:
+                self.trader_gateway.cancel_order(order_id=order_id, **item)
+            else:
+                self.trader_gateway.send_order(item)
+        except Exception:
+            logger.error('[OrderScheduler] [dispatch] {} {} failed: {}'.format(
+                lane, order_id, traceback.format_exc()))
+
+    def dispatch_ready(self):
+        """
+        Dispatch queued requests as long as tokens are available.
+
+        Returns:
+            float: seconds to wait for the next token, 0 if queues are empty
+        """
+        while True:
+            with self._condition:
+                if not any(self._lanes.itervalues()):
+                    return 0.
+                wait = self.token_bucket.consume()
+                if wait:
+                    if not self._throttled:
+                        self.metrics.throttled += 1
+                        self._throttled = True
+                    return wait
+                self._throttled = False
+                request = self._next_request()
+            self._dispatch(*request)
+
+    def flush(self):
+        """
+        Dispatch all queued requests, blocking while throttled.
+        """
+        wait = self.dispatch_ready()
+        while wait:
+            time.sleep(wait)
+            wait = self.dispatch_ready()
+
+    def start(self):
+        """
+        Start dispatching in background.
+        """
+        if self._active:
+            return
+        self._active = True
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop dispatching, queued requests are kept.
+        """
+        with self._condition:
+            self._active = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, timeout=0.5):
+        """
+        Run worker loop.
+        """
+        while self._active:
+            wait = self.dispatch_ready()
+            with self._condition:
+                if self._active and not (wait == 0. and any(self._lanes.itervalues())):
+                    self._condition.wait(wait or timeout)
+
+
+__all__ = [
+    'TokenBucket',
+    'OrderRequestType',
+    'OrderScheduler',
+    'SchedulerMetrics'
+]
@@ -0,0 +1,277 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Replay gateway of recorded ctp callbacks.
+# **********************************************************************************#
+import heapq
+import json
+import time
+from threading import Thread, Lock
+from lib.configs import logger
+from lib.core.ctp import *
+from lib.event.event_base import EventType
+
+
+REPLAY_CALLBACKS = ['onRtnDepthMarketData', 'onRtnOrder', 'onRtnTrade']
+CTP_ENCODING = 'GBK'
+
+
+class CTPRecorder(object):
+    """
+    Recorder of ctp callbacks, one json record per line:
+        {"timestamp": 1529971200.5, "callback": "onRtnDepthMarketData", "data": {...}}
+
+    String fields of ctp, e.g. StatusMsg, are GBK encoded bytes and are decoded when recorded.
+    """
+    def __init__(self, file_path, open_style='a'):
+        self.file_path = file_path
+        self._file = open(file_path, open_style)
+        self._lock = Lock()
+
+    def record(self, callback, data):
+        """
+        Record callback data.
+
+        Args:
+            callback(string): ctp callback name
+            data(dict): ctp callback data
+        """
+        line = json.dumps({'timestamp': time.time(), 'callback': callback, 'data': data}, encoding=CTP_ENCODING)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        """
+        Flush and close the record file.
+        """
+        with self._lock:
+            self._file.close()
+
+
+def load_records(file_path):
+    """
+    Load records from file lazily.
+
+    Args:
+        file_path(string): record file path
+
+    Returns:
+        generator: (timestamp, callback, data)
+    """
+    with open(file_path, 'r') as record_file:
+        for line in record_file:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record['callback'] not in REPLAY_CALLBACKS:
+                continue
+            yield record.get('timestamp') or 0., record['callback'], record['data']
+
+
+class ReplayStatistics(object):
+    """
+    Statistics of one replay.
+    """
+    def __init__(self):
+        self.records = 0
+        self.ticks = 0
+        self.orders = 0
+        self.start_time = None
+        self.end_time = None
+        self.tick_to_order_latencies = list()
+
+    @property
+    def elapsed(self):
+        """
+        Elapsed seconds of replay.
+        """
+        if self.start_time is None:
+            return 0.
+        return (self.end_time or time.time()) - self.start_time
+
+    @property
+    def throughput(self):
+        """
+        Records replayed per second.
+        """
+        return self.records / self.elapsed if self.elapsed else 0.
+
+    def to_dict(self):
+        """
+        To dict.
+        """
+        latencies = sorted(self.tick_to_order_latencies)
+        return {
+            'records': self.records,
+            'ticks': self.ticks,
+            'orders': self.orders,
+            'elapsed': self.elapsed,
+            'throughput': self.throughput,
+            'tick_to_order_latency_mean': sum(latencies) / len(latencies) if latencies else None,
+            'tick_to_order_latency_p99': latencies[int(0.99 * (len(latencies) - 1))] if latencies else None,
+        }
+
+
+class CTPReplayGateway(object):
+    """
+    CTP replay gateway: replays recorded ctp callbacks from local files into the event engine,
+    through the same callback surface as CTPMarketGateway and CtpTraderGateway.
+
+    speed is a multiplier of the recorded pace, e.g. 10 replays ten times faster,
+    and None or 0 replays as fast as possible.
+    """
+    def __init__(self, file_paths=None, speed=None, event_engine=None):
+        self.file_paths = [file_paths] if isinstance(file_paths, basestring) else list(file_paths or [])
+        self.speed = speed
+        self.event_engine = event_engine
+        self.subscribed_symbols = set()
+        self.statistics = ReplayStatistics()
+        self.connection_status = False
+        self.login_status = False
+        self._active = False
+        self._thread = None
+
+    def connect(self, *args, **kwargs):
+        """
+        Connect, always ready.
+        """
+        self.connection_status = True
+        self.login_status = True
+        return True
+
+    def subscribe(self, symbols):
+        """
+        Subscribe market data, all recorded ticks are replayed if no symbol is subscribed.
+
+        Args:
+            symbols(string or list): subscribe symbol.
+        """
+        symbols = [symbols] if isinstance(symbols, basestring) else symbols
+        self.subscribed_symbols |= set(symbols)
+
+    def query_account(self):
+        """
+        Query account, not recorded.
+        """
+        return None
+
+    def query_positions(self):
+        """
+        Query positions, not recorded.
+        """
+        return None
+
+    def send_order(self, order):
+        """
+        Send order, recording the latency since the tick triggering it, orders without tick_time are not measured.
+
+        Args:
+            order(obj): order obj
+
+        Returns:
+            string: order id
+        """
+        self.statistics.orders += 1
+        if getattr(order, 'tick_time', None) is not None:
+            self.statistics.tick_to_order_latencies.append(time.time() - order.tick_time)
+        return order.order_id
+
+    def cancel_order(self, order_id):
+        """
+        Cancel order.
+
+        Args:
+            order_id(string): order id.
+        """
+        pass
+
+    def start(self):
+        """
+        Start replaying in background.
+        """
+        self._thread = Thread(target=self.replay)
+        self._thread.start()
+
+    def is_active(self):
+        """
+        Whether the background replay is running.
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        """
+        Stop replaying.
+        """
+        self._active = False
+        if self._thread is not None:
+            self._thread.join()
+
+    def replay(self):
+        """
+        Replay all records, merged by timestamp across files.
+
+        Returns:
+            ReplayStatistics: statistics of this replay
+        """
+        self._active = True
+        self.statistics = ReplayStatistics()
+        statistics = self.statistics
+        records = heapq.merge(*[load_records(file_path) for file_path in self.file_paths])
+        first_record_time = None
+        statistics.start_time = time.time()
+        for record_time, callback, data in records:
+            if not self._active:
+                break
+            if self.speed:
+                if first_record_time is None:
+                    first_record_time = record_time
+                delay = (record_time - first_record_time) / self.speed - (time.time() - statistics.start_time)
+                if delay > 0:
+                    time.sleep(delay)
+            getattr(self, callback)(data)
+            statistics.records += 1
+        statistics.end_time = time.time()
+        self._active = False
+        logger.info('[replay] {}'.format(statistics.to_dict()))
+        return statistics
+
+    def onRtnDepthMarketData(self, data):
+        """
+        Market data quotation response.
+
+        Args:
+            data(dict): market data.
+        """
+        if self.subscribed_symbols and data.get('InstrumentID') not in self.subscribed_symbols:
+            return
+        tick_data = Tick.from_ctp(data)
+        tick_data.received_time = time.time()
+        self.statistics.ticks += 1
+        self.event_engine.publish(EventType.event_on_tick, tick=tick_data)
+
+    def onRtnOrder(self, data):
+        """
+        Order response.
+
+        Args:
+            data(dict): response data.
+        """
+        self.event_engine.publish(EventType.event_on_order, order=OrderResponse.from_ctp(data))
+
+    def onRtnTrade(self, data):
+        """
+        Trade response.
+
+        Args:
+            data(dict): response data.
+        """
+        self.event_engine.publish(EventType.event_on_trade, trade=TradeResponse.from_ctp(data))
+
+
+__all__ = [
+    'CTP_ENCODING',
+    'CTPRecorder',
+    'CTPReplayGateway',
+    'ReplayStatistics',
+    'load_records'
+]
@@ -8,7 +8,6 @@ import sys
 import threading
 from copy import deepcopy
 from datetime import datetime
-from time import sleep
 
 from quartz_futures.ctp.dependency.vnctptd import *
 
@@ -17,6 +16,8 @@ from quartz_futures.trade.futures_account import PositionsRepo
 from quartz_futures.utils.error_utils import CTPError
 from quartz_futures.utils.calendar_utils import is_good_time_to_make_money
 from quartz_futures.cache import redis_connection
+from . ctp_base import GatewayReadiness, ReadinessStage
+from . order_scheduler import OrderScheduler
 
 order_type_map = {
     'market': '1',
@@ -41,6 +42,21 @@ direction_offset_map = {
 }
 
 
+class _OrderRequests(object):
+    """
+    交易连接的下单和撤单请求, 由订单调度器限速后发出
+    """
+
+    def __init__(self, connector):
+        self.connector = connector
+
+    def send_order(self, order):
+        return self.connector.insert_order(order)
+
+    def cancel_order(self, order_id, ticker=None, exchange=None):
+        return self.connector.action_order(ticker, exchange, order_id)
+
+
 class TradeConnector(TdApi):
     """
     CTP交易服务器连接组件
@@ -65,6 +81,8 @@ class TradeConnector(TdApi):
         self.connected = False
         self.logged_in = False
         self.is_running = False
+        self.readiness = GatewayReadiness()
+        self.order_scheduler = OrderScheduler(_OrderRequests(self))
 
     def next_request_id(self):
         self._request_id += 1
@@ -83,6 +101,8 @@ class TradeConnector(TdApi):
 
         self.connected = False
         self.logged_in = False
+        # 重试时清除上次连接和登陆的结果, 避免等待直接返回过期的失败或成功
+        self.readiness.reset()
 
         logging.debug(u'开始连接交易前置服务器')
 
@@ -102,7 +122,9 @@ class TradeConnector(TdApi):
 
         # 初始化api，连接前置机
         self.init()
-        sleep(3)
+        if not self.readiness.wait(ReadinessStage.connected):
+            logging.error(u'连接交易前置服务器超时.[trade_server_address:%s]' % ctp_td_address)
+            raise CTPError('Fail to connect to CTP Server')
 
         #     # self.login()
         #
@@ -130,7 +152,12 @@ class TradeConnector(TdApi):
             logging.error(u'登陆交易前置服务器异常.[return_code:%s]' % return_code)
             raise CTPError('Fail to login to CTP Server')
 
-        sleep(1)
+        if not self.readiness.wait(ReadinessStage.logged_in):
+            logging.error(u'登陆交易前置服务器失败或超时.[broker_id:%s/user_id:%s]' % (ctp_broker_id, ctp_user_id))
+            raise CTPError('Fail to login to CTP Server')
+
+        # 登陆后开始按流控发送排队的订单和撤单
+        self.order_scheduler.start()
 
         # 如果已经连接行情,则查询账户资金
         if self.connected:
@@ -138,7 +165,25 @@ class TradeConnector(TdApi):
 
     def send_order(self, order):
         """
-        发送订单委托
+        订单委托进入订单调度器排队, 按CTP流控限速发送
+
+        :param order:
+        """
+        assert order.order_id
+        self.order_scheduler.submit_order(order)
+        return order.order_id
+
+    def cancel_order(self, ticker, exchange, order_id):
+        """
+        撤单进入订单调度器排队, 撤单优先于新订单发送; 尚在排队的订单直接撤销, 不再发送
+
+        :return: 订单尚在排队并被撤销时返回False
+        """
+        return self.order_scheduler.submit_cancel(order_id, ticker=ticker, exchange=exchange)
+
+    def insert_order(self, order):
+        """
+        发送订单委托, 仅由订单调度器调用
 
         :param order:
         """
@@ -185,9 +230,9 @@ class TradeConnector(TdApi):
 
         return order_id
 
-    def cancel_order(self, ticker, exchange, order_id):
+    def action_order(self, ticker, exchange, order_id):
         """
-        撤单
+        撤单, 仅由订单调度器调用
 
         """
         request = dict()
@@ -214,9 +259,10 @@ class TradeConnector(TdApi):
         request['InvestorID'] = self._userID
 
         logging.debug(u'发送查询账户信息的请求.[request:%s]' % request)
-        self.reqQryTradingAccount(request, self.next_request_id())
-
-        sleep(1)
+        request_id = self.next_request_id()
+        self.readiness.register_query(request_id)
+        self.reqQryTradingAccount(request, request_id)
+        return request_id
 
     def query_position(self):
         """
@@ -281,7 +327,9 @@ class TradeConnector(TdApi):
         request = dict()
         request['BrokerID'] = self._brokerID
         request['InvestorID'] = self._userID
+        self.readiness.reset(ReadinessStage.settlement_confirmed)
         self.reqSettlementInfoConfirm(request, self.next_request_id())
+        return self.readiness.wait(ReadinessStage.settlement_confirmed)
 
     def get_trading_calendar(self):
         """
@@ -354,6 +402,7 @@ class TradeConnector(TdApi):
         self.connected = False
         self.logged_in = False
         self.is_running = False
+        self.order_scheduler.stop()
 
     ###################################################################################################################
     # 响应回调方法
@@ -365,6 +414,7 @@ class TradeConnector(TdApi):
         收到交易服务器连接成功消息。
         """
         self.connected = True
+        self.readiness.set(ReadinessStage.connected)
 
         logging.debug(u'与CTP交易前置服务器连接成功，开始登陆交易服务器')
 
@@ -375,6 +425,7 @@ class TradeConnector(TdApi):
         """服务器断开"""
         self.connected = False
         self.logged_in = False
+        self.readiness.reset()
 
         logging.debug(u'与CTP交易前置服务器断开连接.[n:%s]' % n)
 
@@ -408,7 +459,11 @@ class TradeConnector(TdApi):
                       % (self._request_id, self._userID, self._brokerID, self._frontID, self._sessionID,
                          error_message.decode('GBK'), data, error))
 
-        self.logged_in = True
+        if error.get('ErrorID', 0) == 0:
+            self.logged_in = True
+            self.readiness.set(ReadinessStage.logged_in)
+        else:
+            self.readiness.fail(ReadinessStage.logged_in, error)
 
         logging.debug(u'收到CTP交易服务器反馈消息.[n:%s,last:%s]' % (n, last))
         logging.debug(data)
@@ -417,6 +472,7 @@ class TradeConnector(TdApi):
     def onRspUserLogout(self, data, error, n, last):
         """登出回报"""
         self.logged_in = False
+        self.readiness.reset(ReadinessStage.logged_in, ReadinessStage.settlement_confirmed)
 
         logging.debug(u'用户登出CTP交易服务器.[n:%s,last:%s]' % (n, last))
         logging.debug(data)
@@ -563,6 +619,7 @@ class TradeConnector(TdApi):
         """资金账户查询回报"""
         logging.debug(data)
         logging.debug(error)
+        self.readiness.finish_query(n, last)
         # account = VtAccountData()
         # account.gatewayName = self.gatewayName
         #
@@ -651,6 +708,10 @@ class TradeConnector(TdApi):
         """确认结算信息回报"""
         logging.debug(data)
         logging.debug(error)
+        if error.get('ErrorID', 0) == 0:
+            self.readiness.set(ReadinessStage.settlement_confirmed)
+        else:
+            self.readiness.fail(ReadinessStage.settlement_confirmed, error)
 
     def onRspRemoveParkedOrder(self, data, error, n, last):
         """"""
@@ -2,11 +2,11 @@
 # **********************************************************************************#
 #     File:
 # **********************************************************************************#
-import time
+import traceback
 from lib.api.ctp import *
 from lib.core.ctp import *
 from lib.configs import logger
-from . ctp_base import get_temp_path
+from . ctp_base import get_temp_path, GatewayReadiness, ReadinessStage, DEFAULT_READINESS_TIMEOUT
 from ... event.event_base import EventType
 
 
@@ -47,7 +47,8 @@ class CtpTraderGateway(TdApi):
     CTP Trader Gateway.
     """
     def __init__(self, user_id=None, password=None, broker_id=None, address=None, 
-                 request_id=0, event_engine=None):
+                 request_id=0, event_engine=None, readiness_timeout=DEFAULT_READINESS_TIMEOUT,
+                 recorder=None):
         super(CtpTraderGateway, self).__init__()
         self.user_id = user_id
         self.password = password
@@ -62,6 +63,7 @@ class CtpTraderGateway(TdApi):
         self.auth_code = None
         self.user_product_info = None
         self.login_failed = False
+        self.login_error = None
         self.front_id = None
         self.session_id = None
 
@@ -70,6 +72,8 @@ class CtpTraderGateway(TdApi):
         self.symbolSizeDict = {}
 
         self.requireAuthentication = False
+        self.readiness = GatewayReadiness(timeout=readiness_timeout)
+        self.recorder = recorder
 
     def __setattr__(self, attribute, value):
         """
@@ -91,9 +95,9 @@ class CtpTraderGateway(TdApi):
             object.__setattr__(self, attribute, value)
 
     def connect(self, user_id=None, password=None, broker_id=None, address=None,
-                auth_code=None, user_product_info=None):
+                auth_code=None, user_product_info=None, timeout=None):
         """
-        Initialize connect.
+        Initialize connect, and wait until logged in and settlement confirmed.
 
         Args:
             user_id(string): user id.
@@ -102,9 +106,10 @@ class CtpTraderGateway(TdApi):
             address(string): address.
             auth_code(string): authentication code
             user_product_info(string): product info
+            timeout(float): seconds to wait for readiness, default to readiness timeout.
 
         Returns:
-
+            boolean: whether settlement confirmed
         """
         self.user_id = user_id or self.user_id
         self.password = password or self.password
@@ -116,6 +121,7 @@ class CtpTraderGateway(TdApi):
             self.user_id, self.broker_id, self.address))
 
         if not self.connection_status:
+            self.readiness.reset()
             path = get_temp_path(self.__class__.__name__ + '_')
             self.createFtdcTraderApi(path)
 
@@ -131,13 +137,19 @@ class CtpTraderGateway(TdApi):
                 self.authenticate()
             elif not self.login_status:
                 self.login()
-        time.sleep(0.1)
+        ready = self.readiness.wait(ReadinessStage.settlement_confirmed, timeout=timeout)
+        if not ready:
+            logger.warn('[connect] settlement not confirmed, user_id: {}, broker_id: {}'.format(
+                self.user_id, self.broker_id))
+        return ready
 
     def login(self):
         """
-        Request for logging in.
+        Request for logging in, a login that failed before fails again at once without a request.
         """
         if self.login_failed:
+            self.readiness.fail(ReadinessStage.logged_in, self.login_error)
+            self.readiness.fail(ReadinessStage.settlement_confirmed, self.login_error)
             return
 
         if self.user_id and self.password and self.broker_id:
@@ -149,8 +161,8 @@ class CtpTraderGateway(TdApi):
                 'Password': self.password,
                 'BrokerID': self.broker_id
             }
+            self.readiness.reset(ReadinessStage.logged_in, ReadinessStage.settlement_confirmed)
             self.reqUserLogin(request, self._generate_next_request_id())
-            self.settlement_confirm()
 
     def settlement_confirm(self):
         """
@@ -166,7 +178,6 @@ class CtpTraderGateway(TdApi):
                 'BrokerID': self.broker_id
             }
             self.reqSettlementInfoConfirm(request, self._generate_next_request_id())
-            time.sleep(0.1)
 
     def authenticate(self):
         """
@@ -185,13 +196,17 @@ class CtpTraderGateway(TdApi):
                 'UserProductInfo': self.user_product_info
             }
             self.request_id += 1
+            self.readiness.reset(ReadinessStage.authenticated, ReadinessStage.logged_in,
+                                 ReadinessStage.settlement_confirmed)
             self.reqAuthenticate(request, self.request_id)
-            time.sleep(0.1)
 
     @generate_request_id
     def query_account(self):
         """
-        Query the basic information of account.
+        Query the basic information of account, wait on readiness.wait_query for the response.
+
+        Returns:
+            int: request id
         """
         logger.info('[query_account] broker_id: {}, user_id: {}.'
                     ''.format(str(self.broker_id), str(self.user_id)))
@@ -199,13 +214,17 @@ class CtpTraderGateway(TdApi):
             'BrokerID': self.broker_id,
             'InvestorID': self.user_id
         }
+        self.readiness.register_query(self.request_id)
         self.reqQryTradingAccount(request, self.request_id)
-        time.sleep(0.1)
+        return self.request_id
 
     @generate_request_id
     def query_positions(self):
         """
-        Query positions information.
+        Query positions information, wait on readiness.wait_query for the response.
+
+        Returns:
+            int: request id
         """
         logger.info('[query_positions] broker_id: {}, user_id: {}.'
                     ''.format(str(self.broker_id), str(self.user_id)))
@@ -213,7 +232,9 @@ class CtpTraderGateway(TdApi):
             'BrokerID': self.broker_id,
             'InvestorID': self.user_id,
         }
+        self.readiness.register_query(self.request_id)
         self.reqQryInvestorPosition(request, self.request_id)
+        return self.request_id
 
     @generate_request_id
     def send_order(self, order):
@@ -281,6 +302,7 @@ class CtpTraderGateway(TdApi):
         Server connected.
         """
         self.connection_status = True
+        self.readiness.set(ReadinessStage.connected)
         if self.requireAuthentication:
             self.authenticate()
         else:
@@ -292,6 +314,7 @@ class CtpTraderGateway(TdApi):
         """
         self.connection_status = False
         self.login_status = False
+        self.readiness.reset()
         logger.debug('Disconnected with the CTP front server.[n:%s]' % n)
 
     def onRspUserLogin(self, data, error, n, last):
@@ -310,9 +333,14 @@ class CtpTraderGateway(TdApi):
             self.front_id = str(data['FrontID'])
             self.session_id = str(data['SessionID'])
             self.login_status = True
+            self.readiness.set(ReadinessStage.logged_in)
+            self.settlement_confirm()
         else:
             # 标识登录失败，防止用错误信息连续重复登录
             self.login_failed = True
+            self.login_error = error
+            self.readiness.fail(ReadinessStage.logged_in, error)
+            self.readiness.fail(ReadinessStage.settlement_confirmed, error)
 
     def onRspUserLogout(self, data, error, n, last):
         """
@@ -326,6 +354,7 @@ class CtpTraderGateway(TdApi):
         """
         if error['ErrorID'] == 0:
             self.login_status = False
+            self.readiness.reset(ReadinessStage.logged_in, ReadinessStage.settlement_confirmed)
 
     def onRspAuthenticate(self, data, error, n, last):
         """
@@ -341,9 +370,12 @@ class CtpTraderGateway(TdApi):
             self.front_id = str(data['FrontID'])
             self.session_id = str(data['SessionID'])
             self.auth_status = True
+            self.readiness.set(ReadinessStage.authenticated)
             self.login()
         else:
             self.auth_status = False
+            self.readiness.fail(ReadinessStage.authenticated, error)
+            self.readiness.fail(ReadinessStage.settlement_confirmed, error)
 
     def onRspQryTradingAccount(self, data, error, n, last):
         """
@@ -360,6 +392,7 @@ class CtpTraderGateway(TdApi):
             'account_response': response,
         }
         self.event_engine.publish(EventType.event_deal_with_account, **parameters)
+        self.readiness.finish_query(n, last)
         logger.info('[onRspQryTradingAccount] {}'.format(response))
 
     def onRspSettlementInfoConfirm(self, data, error, n, last):
@@ -373,6 +406,10 @@ class CtpTraderGateway(TdApi):
             last(unused): unused
         """
         response = SettlementConfirmResponse.from_ctp(data)
+        if error.get('ErrorID', 0) == 0:
+            self.readiness.set(ReadinessStage.settlement_confirmed)
+        else:
+            self.readiness.fail(ReadinessStage.settlement_confirmed, error)
         logger.info('[onRspSettlementInfoConfirm] {}'.format(response))
 
     def onRtnTrade(self, data):
@@ -382,6 +419,11 @@ class CtpTraderGateway(TdApi):
         Args:
             data(dict): response data.
         """
+        if self.recorder is not None:
+            try:
+                self.recorder.record('onRtnTrade', data)
+            except Exception:
+                logger.error('[onRtnTrade] record failed: {}'.format(traceback.format_exc()))
         response = TradeResponse.from_ctp(data)
         logger.info('[onRtnTrade] {}'.format(response))
 
@@ -400,6 +442,7 @@ class CtpTraderGateway(TdApi):
             'position_response': response,
         }
         self.event_engine.publish(EventType.event_deal_with_position, **parameters)
+        self.readiness.finish_query(n, last)
         logger.info('[onRspQryInvestorPosition] {}'.format(response))
 
     def onRspOrderInsert(self, data, error, n, last):
@@ -480,6 +523,11 @@ class CtpTraderGateway(TdApi):
 
     def onRtnOrder(self, data):
         """报单回报"""
+        if self.recorder is not None:
+            try:
+                self.recorder.record('onRtnOrder', data)
+            except Exception:
+                logger.error('[onRtnOrder] record failed: {}'.format(traceback.format_exc()))
         # 更新最大报单编号
         # newref = data['OrderRef']
         # self.orderRef = max(self.orderRef, int(newref))
@@ -2,14 +2,14 @@
 # **********************************************************************************#
 #     File:
 # **********************************************************************************#
-from . ctpGateway import CTPMarketGateway, CtpTraderGateway
+from . ctpGateway import CTPMarketGateway, CtpTraderGateway, CTPReplayGateway, OrderScheduler
 
 
 class CTPGateway(object):
 
     def __init__(self, user_id=None, password=None, broker_id=None, market_address=None,
                  trader_address=None, event_engine=None,
-                 market_gateway=None, trader_gateway=None):
+                 market_gateway=None, trader_gateway=None, order_scheduler=None, throttled=True):
         self.user_id = user_id
         self.password = password
         self.broker_id = broker_id
@@ -18,6 +18,8 @@ class CTPGateway(object):
         self.event_engine = event_engine
         self.market_gateway = market_gateway
         self.trader_gateway = trader_gateway
+        # without throttling orders go straight to the trader gateway, e.g. replays run faster than the front allows
+        self.order_scheduler = order_scheduler or (OrderScheduler(trader_gateway) if throttled else None)
 
     @classmethod
     def from_config(cls, ctp_config, event_engine=None):
@@ -49,6 +51,25 @@ class CTPGateway(object):
         ctp_config['event_engine'] = event_engine
         return cls(**ctp_config)
 
+    @classmethod
+    def from_replay(cls, file_paths, speed=None, event_engine=None, throttled=False):
+        """
+        Generate from recorded ctp files, the replay gateway serves as both market and trader gateway.
+
+        Args:
+            file_paths(string or list): recorded file paths
+            speed(float): replay speed multiplier, None or 0 for as fast as possible
+            event_engine(obj): event engine
+            throttled(boolean): whether orders go through the order scheduler within the flow control of the front,
+                                off by default so that tick to order latency measures the strategy only
+
+        Returns:
+            obj: CTPGateway
+        """
+        replay_gateway = CTPReplayGateway(file_paths=file_paths, speed=speed, event_engine=event_engine)
+        return cls(event_engine=event_engine, market_gateway=replay_gateway, trader_gateway=replay_gateway,
+                   throttled=throttled)
+
     def prepare_initialize(self, universe=None):
         """
         Prepare market gateway and trader gateway.
@@ -60,6 +81,35 @@ class CTPGateway(object):
         if universe:
             self.market_gateway.subscribe(universe)
         self.trader_gateway.connect()
+        if self.order_scheduler is not None:
+            self.order_scheduler.start()
+
+    def send_order(self, order):
+        """
+        Queue order to the trader gateway through the order scheduler, or send it directly if not throttled.
+
+        Args:
+            order(obj): order obj
+        """
+        if self.order_scheduler is None:
+            self.trader_gateway.send_order(order)
+            return
+        self.order_scheduler.submit_order(order)
+
+    def cancel_order(self, order_id):
+        """
+        Queue cancel order to the trader gateway through the order scheduler, or send it directly if not throttled.
+
+        Args:
+            order_id(string): order id
+
+        Returns:
+            boolean: False if the order never reached the front and was dropped from the queue
+        """
+        if self.order_scheduler is None:
+            self.trader_gateway.cancel_order(order_id)
+            return True
+        return self.order_scheduler.submit_cancel(order_id)
 
     def query_information(self):
         """
@@ -92,7 +92,7 @@ class PMSGateway(BasePMSGateway):
         self.order_info[account_id][order.order_id] = order
         logger.info('[PMS Gateway] [Send order] account_id: {}, order_id: {}, '
                     'subscribe trade response of current order.'.format(account_id, order.order_id))
-        self.ctp_gateway.trader_gateway.send_order(order)
+        self.ctp_gateway.send_order(order)
 
     def cancel_order(self, order_id, account_id=None):
         """
@@ -109,6 +109,7 @@ class PMSGateway(BasePMSGateway):
             return
         target_order.state = OrderState.CANCELED
         target_order.state_message = OrderStateMessage.CANCELED
+        self.ctp_gateway.cancel_order(order_id)
         logger.info('[PMS Gateway] [Cancel order] account_id: {}, order_id: {}, '
                     'order cancelled.'.format(account_id, order_id))
 
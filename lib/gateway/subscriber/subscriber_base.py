@@ -9,6 +9,43 @@ from lib.core.objects import ValueObject
 logging.getLogger("requests").setLevel(logging.WARNING)
 
 
+TICK_DATA_TYPES = {
+    'best_ask': float,
+    'best_bid': float,
+    'high_24h': float,
+    'last_size': float,
+    'low_24h': float,
+    'open_24h': float,
+    'price': float,
+    'symbol': str,
+    'sequence': int,
+    'side': str,
+    'time': str,
+    'receive_timestamp': int,
+    'trade_id': int,
+    'volume_24h': float,
+    'volume_30d': float,
+    'channel': str,
+}
+
+TRADE_DATA_TYPES = {
+    'account_id': str,
+    'amount': float,
+    'cost': float,
+    'exchange': str,
+    'exchange_account_id': str,
+    'exchange_order_id': str,
+    'exchange_trade_id': str,
+    'fee': float,
+    'fee_currency': str,
+    'order_id': str,
+    'price': float,
+    'side': str,
+    'symbol': str,
+    'timestamp': int,
+}
+
+
 class TickData(ValueObject):
     """
     Tick data
@@ -64,25 +101,7 @@ class TickData(ValueObject):
             key(string): key
             value(obj): value
         """
-        type_map = {
-            'best_ask': float,
-            'best_bid': float,
-            'high_24h': float,
-            'last_size': float,
-            'low_24h': float,
-            'open_24h': float,
-            'price': float,
-            'symbol': str,
-            'sequence': int,
-            'side': str,
-            'time': str,
-            'receive_timestamp': int,
-            'trade_id': int,
-            'volume_24h': float,
-            'volume_30d': float,
-            'channel': str,
-        }
-        object.__setattr__(self, key, type_map[key](value) if value is not None else value)
+        object.__setattr__(self, key, TICK_DATA_TYPES[key](value) if value is not None else value)
 
     @classmethod
     def from_subscribe(cls, item):
@@ -174,23 +193,7 @@ class TradeData(ValueObject):
             key(string): key
             value(obj): value
         """
-        type_map = {
-            'account_id': str,
-            'amount': float,
-            'cost': float,
-            'exchange': str,
-            'exchange_account_id': str,
-            'exchange_order_id': str,
-            'exchange_trade_id': str,
-            'fee': float,
-            'fee_currency': str,
-            'order_id': str,
-            'price': float,
-            'side': str,
-            'symbol': str,
-            'timestamp': int,
-        }
-        object.__setattr__(self, key, type_map[key](value) if value is not None else value)
+        object.__setattr__(self, key, TRADE_DATA_TYPES[key](value) if value is not None else value)
 
     @classmethod
     def from_subscribe(cls, item):
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os
 import re
 import DataAPI
 import logging
@@ -52,6 +53,10 @@ def _get_date(date_str, date_pattern='%Y-%m-%d'):
         return datetime.datetime.strptime(date_str, date_pattern)
 
 
+# (symbol, decade digit) --> normalized zce symbol
+_ZCE_SYMBOLS = dict()
+
+
 def _normalize_zce_symbol_by_date(symbol, target_date):
     """
     Normalize zce symbol according to a target date.
@@ -63,8 +68,12 @@ def _normalize_zce_symbol_by_date(symbol, target_date):
     Returns:
         string: transferred symbol
     """
-    match = XZCE_FUTURES_PATTERN.match(symbol)
-    return match.group(1) + target_date.strftime('%Y')[2] + match.group(2) if match else symbol
+    key = (symbol, target_date.year // 10 % 10)
+    normalized = _ZCE_SYMBOLS.get(key)
+    if normalized is None:
+        match = XZCE_FUTURES_PATTERN.match(symbol)
+        normalized = _ZCE_SYMBOLS[key] = match.group(1) + str(key[1]) + match.group(2) if match else symbol
+    return normalized
 
 
 def _normalize_zce_symbol_by_period(symbol, start, end):
@@ -387,16 +396,117 @@ class DigitalCurrencyAssetInfo(AssetInfo):
             self.symbol, _encoding_string(self.name), self.exchange, _str_date(self.list_date))
 
 
+class FuturesAssetTable(object):
+    """
+    Columnar futures base info, loaded once, with a stable integer row index by symbol
+    and by normalized zce symbol aliases.
+    """
+    def __init__(self, frame):
+        """
+        Args:
+            frame(DataFrame): futures base info as load_futures_base_info
+        """
+        self.columns = list(frame.columns)
+        self.data = {column: list() for column in self.columns}
+        self.symbol_index = dict()
+        self.append(frame)
+
+    @classmethod
+    def load(cls, snapshot=None):
+        """
+        Load all futures base info, from a local snapshot if available.
+
+        Args:
+            snapshot(string): local snapshot path, written after loading if not existed
+        """
+        if snapshot and os.path.exists(snapshot):
+            return cls(pd.read_pickle(snapshot))
+        frame = load_futures_base_info()
+        if snapshot:
+            frame.to_pickle(snapshot)
+        return cls(frame)
+
+    def __len__(self):
+        return len(self.data['symbol']) if 'symbol' in self.data else 0
+
+    def __contains__(self, symbol):
+        return symbol in self.symbol_index
+
+    def append(self, frame):
+        """
+        Append rows of symbols not in table, existing rows keep their index.
+
+        Args:
+            frame(DataFrame): futures base info
+        """
+        if frame is None or frame.empty:
+            return
+        records = frame.to_dict('records')
+        for column in frame.columns:
+            if column not in self.data:
+                self.columns.append(column)
+                self.data[column] = [None] * len(self)
+        for record in records:
+            symbol = record['symbol']
+            if symbol in self.symbol_index:
+                continue
+            row = len(self)
+            for column in self.columns:
+                self.data[column].append(record.get(column))
+            self.symbol_index[symbol] = row
+            if record.get('exchangeCD') == 'XZCE':
+                last_date = _get_date(record.get('lastTradeDate'))
+                if last_date is not None:
+                    self.symbol_index.setdefault(_normalize_zce_symbol_by_date(symbol, last_date), row)
+
+    def rows(self, symbols='all'):
+        """
+        Row indexes of symbols, unknown symbols are skipped.
+
+        Args:
+            symbols(string or iterable): symbols or 'all'
+        """
+        if symbols == 'all':
+            return range(len(self))
+        return sorted({self.symbol_index[symbol] for symbol in symbols if symbol in self.symbol_index})
+
+    def record(self, row):
+        """
+        Record of one row.
+
+        Returns:
+            dict: column --> value
+        """
+        return {column: self.data[column][row] for column in self.columns}
+
+
 class AssetService(ServiceInterface):
 
     """
     Asset service.
     """
+    futures_asset_table = None
+
     def __init__(self):
         super(AssetService, self).__init__()
         self.symbol_dictionary = {}
         self.symbol_type_table = {}
         self.all_symbols = set()
+        self.symbol_index = {}
+        self._assets_by_symbol = {}
+
+    @classmethod
+    def load_futures_asset_table(cls, snapshot=None, reload=False):
+        """
+        Load the futures asset table shared by all asset services.
+
+        Args:
+            snapshot(string): local snapshot path
+            reload(boolean): whether to reload
+        """
+        if cls.futures_asset_table is None or reload:
+            cls.futures_asset_table = FuturesAssetTable.load(snapshot=snapshot)
+        return cls.futures_asset_table
 
     @classmethod
     def from_symbols(cls, symbols, expand_continuous_future=False):
@@ -446,8 +556,22 @@ class AssetService(ServiceInterface):
             self.symbol_dictionary[symbol] = asset
         self.symbol_type_table.setdefault(asset.asset_type, set())
         self.symbol_type_table[asset.asset_type].add(asset)
+        self._assets_by_symbol.setdefault(asset.symbol, set()).add(asset)
+        self.symbol_index.setdefault(asset.symbol, len(self.symbol_index))
         self.all_symbols.add(asset.symbol)
 
+    def get_symbol_id(self, symbol):
+        """
+        Stable integer id of an included symbol.
+
+        Args:
+            symbol(string): symbol
+
+        Returns:
+            int: symbol id, None if not included
+        """
+        return self.symbol_index.get(symbol)
+
     def include_symbols(self, symbols, expand_continuous_future=False):
         """
         Update according to symbols.
@@ -507,16 +631,14 @@ class AssetService(ServiceInterface):
         Returns:
             list: all future asset list
         """
-        result = list()
-        if subset is 'all' or isinstance(subset, (list, set)) and len(subset) > 50:
-            futures_asset_data_raw = load_futures_base_info()
-        elif subset is not None and 0 < len(subset) <= 50:
-            futures_asset_data_raw = load_futures_base_info(subset)
-        else:
-            return result
-        for _, item in futures_asset_data_raw.iterrows():
-            result.append(FuturesAssetInfo.from_database(item))
-        return result
+        if subset is None or subset != 'all' and len(subset) == 0:
+            return list()
+        table = AssetService.load_futures_asset_table()
+        if subset != 'all':
+            missing = [symbol for symbol in subset if symbol not in table]
+            if missing:
+                table.append(load_futures_base_info(missing))
+        return [FuturesAssetInfo.from_database(table.record(row)) for row in table.rows(subset)]
 
     @staticmethod
     def all_continuous_future_assets(continuous_future_assets):
@@ -551,9 +673,15 @@ class AssetService(ServiceInterface):
         """
         if AssetType.CONTINUOUS_FUTURES in self.symbol_type_table:
             self.symbol_type_table[AssetType.CONTINUOUS_FUTURES] = set()
-        for k, v in self.symbol_dictionary.iteritems():
+        for k, v in self.symbol_dictionary.items():
             if isinstance(v, ContinuousFuturesAssetInfo):
                 self.symbol_dictionary.pop(k)
+        for symbol, assets in self._assets_by_symbol.items():
+            assets = {asset for asset in assets if not isinstance(asset, ContinuousFuturesAssetInfo)}
+            if assets:
+                self._assets_by_symbol[symbol] = assets
+            else:
+                self._assets_by_symbol.pop(symbol)
 
     @staticmethod
     def all_digital_currency_assets(subset='all'):
@@ -610,13 +738,15 @@ class AssetService(ServiceInterface):
         """
         result = set()
         asset_types = asset_type if isinstance(asset_type, list) else [asset_type]
+        if symbols is not None:
+            symbols = symbols if isinstance(symbols, (list, set)) else [symbols]
+            asset_types = set(asset_types)
+            for symbol in set(symbols):
+                result |= {a for a in self._assets_by_symbol.get(symbol, ()) if a.asset_type in asset_types}
+            return result
         for a_type in asset_types:
             if a_type in self.symbol_type_table:
                 result |= self.symbol_type_table[a_type]
-        if symbols is not None:
-            symbols = symbols if isinstance(symbols, (list, set)) else [symbols]
-            symbols = set(symbols)
-            result = {a for a in result if a.symbol in symbols}
         return result
 
     @staticmethod
@@ -653,6 +783,22 @@ class AssetService(ServiceInterface):
             asset = self.get_asset_info(symbol, date)
         return asset
 
+    def get_future_trade_params(self, symbol, custom_properties=None):
+        """
+        Get trade parameters of a futures symbol, included if not yet.
+
+        Args:
+            symbol(string): futures symbol
+            custom_properties(dict): custom properties
+
+        Returns:
+            tuple: (margin_rate, commission, multiplier, min_change_price_number, slippage)
+        """
+        asset = self.get_asset(symbol)
+        if not isinstance(asset, FuturesAssetInfo):
+            raise Errors.INVALID_ASSET_SYMBOL
+        return asset.get_trade_params(custom_properties)
+
     @staticmethod
     def is_valid_symbol(symbol):
         """
@@ -2,17 +2,27 @@
 # **********************************************************************************#
 #     File:　Data portal engine.
 # **********************************************************************************#
+from utils.metrics import METRIC_PREFIX, registry
 from . asset_service import (
     AssetService,
     AssetType
 )
 from . base_service import ServiceInterface
 from . calendar_service import CalendarService
+from . loader_dag import (
+    DEFAULT_LOADER_WORKERS,
+    LoaderDAG,
+    LoaderStage
+)
 from . market_service import MarketService
 from . universe_service import UniverseService
 from .. configs import logger
 
 
+data_load_gauge = registry.gauge(METRIC_PREFIX + 'data_load_seconds',
+                                 'Elapsed seconds of the last data portal load by stage.')
+
+
 class DataPortal(ServiceInterface):
     """
     DataPortal: 数据引擎，用以更新数据
@@ -28,13 +38,21 @@ class DataPortal(ServiceInterface):
         self.calendar_service = calendar_service or CalendarService()
         self.market_service = market_service or MarketService()
         self.universe_service = universe_service or UniverseService()
+        self.load_timings = dict()
 
-    def batch_load_data(self, sim_params, disable_service=None, **kwargs):
+    def batch_load_data(self, sim_params, disable_service=None, max_workers=DEFAULT_LOADER_WORKERS,
+                        minute_trading_days=None, **kwargs):
         """
-        Batch load according to sim_params.
+        Batch load according to sim_params, running independent stages concurrently:
+
+            calendar --> universe --> assets --> rebuild universe --> market --> daily bars
+            asset table ----------------^                                   \--> minute bars
+
         Args:
             sim_params(obj): sim_params
             disable_service(list): disable service
+            max_workers(int): max stages loading at the same time
+            minute_trading_days(list): trading days of minute bars to load alongside daily bars
             **kwargs: key-value parameters
         """
         logger.info('[DataPortal] Begin batch load data.')
@@ -43,27 +61,53 @@ class DataPortal(ServiceInterface):
         universe = sim_params.universe
         benchmark = sim_params.major_benchmark
         disable_service = disable_service or list()
-        self.calendar_service.batch_load_data(start, end)
-        trading_days = self.calendar_service.trading_days
-        if 'universe_service' not in disable_service:
+        loaded = dict()
+
+        def _load_calendar():
+            self.calendar_service.batch_load_data(start, end)
+
+        def _load_universe():
             self.universe_service.batch_load_data(universe=universe,
-                                                  trading_days=trading_days,
+                                                  trading_days=self.calendar_service.trading_days,
                                                   benchmark=benchmark)
             self.universe_service.full_universe_set |= set(sim_params.position_base)
-        if sim_params.accounts:
-            for account, config in sim_params.accounts.iteritems():
-                self.universe_service.full_universe_set |= set(config.position_base)
-        full_universe = self.universe_service.full_universe
-        if 'asset_service' not in disable_service:
-            self.asset_service.batch_load_data(full_universe, expand_continuous_future=True)
-            expanded_base_futures = self.asset_service.filter_symbols(AssetType.BASE_FUTURES)
-            self.universe_service.full_universe_set |= set(expanded_base_futures)
-        self.universe_service.rebuild_universe()
-        if 'market_service' not in disable_service:
-            self.market_service.batch_load_data(full_universe,
-                                                calendar_service=self.calendar_service,
-                                                asset_service=self.asset_service,
-                                                universe_service=self.universe_service)
+
+        def _load_assets():
+            if sim_params.accounts:
+                for account, config in sim_params.accounts.iteritems():
+                    self.universe_service.full_universe_set |= set(config.position_base)
+            loaded['full_universe'] = self.universe_service.full_universe
+            if 'asset_service' not in disable_service:
+                self.asset_service.batch_load_data(loaded['full_universe'], expand_continuous_future=True)
+                expanded_base_futures = self.asset_service.filter_symbols(AssetType.BASE_FUTURES)
+                self.universe_service.full_universe_set |= set(expanded_base_futures)
+
+        def _prepare_market():
+            self.market_service.prepare(loaded['full_universe'],
+                                        calendar_service=self.calendar_service,
+                                        asset_service=self.asset_service,
+                                        universe_service=self.universe_service)
+
+        loading_market = 'market_service' not in disable_service
+        stages = [
+            LoaderStage('calendar', _load_calendar),
+            LoaderStage('asset_table', AssetService.load_futures_asset_table,
+                        enabled='asset_service' not in disable_service),
+            LoaderStage('universe', _load_universe, ['calendar'],
+                        enabled='universe_service' not in disable_service),
+            LoaderStage('assets', _load_assets, ['universe', 'asset_table']),
+            LoaderStage('rebuild_universe', self.universe_service.rebuild_universe, ['assets']),
+            LoaderStage('market', _prepare_market, ['rebuild_universe'], enabled=loading_market),
+            LoaderStage('daily_bars',
+                        lambda: self.market_service.rolling_load_daily_data(self.calendar_service.all_trading_days),
+                        ['market'], enabled=loading_market),
+            LoaderStage('minute_bars',
+                        lambda: self.market_service.rolling_load_minute_data(minute_trading_days),
+                        ['daily_bars'], enabled=loading_market and bool(minute_trading_days)),
+        ]
+        self.load_timings = LoaderDAG(stages, max_workers=max_workers).run()
+        for stage_name, elapsed in self.load_timings.iteritems():
+            data_load_gauge.set(elapsed, stage=stage_name)
         logger.info('[DataPortal] End batch load data.')
         return self
 
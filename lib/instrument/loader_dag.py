@@ -0,0 +1,130 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Dependency-aware concurrent loader.
+# **********************************************************************************#
+import time
+import traceback
+from collections import OrderedDict
+from threading import Thread, Condition
+from .. configs import logger
+
+
+DEFAULT_LOADER_WORKERS = 4
+
+
+class LoaderStage(object):
+    """
+    One loading stage.
+    """
+    def __init__(self, name, func, dependencies=None, enabled=True):
+        """
+        Args:
+            name(string): stage name
+            func(callable): loading function without arguments
+            dependencies(list): names of stages to finish first
+            enabled(boolean): a disabled stage is skipped but still satisfies its dependents
+        """
+        self.name = name
+        self.func = func
+        self.dependencies = list(dependencies or [])
+        self.enabled = enabled
+
+
+class LoaderDAG(object):
+    """
+    Loader DAG: runs stages as soon as their dependencies are finished, with at most max_workers
+    stages running at a time, and records the elapsed seconds of each stage.
+    """
+    def __init__(self, stages=None, max_workers=DEFAULT_LOADER_WORKERS):
+        self.stages = OrderedDict()
+        self.max_workers = max(1, max_workers)
+        self.timings = dict()
+        for stage in stages or []:
+            self.add(stage)
+
+    def add(self, stage):
+        """
+        Add stage.
+
+        Args:
+            stage(LoaderStage): stage
+        """
+        if stage.name in self.stages:
+            raise ValueError('Duplicated loader stage {}.'.format(stage.name))
+        self.stages[stage.name] = stage
+        return self
+
+    def _check(self):
+        """
+        Check dependencies exist and contain no cycle.
+        """
+        visited, visiting = set(), set()
+
+        def _visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError('Loader stages have a cycle through {}.'.format(name))
+            if name not in self.stages:
+                raise ValueError('Unknown loader stage {}.'.format(name))
+            visiting.add(name)
+            for dependency in self.stages[name].dependencies:
+                _visit(dependency)
+            visiting.remove(name)
+            visited.add(name)
+
+        for stage_name in self.stages:
+            _visit(stage_name)
+
+    def run(self):
+        """
+        Run all stages, re-raising the first failure after running stages finished.
+
+        Returns:
+            dict: stage name --> elapsed seconds
+        """
+        self._check()
+        condition = Condition()
+        pending = list(self.stages)
+        finished, running, errors = set(), set(), list()
+
+        def _run_stage(stage):
+            start = time.time()
+            try:
+                if stage.enabled:
+                    stage.func()
+            except Exception as error:
+                logger.error('[LoaderDAG] stage {} failed: {}'.format(stage.name, traceback.format_exc()))
+                errors.append(error)
+            elapsed = time.time() - start
+            with condition:
+                self.timings[stage.name] = elapsed
+                running.discard(stage.name)
+                finished.add(stage.name)
+                condition.notify_all()
+
+        with condition:
+            while pending or running:
+                if errors and not running:
+                    break
+                ready = [] if errors else \
+                    [name for name in pending if set(self.stages[name].dependencies) <= finished]
+                for name in ready[:self.max_workers - len(running)]:
+                    pending.remove(name)
+                    running.add(name)
+                    thread = Thread(target=_run_stage, args=(self.stages[name],))
+                    thread.daemon = True
+                    thread.start()
+                condition.wait()
+        if errors:
+            raise errors[0]
+        logger.info('[LoaderDAG] stage timings: {}'.format(
+            ', '.join('{}: {:.3f}s'.format(name, self.timings[name]) for name in self.stages)))
+        return self.timings
+
+
+__all__ = [
+    'DEFAULT_LOADER_WORKERS',
+    'LoaderStage',
+    'LoaderDAG'
+]
@@ -7,6 +7,7 @@ import pandas as pd
 from collections import OrderedDict, defaultdict
 from copy import copy
 from utils.adjustment import *
+from utils.metrics import registry
 from utils.datetime import (
     get_end_date,
     get_previous_trading_date,
@@ -120,7 +121,7 @@ def _ast_slice(raw_data_dict, symbols, end_time_str, fields, start_time_str=None
     return result, time_bars
 
 
-def _rolling_load_data(data, trading_days, universe, max_cache_days, data_load_func, fields):
+def _rolling_load_data(data, trading_days, universe, max_cache_days, data_load_func, fields, cache_stats=None):
     """
     加载trading_days对应的行情数据，其中data中已有数据不做从重新加载
 
@@ -131,6 +132,7 @@ def _rolling_load_data(data, trading_days, universe, max_cache_days, data_load_f
         max_cache_days(int or None): 需要保留的data中原有数据的长度，如果为None则表示保留所有原有数据
         data_load_func(func: universe, trading_days, fields => dict of dict): 数据加载函数
         fields(list of str): 需要加载的数据字段
+        cache_stats(CacheStats): 记录trading_days中已加载(命中)与需加载(未命中)的交易日数
 
     Returns:
         dict of DataFrame, ast style: 滚动加载之后新的数据内容
@@ -140,6 +142,9 @@ def _rolling_load_data(data, trading_days, universe, max_cache_days, data_load_f
         trading_days_in_loaded = []
     else:
         trading_days_in_loaded = [datetime.datetime.strptime(t, '%Y-%m-%d') for t in data.values()[0].index]
+    if cache_stats is not None:
+        cached_days = set(trading_days) & set(trading_days_in_loaded)
+        cache_stats.add(hits=len(cached_days), misses=len(set(trading_days)) - len(cached_days))
     target_days = sorted(set(trading_days_in_loaded) | set(trading_days))
     if max_cache_days is not None:
         target_days = target_days[-max_cache_days:]
@@ -337,14 +342,32 @@ class MarketService(object):
         Returns:
             MarketService(obj): market service
         """
-        self.create_with(universe,
-                         market_service=self,
-                         universe_service=universe_service,
-                         asset_service=asset_service,
-                         calendar_service=calendar_service)
+        self.prepare(universe,
+                     calendar_service=calendar_service,
+                     universe_service=universe_service,
+                     asset_service=asset_service)
         self.rolling_load_daily_data(calendar_service.all_trading_days)
         return self
 
+    def prepare(self, universe=None, calendar_service=None, universe_service=None, asset_service=None):
+        """
+        Prepare market data list before loading daily or minute bars.
+
+        Args:
+            universe(list of universe): universe list
+            calendar_service(obj): calendar service
+            universe_service(obj): universe service
+            asset_service(obj): asset service
+
+        Returns:
+            MarketService(obj): market service
+        """
+        return self.create_with(universe,
+                                market_service=self,
+                                universe_service=universe_service,
+                                asset_service=asset_service,
+                                calendar_service=calendar_service)
+
     def subset(self, *args, **kwargs):
         """
         Subset the market service
@@ -666,7 +689,8 @@ class MarketData(object):
             asset_service()
         """
         self.daily_bars = _rolling_load_data(self.daily_bars, trading_days, self.universe, max_cache_days,
-                                             self._daily_bars_loader, self.daily_fields)
+                                             self._daily_bars_loader, self.daily_fields,
+                                             cache_stats=registry.cache('market_service.daily_bars'))
         self._daily_bars_loaded_days = [datetime.datetime.strptime(td, '%Y-%m-%d')
                                         for td in self.daily_bars[self._daily_bar_check_field].index]
         self._load_dividends(trading_days)
@@ -690,7 +714,8 @@ class MarketData(object):
             raise AttributeError('Exception in "MarketData.rolling_load_minute_data": '
                                  'minute increment load data must be in scope of daily trading data')
         self.minute_bars = _rolling_load_data(self.minute_bars, trading_days, self.universe, max_cache_days,
-                                              self._minute_bars_loader, self.minute_fields)
+                                              self._minute_bars_loader, self.minute_fields,
+                                              cache_stats=registry.cache('market_service.minute_bars'))
         self._minute_bars_loaded_days = [datetime.datetime.strptime(td, '%Y-%m-%d')
                                          for td in self.minute_bars[self._minute_bars_check_field].index]
         return self.minute_bars
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 import datetime
-from copy import copy
+import numpy as np
 from collections import deque, defaultdict
 from utils.linked_list import (
     LinkedList, Node
@@ -21,9 +21,90 @@ def is_collection(item):
     return isinstance(item, (list, tuple, set))
 
 
+def _logical_minus(mask_a, mask_b):
+    """
+    Mask of a and not b.
+    """
+    return mask_a & ~mask_b
+
+
+def _frozen(symbols):
+    """
+    Hashable form of optional symbols.
+    """
+    return None if symbols is None else frozenset(symbols)
+
+
+class SymbolIndex(object):
+    """
+    Fixed position of each symbol, growing by appending only so that existing masks stay valid.
+    """
+
+    def __init__(self, symbols=None):
+        self.symbols = list()
+        self.positions = dict()
+        self._symbol_array = None
+        if symbols:
+            self.extend(symbols)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def extend(self, symbols):
+        """
+        Append unknown symbols.
+
+        Args:
+            symbols(iterable): symbols
+        """
+        for symbol in symbols:
+            if symbol not in self.positions:
+                self.positions[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+                self._symbol_array = None
+
+    def mask(self, symbols):
+        """
+        Boolean mask of symbols.
+
+        Args:
+            symbols(iterable): symbols
+
+        Returns:
+            array: boolean mask over the index
+        """
+        symbols = symbols if is_collection(symbols) else list(symbols)
+        self.extend(symbols)
+        mask = np.zeros(len(self.symbols), dtype=bool)
+        mask[[self.positions[symbol] for symbol in symbols]] = True
+        return mask
+
+    def fit(self, mask):
+        """
+        Pad mask built before the index grew.
+        """
+        if len(mask) < len(self.symbols):
+            return np.concatenate([mask, np.zeros(len(self.symbols) - len(mask), dtype=bool)])
+        return mask
+
+    def to_symbols(self, mask):
+        """
+        Symbols of a mask.
+
+        Returns:
+            frozenset: symbols
+        """
+        if self._symbol_array is None:
+            self._symbol_array = np.array(self.symbols + [None], dtype=object)[:-1]
+        return frozenset(self._symbol_array[:len(mask)][mask])
+
+
 class UniverseService(object):
     """
     Universe service.
+
+    view is evaluated on boolean masks over a fixed symbol index, with masks memoized per (set, date)
+    and results per view arguments, until the underlying sets change.
     """
 
     def __init__(self, universe=None, trading_days=None, benchmarks=list(), init_universe_list=list()):
@@ -46,6 +127,13 @@ class UniverseService(object):
         self.st_dict = {}
         self.cached_factor_data = {}
 
+        # symbol masks and view results
+        self.symbol_index = SymbolIndex()
+        self._masks = {}
+        self._views = {}
+        self._view_version = 0
+        self._view_signature = None
+
     def batch_load_data(self, universe=None, trading_days=None, benchmark=None, **kwargs):
         """
         回测服务场景下预先“全量”load数据
@@ -109,6 +197,7 @@ class UniverseService(object):
             self.full_universe_set |= self.benchmarks
         # 必要的attribute清空
         self._clearing_universe_service_and_node()
+        self.invalidate_views()
         return self
 
     def _clearing_universe_service_and_node(self):
@@ -133,6 +222,7 @@ class UniverseService(object):
             self.dynamic_universe_dict[date] = univ - symbols_set
         for date, univ in self.dynamic_universe_ranked.iteritems():
             self.dynamic_universe_ranked[date] = univ - symbols_set
+        self.invalidate_views()
 
     def add_init_universe(self, init_universe):
         """
@@ -143,6 +233,43 @@ class UniverseService(object):
         """
         self.init_universe |= set(init_universe)
         self.full_universe_set |= self.init_universe
+        self.invalidate_views()
+
+    def invalidate_views(self):
+        """
+        Drop memoized masks and views, called when the underlying universes are changed in place.
+        """
+        self._view_version += 1
+        self._masks.clear()
+        self._views.clear()
+
+    def _check_view_signature(self):
+        """
+        Invalidate views when sets changed from outside, e.g. full_universe_set |= symbols.
+        """
+        signature = (self._view_version, len(self.full_universe_set), len(self.init_universe),
+                     len(self.benchmarks), len(self.l1_ban_list or ()), len(self.l4_ban_list or ()))
+        if signature != self._view_signature:
+            self._masks.clear()
+            self._views.clear()
+            self._view_signature = signature
+
+    def _mask_of(self, name, date=None):
+        """
+        Memoized mask of a universe set.
+
+        Args:
+            name(string): attribute name of the set, or of the dict of sets by date
+            date(datetime.datetime): date
+        """
+        key = (name, date)
+        mask = self._masks.get(key)
+        if mask is None:
+            symbols = getattr(self, name)
+            if date is not None:
+                symbols = symbols[date]
+            mask = self._masks[key] = self.symbol_index.mask(symbols)
+        return self.symbol_index.fit(mask)
 
     def view(self, current_date=None, remove_halt=False, st_level='ignore', with_benchmark=False,
              with_init_universe=False, ban_level=None, subset=None, mergeset=None, apply_sort=False,
@@ -165,32 +292,52 @@ class UniverseService(object):
             >> current_universe_2016_1_5 = universe_service.view(current_date=datetime(2016, 1, 5), with_benchmark=True)
             >> universe_2016_1_5 = universe_service.view(current_date=datetime.datetime(2016, 1, 5), with_benchmark=True)
         """
-        universe_result = copy(self.full_universe_set)
+        self._check_view_signature()
+        key = (current_date, remove_halt, st_level, with_benchmark, with_init_universe, ban_level,
+               _frozen(subset), _frozen(mergeset), _frozen(position_securities), apply_sort)
+        universe_result = self._views.get(key)
+        if universe_result is None:
+            universe_result = self._views[key] = \
+                self._evaluate_view(current_date, remove_halt, st_level, with_benchmark, with_init_universe,
+                                    ban_level, subset, mergeset, apply_sort, position_securities)
+        return list(universe_result) if apply_sort else set(universe_result)
+
+    def _evaluate_view(self, current_date, remove_halt, st_level, with_benchmark, with_init_universe,
+                       ban_level, subset, mergeset, apply_sort, position_securities):
+        """
+        Evaluate view by masks in the same order as sets, see view.
+        """
+        symbol_index = self.symbol_index
+        operations = list()
         if mergeset is not None:
-            universe_result |= set(mergeset)
+            operations.append((np.logical_or, symbol_index.mask(mergeset)))
         if subset is not None:
-            universe_result &= set(subset)
+            operations.append((np.logical_and, symbol_index.mask(subset)))
         if current_date is not None:
             assert isinstance(current_date, datetime.datetime), Errors.INVALID_CURRENT_DAY
-            universe_result &= self.dynamic_universe_dict[current_date]
+            operations.append((np.logical_and, self._mask_of('dynamic_universe_dict', current_date)))
         if len(position_securities) > 0:
-            universe_result |= set(position_securities)
+            operations.append((np.logical_or, symbol_index.mask(position_securities)))
         if with_benchmark:
-            universe_result |= self.benchmarks
+            operations.append((np.logical_or, self._mask_of('benchmarks')))
         if with_init_universe:
-            universe_result |= self.init_universe
+            operations.append((np.logical_or, self._mask_of('init_universe')))
         if remove_halt:
-            universe_result -= self.untradable_dict[current_date]
+            operations.append((_logical_minus, self._mask_of('untradable_dict', current_date)))
         if st_level == 'st':
-            universe_result &= self.st_dict[current_date]
+            operations.append((np.logical_and, self._mask_of('st_dict', current_date)))
         elif st_level == 'no_st':
-            universe_result -= self.st_dict[current_date]
+            operations.append((_logical_minus, self._mask_of('st_dict', current_date)))
         if self.l1_ban_list is not None and (ban_level == 'l1' or ban_level == 'l4'):
-            universe_result -= self.l1_ban_list
+            operations.append((_logical_minus, self._mask_of('l1_ban_list')))
         if self.l4_ban_list is not None and ban_level == 'l4':
-            universe_result -= self.l4_ban_list
+            operations.append((_logical_minus, self._mask_of('l4_ban_list')))
+        mask = symbol_index.fit(self._mask_of('full_universe_set'))
+        for operator, other in operations:
+            mask = operator(mask, symbol_index.fit(other))
+        universe_result = symbol_index.to_symbols(mask)
         if apply_sort:
-            universe_result = [e for e in self.dynamic_universe_ranked[current_date] if e in universe_result]
+            universe_result = tuple(e for e in self.dynamic_universe_ranked[current_date] if e in universe_result)
         return universe_result
 
     @property
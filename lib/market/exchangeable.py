@@ -0,0 +1,25 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Exchangeable symbols of pms agents, refreshed in background.
+# **********************************************************************************#
+from utils.refresh import RefreshedSet
+from .. configs import logger
+from .. data import database_api
+
+
+EXCHANGEABLE_REFRESH_INTERVAL = 60 * 30
+
+
+def _load_exchangeable_futures():
+    return database_api.get_current_exchangeable_futures()
+
+
+# loaded by FuturesPMSAgent.prepare at process startup, order checks read the last loaded set and never wait
+exchangeable_futures = RefreshedSet('exchangeable_futures', _load_exchangeable_futures,
+                                    interval=EXCHANGEABLE_REFRESH_INTERVAL, log=logger)
+
+
+__all__ = [
+    'EXCHANGEABLE_REFRESH_INTERVAL',
+    'exchangeable_futures'
+]
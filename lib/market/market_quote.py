@@ -6,7 +6,9 @@ import time
 from datetime import datetime
 from utils.dict import CompositeDict
 from utils.decorator import singleton
+from utils.error import Errors
 from .. configs import logger
+from .. core.enums import SecuritiesType
 from .. data.database_api import load_futures_rt_minute_data
 
 
@@ -89,6 +91,25 @@ class MarketQuote(object):
                     logger.error('publish bar data failed: %s' % (traceback.format_exc()))
             time.sleep(5)
 
+    def get_price_info(self, security_type=SecuritiesType.futures, universe=None):
+        """
+        Get the latest minute bar info by symbol.
+
+        Args:
+            security_type(string): securities type, futures only
+            universe(list): symbols, default the universe of quote, whose bars are refreshed if not loaded yet
+
+        Returns:
+            dict: symbol --> latest minute bar
+        """
+        if security_type != SecuritiesType.futures:
+            raise Errors.INVALID_SECURITIES_TYPE
+        if universe is not None:
+            return _get_minute_price_info(universe)
+        if self._bar_version not in self.bar_collection:
+            self._refresh_bar_collection()
+        return self.bar_collection[self._bar_version]
+
     def _bar_version_next(self):
         """
         Bar version next.
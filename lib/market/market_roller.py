@@ -7,8 +7,10 @@ import bisect
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from functools import partial
 from utils.error import Errors
 from utils.datetime import get_previous_trading_date
+from utils.metrics import registry
 from .. const import (
     BASE_FUTURES_PATTERN,
     CONTINUOUS_FUTURES_PATTERN,
@@ -18,11 +20,15 @@ from .. const import (
     MAX_CACHE_DAILY_PERIODS,
     ADJ_FACTOR,
 )
+from .. instrument.market_service import _ast_stylish
 
 MULTI_FREQ_PATTERN = re.compile('(\d+)m')
 EQUITY_RT_VALUE_FIELDS =\
     ['openPrice', 'closePrice', 'highPrice', 'lowPrice', 'turnoverVol', 'turnoverValue']
 EQUITY_RT_TIME_FIELDS = ['barTime', 'tradeTime']
+DAILY_CACHE_STATS = registry.cache('market_roller.daily')
+MINUTE_CACHE_STATS = registry.cache('market_roller.minute')
+DAILY_HISTORY_CACHE_STATS = registry.cache('market_roller.daily_history')
 
 
 def _tas_data_tick_expand(data, fields=None, tick_time_field='barTime'):
@@ -195,6 +201,193 @@ def _aggregate_at_multiple_data(at_minute_cache, begin_index, freq_number):
     return result
 
 
+class LazyFrames(dict):
+    """
+    Dict of DataFrames built on first access, so that reading a few keys does not pay for the others.
+    """
+    def __init__(self, builders):
+        """
+        Args:
+            builders(dict): key --> function without arguments returning the DataFrame
+        """
+        super(LazyFrames, self).__init__(builders)
+        self._pending = set(builders)
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if key in self._pending:
+            value = value()
+            dict.__setitem__(self, key, value)
+            self._pending.discard(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._pending.discard(key)
+        dict.__setitem__(self, key, value)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        value = self[key]
+        dict.__delitem__(self, key)
+        return value
+
+    def itervalues(self):
+        for key in self:
+            yield self[key]
+
+    def iteritems(self):
+        for key in self:
+            yield key, self[key]
+
+    def values(self):
+        return list(self.itervalues())
+
+    def items(self):
+        return list(self.iteritems())
+
+
+class DailyHistoryCache(object):
+    """
+    Columnar daily bars of one MarketData: arrays of shape (day, symbol) built once from its daily_bars,
+    so that a history window is an array slice instead of a DataFrame selection.
+    """
+    def __init__(self, market_data):
+        """
+        Args:
+            market_data(MarketData): market data with daily bars loaded
+        """
+        self.market_data = market_data
+        self.signature = None
+        self.time_bars = list()
+        self.symbols = list()
+        self.columns = dict()
+        self.arrays = dict()
+
+    def refresh(self):
+        """
+        Rebuild arrays if daily bars of market data have been reloaded.
+        """
+        loaded_days = self.market_data.daily_bars_loaded_days
+        signature = (len(loaded_days), loaded_days[-1] if loaded_days else None)
+        if DAILY_HISTORY_CACHE_STATS.record(signature == self.signature):
+            return self
+        daily_bars = self.market_data.daily_bars
+        check_frame = daily_bars[self.market_data._daily_bar_check_field]
+        self.time_bars = check_frame.index.tolist()
+        self.symbols = check_frame.columns.tolist()
+        self.columns = {symbol: column for column, symbol in enumerate(self.symbols)}
+        self.arrays = {field: frame.reindex(index=check_frame.index, columns=check_frame.columns).values
+                       for field, frame in daily_bars.iteritems() if isinstance(frame, pd.DataFrame)}
+        self.signature = signature
+        return self
+
+    def window(self, symbols, fields, end_time_str, time_range):
+        """
+        History window of time_range days till end_time_str.
+
+        Args:
+            symbols(list or None): symbols, None for all symbols
+            fields(list): fields
+            end_time_str(string): end date, formatted as '%Y-%m-%d'
+            time_range(int): window length
+
+        Returns:
+            tuple: dict of (day, symbol) array, symbols, time bars
+        """
+        end_pos = bisect.bisect_right(self.time_bars, end_time_str)
+        start_pos = max(end_pos - time_range, 0)
+        if symbols is None:
+            symbols, columns = self.symbols, slice(None)
+        else:
+            symbols = [symbol for symbol in symbols if symbol in self.columns]
+            columns = [self.columns[symbol] for symbol in symbols]
+        raw_data_dict = {field: self.arrays[field][start_pos:end_pos, columns] for field in fields
+                         if field in self.arrays}
+        return raw_data_dict, symbols, self.time_bars[start_pos:end_pos]
+
+
+def _frame_of(data, index, columns):
+    return pd.DataFrame(data, index=index, columns=columns)
+
+
+def _history_stylish(raw_data_dict, symbols, time_bars, fields, style, rtype='frame'):
+    """
+    Stylish a daily history window, sharing array views and building DataFrames lazily.
+
+    Args:
+        raw_data_dict(dict of ndarray): ast style (day, symbol) arrays
+        symbols(list): symbols
+        time_bars(list): time bars
+        fields(list): fields
+        style('ast'/'sat'/'tas'): style
+        rtype('frame'/'array'): rtype
+
+    Returns:
+        dict: dict of array, or LazyFrames
+    """
+    fields = [field for field in fields if field in raw_data_dict]
+    if style == 'tas':
+        return _ast_stylish(raw_data_dict, symbols, time_bars, fields, style, rtype=rtype)
+    if rtype == 'array':
+        time_array = np.array(time_bars)
+        if style == 'ast':
+            history_data = {field: {symbol: raw_data_dict[field][:, i] for (i, symbol) in enumerate(symbols)}
+                            for field in fields}
+            history_data['time'] = {symbol: time_array for symbol in symbols}
+        else:
+            history_data = dict()
+            for i, symbol in enumerate(symbols):
+                history_data[symbol] = {field: raw_data_dict[field][:, i] for field in fields}
+                history_data[symbol]['time'] = time_array
+        return history_data
+    if style == 'ast':
+        return LazyFrames({field: partial(_frame_of, raw_data_dict[field], time_bars, symbols) for field in fields})
+    return LazyFrames({symbol: partial(_frame_of, {field: raw_data_dict[field][:, i] for field in fields},
+                                       time_bars, fields)
+                       for (i, symbol) in enumerate(symbols)})
+
+
+def _sat_frame_of(at_data, fields):
+    return pd.DataFrame({field: at_data[field] for field in fields}, index=at_data['time'], columns=fields)
+
+
+def _ast_frame_of(sat_data, field):
+    return pd.DataFrame({symbol: pd.Series(at_data[field], index=at_data['time'])
+                         for symbol, at_data in sat_data.iteritems() if field in at_data})
+
+
+def _minute_history_stylish(sat_data, fields, style, rtype='frame'):
+    """
+    Stylish a minute history window of sat_slice with time.
+
+    Args:
+        sat_data(dict): symbol --> field --> array, including 'time'
+        fields(list): fields
+        style('ast'/'sat'): style
+        rtype('frame'/'array'): rtype
+
+    Returns:
+        dict: dict of array, or LazyFrames
+    """
+    if style == 'sat':
+        if rtype == 'array':
+            return sat_data
+        return LazyFrames({symbol: partial(_sat_frame_of, at_data, [f for f in fields if f in at_data])
+                           for symbol, at_data in sat_data.iteritems()})
+    if style == 'ast':
+        if rtype == 'array':
+            history_data = {field: {symbol: at_data[field] for symbol, at_data in sat_data.iteritems()
+                                    if field in at_data} for field in fields}
+            history_data['time'] = {symbol: at_data['time'] for symbol, at_data in sat_data.iteritems()}
+            return history_data
+        return LazyFrames({field: partial(_ast_frame_of, sat_data, field) for field in fields})
+    raise AttributeError('unknown history style {} for MarketRoller'.format(style))
+
+
 class MarketRoller(object):
 
     tas_daily_cache = None
@@ -215,12 +408,13 @@ class MarketRoller(object):
         self.minute_bar_loading_rate = minute_bar_loading_rate
         self.debug = debug
         self.paper = paper
+        self.daily_history_caches = dict()
 
     def prepare_daily_data(self, current_date, extend_loading_days=1):
         """
         依据当前时间和更新频率准备行情数据
         """
-        if not self.tas_daily_cache or current_date not in self.tas_daily_cache:
+        if not DAILY_CACHE_STATS.record(bool(self.tas_daily_cache) and current_date in self.tas_daily_cache):
             current_index = self.trading_days.index(current_date)
             offset_index = min(current_index + self.daily_bar_loading_rate - 2, len(self.trading_days) - 1)
             end_date = self.trading_days[offset_index]
@@ -295,7 +489,7 @@ class MarketRoller(object):
         """
         依据当前时间和更新频率准备行情数据
         """
-        if not self.tas_minute_cache or current_date not in self.tas_minute_cache:
+        if not MINUTE_CACHE_STATS.record(bool(self.tas_minute_cache) and current_date in self.tas_minute_cache):
             self.tas_minute_cache = dict()
             current_index = self.trading_days.index(current_date)
             # 准备loading_rate天数(含当天)的minute_cache，offset_index要 - 1
@@ -514,6 +708,74 @@ class MarketRoller(object):
             raise AttributeError('unknown slice type {} for MarketRoller'.format(style))
         return result
 
+    def daily_history(self, symbols, fields, end_date, time_range, style='sat', rtype='frame',
+                      f_adj=None, s_adj=None):
+        """
+        Daily history window served from the columnar daily caches of market data.
+
+        Args:
+            symbols(list or None): symbols, None for all symbols
+            fields(list of str): fields
+            end_date(datetime.datetime): last trading day of the window
+            time_range(int): window length
+            style('ast'/'sat'/'tas'): style
+            rtype('frame'/'array'): dict of array, or dict of DataFrame built on first access
+            f_adj(string): futures adj type
+            s_adj(string): stock adj type
+
+        Returns:
+            dict: formatted as style and rtype
+        """
+        end_time_str = end_date.strftime('%Y-%m-%d')
+        raw_data_dict, window_symbols, time_bars = dict(), list(), None
+        for market_data in self.market_service.market_data_list:
+            if market_data is None or not market_data.daily_bars:
+                continue
+            cache = self.daily_history_caches.get(market_data.asset_type)
+            if cache is None or cache.market_data is not market_data:
+                cache = self.daily_history_caches[market_data.asset_type] = DailyHistoryCache(market_data)
+            data, data_symbols, data_time_bars = cache.refresh().window(symbols, fields, end_time_str, time_range)
+            if not data_symbols:
+                continue
+            data, data_time_bars = market_data.adjust(data, data_symbols, data_time_bars,
+                                                      f_adj=f_adj, s_adj=s_adj, freq='d')
+            if time_bars is None:
+                raw_data_dict, time_bars = data, data_time_bars
+            elif data_time_bars != time_bars:
+                raise ValueError('Exception in "MarketRoller.daily_history": '
+                                 'daily bars of market data are not aligned!')
+            else:
+                raw_data_dict = {field: np.hstack([raw_data_dict[field], data[field]]) for field in raw_data_dict}
+            window_symbols = window_symbols + data_symbols
+        return _history_stylish(raw_data_dict, window_symbols, time_bars or list(), fields, style, rtype=rtype)
+
+    def minute_history(self, symbols, fields, date, minute, time_range, freq='m', style='sat', rtype='frame'):
+        """
+        Minute or multi-frequency history window till minute, served from the minute caches.
+
+        Args:
+            symbols(list or None): symbols, None for all symbols
+            fields(list of str): fields
+            date(datetime.datetime): clearing date
+            minute(string): last minute of the window, such as '13:00'
+            time_range(int): window length
+            freq(string): 'm' or multiple frequency such as '5m'
+            style('ast'/'sat'): style
+            rtype('frame'/'array'): dict of array, or dict of DataFrame built on first access
+
+        Returns:
+            dict: formatted as style and rtype
+        """
+        if minute > '16:00':
+            trade_date = self.market_service.calendar_service.previous_trading_day_map[date]
+        else:
+            trade_date = date
+        end_time = '{} {}'.format(trade_date.strftime('%Y-%m-%d'), minute)
+        prepare_dates = [day for day in self.market_service.minute_bars_loaded_days if day <= date]
+        sat_data = self.sat_slice(prepare_dates, end_time, time_range, fields=fields,
+                                  symbols='all' if symbols is None else symbols, with_time=True, freq=freq)
+        return _minute_history_stylish(sat_data, fields, style, rtype=rtype)
+
     def sat_slice(self, prepare_dates, end_time, time_range, fields=None, symbols='all', with_time=False, freq='m'):
         if MULTI_FREQ_PATTERN.match(freq) and freq != '1m':
             freq_cache_dates = self.multi_freq_cache_dates.get(freq)
@@ -550,14 +812,15 @@ class MarketRoller(object):
         result = {}
         symbols = sat_array_data.keys() if symbols is None or symbols == 'all' else symbols
         for symbol in symbols:
-            at_data = sat_array_data[symbol]
-            if len(at_data) == 0:
+            at_data = sat_array_data.get(symbol)
+            if not at_data:
                 continue
             end_idx = bisect.bisect_right(at_data['tradeTime'], end_time)
+            start_idx = max(end_idx - time_range, 0)
             local_fields = at_data.keys() if fields is None else list(set(fields) & set(at_data.keys()))
-            st_result = {a: at_data[a][end_idx - time_range: end_idx] for a in local_fields}
+            st_result = {a: at_data[a][start_idx: end_idx] for a in local_fields}
             if with_time:
-                st_result['time'] = at_data['tradeTime'][end_idx - time_range: end_idx]
+                st_result['time'] = at_data['tradeTime'][start_idx: end_idx]
             result[symbol] = st_result
         return result
 
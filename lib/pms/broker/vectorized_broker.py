@@ -0,0 +1,337 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Vectorized daily playback of target-position or target-weight strategies.
+# **********************************************************************************#
+from __future__ import division
+import numpy as np
+from ... trade.cost import Commission, Slippage
+
+
+class TargetType(object):
+    """
+    Target type of vectorized playback
+    """
+    position = 'position'
+    weight = 'weight'
+
+    ALL = [position, weight]
+
+
+class PlaybackResult(object):
+    """
+    Result of a vectorized playback, all matrices are (day, symbol) arrays.
+    """
+    def __init__(self, trading_days, symbols, positions, trade_amounts, trade_prices,
+                 commissions, slippages, margins, pnl, portfolio_value, cash):
+        """
+        Args:
+            trading_days(list): trading days
+            symbols(list): symbols
+            positions(array): positions after trading
+            trade_amounts(array): signed filled amounts, positive for buy
+            trade_prices(array): transact prices with slippage
+            commissions(array): commissions
+            slippages(array): slippage costs
+            margins(array): margins of futures positions, zeros for securities
+            pnl(array): profit and loss
+            portfolio_value(array): portfolio value by day
+            cash(array): cash or available margin by day
+        """
+        self.trading_days = trading_days
+        self.symbols = symbols
+        self.positions = positions
+        self.trade_amounts = trade_amounts
+        self.trade_prices = trade_prices
+        self.commissions = commissions
+        self.slippages = slippages
+        self.margins = margins
+        self.pnl = pnl
+        self.portfolio_value = portfolio_value
+        self.cash = cash
+
+    def to_dict(self):
+        """
+        To dict.
+        """
+        return self.__dict__
+
+
+def _forward_fill(prices):
+    """
+    Forward fill nan prices along days.
+    """
+    prices = np.array(prices, dtype=float)
+    valid = ~np.isnan(prices)
+    indices = np.where(valid, np.arange(prices.shape[0])[:, None], 0)
+    np.maximum.accumulate(indices, axis=0, out=indices)
+    return prices[indices, np.arange(prices.shape[1])]
+
+
+class VectorizedBroker(object):
+    """
+    Vectorized daily broker: fills target positions at open prices and marks to market at close prices,
+    computing fills, commissions, slippages, margins and pnl as (day, symbol) array operations.
+
+    Securities are traded in lots on buying and marked by cash plus position value; futures are marked by
+    daily settlement of the margin account, with open and close commissions of Commission.
+
+    Like the event driven brokers, trades are capped by the daily volume if volumes are given, and days of
+    one price (high equal to low) moving up or down from the previous close block buying or selling if high
+    and low prices are given. Trades are also capped by cash as the event driven brokers do, symbol by symbol
+    in the order of symbols: buying of securities is cut to the cash, and opening of futures beyond the margin
+    available at the open price is rejected, while closing goes ahead. The caps run day by day, cap_by_cash
+    False takes targets as affordable and keeps playback of target positions vectorized across days.
+    Slippage is applied here only, the event driven brokers fill at the open price.
+    """
+    def __init__(self, commission=None, slippage=None, futures=False, multipliers=None,
+                 margin_rates=None, lot_size=100, cap_by_cash=True):
+        """
+        Args:
+            commission(Commission): commission
+            slippage(Slippage): slippage
+            futures(boolean): whether symbols are futures
+            multipliers(array like): contract multipliers by symbol, futures only
+            margin_rates(array like): margin rates by symbol, futures only
+            lot_size(int): lot size of buying securities
+            cap_by_cash(boolean): whether to cap trades by cash of securities or available margin of futures
+        """
+        self.commission = commission or Commission()
+        self.slippage = slippage or Slippage()
+        self.futures = futures
+        self.multipliers = multipliers
+        self.margin_rates = margin_rates
+        self.lot_size = 1 if futures else lot_size
+        self.cap_by_cash = cap_by_cash
+
+    def _contract_params(self, symbol_count):
+        multipliers = np.ones(symbol_count) if self.multipliers is None \
+            else np.asarray(self.multipliers, dtype=float)
+        margin_rates = np.zeros(symbol_count) if self.margin_rates is None \
+            else np.asarray(self.margin_rates, dtype=float)
+        return multipliers, margin_rates
+
+    def _round_lots(self, target, previous):
+        """
+        Round the buying part of target to lot size.
+        """
+        delta = target - previous
+        if self.lot_size > 1:
+            delta = np.where(delta > 0, np.floor(delta / self.lot_size) * self.lot_size, delta)
+        else:
+            delta = np.trunc(delta)
+        return previous + delta
+
+    @staticmethod
+    def _trade_ceilings(open_prices, close_prices, volumes, high_prices, low_prices):
+        """
+        Largest amounts to buy and to sell by day, None if trades are not capped.
+
+        Returns:
+            tuple: (day, symbol) buy ceilings and sell ceilings
+        """
+        if volumes is None and (high_prices is None or low_prices is None):
+            return None
+        ceilings = np.full(open_prices.shape, np.inf) if volumes is None \
+            else np.nan_to_num(np.asarray(volumes, dtype=float))
+        if high_prices is None or low_prices is None:
+            return ceilings, ceilings
+        previous_close = np.vstack([close_prices[:1], close_prices[:-1]])
+        locked = np.asarray(high_prices, dtype=float) == np.asarray(low_prices, dtype=float)
+        buy_ceilings = np.where(locked & (open_prices > previous_close), 0., ceilings)
+        sell_ceilings = np.where(locked & (open_prices < previous_close), 0., ceilings)
+        return buy_ceilings, sell_ceilings
+
+    def _cap(self, target, previous, ceilings, day):
+        """
+        Cap trading of one day towards target by the ceilings, then round to lot size.
+        """
+        if ceilings is not None:
+            buy_ceilings, sell_ceilings = ceilings
+            target = previous + np.clip(target - previous, -sell_ceilings[day], buy_ceilings[day])
+        return self._round_lots(target, previous)
+
+    def _cap_by_cash(self, target, previous, open_prices, previous_close, multipliers, margin_rates,
+                     portfolio_value, cash):
+        """
+        Cap trading of one day towards target by cash, symbol by symbol as the event driven brokers transact orders.
+        Securities buy within the cash left after the trades of the symbols before. Futures open only if the whole
+        opening amount fits the margin available at the open price, after the previous positions are marked to the
+        open and the trades of the symbols before.
+
+        Args:
+            portfolio_value(float): portfolio value at the previous close
+            cash(float): cash at the previous close, securities only
+        """
+        target = target.copy()
+        tradable = ~np.isnan(open_prices)
+        trade_amounts = np.where(tradable, target - previous, 0.)
+        if self.futures:
+            prices = np.where(tradable, open_prices, previous_close)
+            market_value = prices * multipliers
+            margins = market_value * margin_rates
+            open_commissions = \
+                self.commission.calculate_futures_commission(market_value, offset_flag='open') * np.ones_like(prices)
+            close_commissions = \
+                self.commission.calculate_futures_commission(market_value, offset_flag='close') * np.ones_like(prices)
+            available = portfolio_value + np.nan_to_num(previous * (prices - previous_close) * multipliers).sum() - \
+                np.nan_to_num(np.abs(previous) * margins).sum()
+            for symbol in np.flatnonzero(trade_amounts):
+                amount, holding = abs(trade_amounts[symbol]), previous[symbol]
+                close_amount = min(amount, abs(holding)) if holding * trade_amounts[symbol] < 0 else 0.
+                open_amount = amount - close_amount
+                available += close_amount * (margins[symbol] - close_commissions[symbol])
+                cost = margins[symbol] + open_commissions[symbol]
+                if open_amount and cost > 0 and open_amount > np.floor(available / cost):
+                    target[symbol] = holding + np.sign(trade_amounts[symbol]) * close_amount
+                else:
+                    available -= open_amount * cost
+        else:
+            slippages = self.slippage.calculate_stock_slippage(open_prices) * np.ones_like(open_prices)
+            buy_costs = open_prices + slippages + self.commission.calculate_stock_commission(open_prices, 1)
+            sell_proceeds = open_prices - slippages - self.commission.calculate_stock_commission(open_prices, -1)
+            for symbol in np.flatnonzero(trade_amounts):
+                amount = trade_amounts[symbol]
+                if amount < 0:
+                    cash -= amount * sell_proceeds[symbol]
+                    continue
+                if buy_costs[symbol] > 0:
+                    amount = min(amount, max(np.floor(cash / buy_costs[symbol] / self.lot_size) * self.lot_size, 0.))
+                target[symbol] = previous[symbol] + amount
+                cash -= amount * buy_costs[symbol]
+        return target
+
+    def _transact(self, previous, target, open_prices, multipliers):
+        """
+        Transact one or more days of targets.
+
+        Returns:
+            tuple: trade amounts, trade prices, commissions, slippages
+        """
+        tradable = ~np.isnan(open_prices)
+        open_prices = np.where(tradable, open_prices, 0.)
+        trade_amounts = np.where(tradable, target - previous, 0.)
+        direction = np.sign(trade_amounts)
+        amounts = np.abs(trade_amounts)
+        if self.futures:
+            market_value = open_prices * multipliers
+            slippage_per_lot = self.slippage.calculate_futures_slippage(market_value) * np.ones_like(market_value)
+            trade_prices = open_prices + direction * slippage_per_lot / multipliers
+            close_amounts = np.where(previous * trade_amounts < 0, np.minimum(amounts, np.abs(previous)), 0.)
+            open_amounts = amounts - close_amounts
+            commissions = \
+                self.commission.calculate_futures_commission(market_value, offset_flag='open') * open_amounts + \
+                self.commission.calculate_futures_commission(market_value, offset_flag='close') * close_amounts
+            slippages = slippage_per_lot * amounts
+        else:
+            slippage_per_share = self.slippage.calculate_stock_slippage(open_prices) * np.ones_like(open_prices)
+            trade_prices = open_prices + direction * slippage_per_share
+            commissions = np.where(
+                direction > 0,
+                self.commission.calculate_stock_commission(open_prices, 1),
+                self.commission.calculate_stock_commission(open_prices, -1)) * amounts
+            slippages = slippage_per_share * amounts
+        return trade_amounts, trade_prices, commissions, slippages
+
+    def _evaluate(self, initial_value, positions, trade_amounts, trade_prices,
+                  commissions, close_prices, multipliers, margin_rates):
+        """
+        Mark to market by day.
+
+        Returns:
+            tuple: margins, pnl, portfolio value, cash
+        """
+        previous_positions = np.vstack([np.zeros((1, positions.shape[1])), positions[:-1]])
+        previous_close = np.vstack([close_prices[:1], close_prices[:-1]])
+        holding_pnl = np.nan_to_num(previous_positions * (close_prices - previous_close))
+        trading_pnl = np.nan_to_num(trade_amounts * (close_prices - trade_prices))
+        pnl = (holding_pnl + trading_pnl) * multipliers - commissions
+        portfolio_value = initial_value + np.cumsum(pnl.sum(axis=1))
+        if self.futures:
+            margins = np.nan_to_num(np.abs(positions) * close_prices * multipliers * margin_rates)
+            cash = portfolio_value - margins.sum(axis=1)
+        else:
+            margins = np.zeros_like(positions)
+            cash = portfolio_value - np.nan_to_num(positions * close_prices).sum(axis=1)
+        return margins, pnl, portfolio_value, cash
+
+    def playback(self, targets, open_prices, close_prices, initial_value,
+                 target_type=TargetType.position, trading_days=None, symbols=None,
+                 volumes=None, high_prices=None, low_prices=None):
+        """
+        Playback targets by daily bars.
+
+        Args:
+            targets(array like): (day, symbol) target positions or target weights of portfolio value
+            open_prices(array like): (day, symbol) open prices, nan if not tradable
+            close_prices(array like): (day, symbol) close or settlement prices
+            initial_value(float): initial portfolio value
+            target_type(string): TargetType.position or TargetType.weight
+            trading_days(list): trading days
+            symbols(list): symbols
+            volumes(array like): (day, symbol) largest amounts to trade, not capped if not specified
+            high_prices(array like): (day, symbol) high prices, for blocking trades on limit moves
+            low_prices(array like): (day, symbol) low prices, for blocking trades on limit moves
+
+        Returns:
+            PlaybackResult: playback result
+        """
+        targets = np.asarray(targets, dtype=float)
+        open_prices = np.asarray(open_prices, dtype=float)
+        close_prices = _forward_fill(close_prices)
+        multipliers, margin_rates = self._contract_params(targets.shape[1])
+        ceilings = self._trade_ceilings(open_prices, close_prices, volumes, high_prices, low_prices)
+        if target_type not in TargetType.ALL:
+            raise ValueError('Exception in "VectorizedBroker": target_type must be in {}!'.format(TargetType.ALL))
+        if target_type == TargetType.position and self.lot_size == 1 and ceilings is None and not self.cap_by_cash:
+            positions = _forward_fill(np.vstack([np.zeros((1, targets.shape[1])),
+                                                 np.where(np.isnan(open_prices), np.nan, targets)]))[1:]
+            positions = np.trunc(positions)
+        else:
+            positions = self._playback_days(targets, open_prices, close_prices, initial_value, target_type,
+                                            multipliers, margin_rates, ceilings)
+        previous_positions = np.vstack([np.zeros((1, positions.shape[1])), positions[:-1]])
+        trade_amounts, trade_prices, commissions, slippages = \
+            self._transact(previous_positions, positions, open_prices, multipliers)
+        margins, pnl, portfolio_value, cash = \
+            self._evaluate(initial_value, positions, trade_amounts, trade_prices, commissions,
+                           close_prices, multipliers, margin_rates)
+        return PlaybackResult(trading_days, symbols, positions, trade_amounts, trade_prices,
+                              commissions, slippages, margins, pnl, portfolio_value, cash)
+
+    def _playback_days(self, targets, open_prices, close_prices, initial_value, target_type, multipliers,
+                       margin_rates, ceilings=None):
+        """
+        Positions held after trading day by day towards target positions, or target weights of the previous
+        portfolio value, within the ceilings and the cash. Days without open price keep previous positions.
+        """
+        positions = np.zeros_like(targets)
+        previous = np.zeros(targets.shape[1])
+        portfolio_value = cash = initial_value
+        for day in range(targets.shape[0]):
+            tradable = ~(np.isnan(open_prices[day]) | np.isnan(targets[day]))
+            if target_type == TargetType.weight:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    target = targets[day] * portfolio_value / (open_prices[day] * multipliers)
+            else:
+                target = targets[day]
+            target = np.where(tradable, target, previous)
+            current = self._cap(target, previous, ceilings, day)
+            previous_close = close_prices[day - 1] if day else close_prices[day]
+            if self.cap_by_cash:
+                current = self._cap_by_cash(current, previous, open_prices[day], previous_close, multipliers,
+                                            margin_rates, portfolio_value, cash)
+            positions[day] = current
+            trade_amounts, trade_prices, commissions, _ = \
+                self._transact(previous, current, open_prices[day], multipliers)
+            pnl = np.nan_to_num(previous * (close_prices[day] - previous_close)) + \
+                np.nan_to_num(trade_amounts * (close_prices[day] - trade_prices))
+            portfolio_value += (pnl * multipliers - commissions).sum()
+            cash -= (np.nan_to_num(trade_amounts * trade_prices) + commissions).sum()
+            previous = current
+        return positions
+
+__all__ = [
+    'TargetType',
+    'PlaybackResult',
+    'VectorizedBroker'
+]
@@ -3,7 +3,6 @@
 #     File: PMS entity file.
 #   Author: Myron
 # **********************************************************************************#
-import time
 import numpy as np
 from copy import copy
 from utils.linked_list import Node
@@ -12,6 +11,7 @@ from utils.datetime import (
     get_latest_trading_date
 )
 from utils.decorator import singleton
+from utils.tracing import traced
 from utils.dict import *
 from .. base import *
 from ... configs import logger
@@ -23,12 +23,14 @@ from ... core.enums import (
 )
 from ... data.database_api import *
 from ... market.market_quote import MarketQuote
+from ... market.exchangeable import exchangeable_futures
 from ... trade.order import (
     Order,
     OrderState,
     OrderStateMessage
 )
 from ... instrument.asset_service import AssetService
+from .. sharding import ShardedExecutor
 
 
 asset_service = AssetService()
@@ -44,111 +46,181 @@ class FuturesPMSAgent(object):
     position_info = DefaultDict(PositionSchema(date=clock.current_date.strftime('%Y%m%d')))
     order_info = DefaultDict(OrderSchema(date=clock.current_date.strftime('%Y%m%d')))
     trade_info = DefaultDict(TradeSchema(date=clock.current_date.strftime('%Y%m%d')))
-    _current_exchangeable = []
-    current_exchangeable_flag = None
 
     @property
     def current_exchangeable(self):
         """
-        Current exchangeable futures.
+        Current exchangeable futures, a frozenset refreshed in background, None if not loaded yet.
         """
-        cur_time = time.time()
-        if not self.current_exchangeable_flag and cur_time - self.current_exchangeable_flag > 60 * 30:
-            self._current_exchangeable = get_current_exchangeable_futures()
-            self.current_exchangeable_flag = cur_time
-        return self._current_exchangeable
+        return exchangeable_futures.value
 
     def prepare(self):
         """
-        Prepare when service is loading.
+        Prepare when a service process is starting: load exchangeable futures and start refreshing them.
         """
-        pass
+        exchangeable_futures.prepare()
 
-    def pre_trading_day(self, force_date=None):
+    def pre_trading_day(self, force_date=None, portfolio_ids=None, executor=None):
         """
-        盘前处理: load collections, synchronize portfolio, and dump info to database
+        盘前处理: load collections, synchronize portfolio, and dump info to database, sharded by portfolios
 
         Args:
             force_date(datetime.datetime): specific a base date
+            portfolio_ids(list): portfolio ids, default all futures portfolios
+            executor(ShardedExecutor): executor of portfolio shards, default by settlement config
+
+        Returns:
+            ShardReport: errors and timings of shards
         """
         date = force_date or clock.clearing_date
         message = 'Begin pre trading day: '+date.strftime('%Y-%m-%d')
         logger.info('[FUTURES] [PRE TRADING DAY]'+message)
-        futures_portfolio_ids = query_portfolio_ids_by_(SecuritiesType.futures)
-        delete_redis_([SchemaType.position, SchemaType.order], futures_portfolio_ids)
-        position_info = query_by_ids_('mongodb', SchemaType.position, date, futures_portfolio_ids)
-        invalid_portfolios = [key for key in position_info if key not in futures_portfolio_ids]
+        futures_portfolio_ids = self._futures_portfolio_ids(query_portfolio_ids_by_(SecuritiesType.futures),
+                                                            portfolio_ids)
+        executor = executor or ShardedExecutor()
+        report = executor.run('futures_pms_agent.pre_trading_day', self._pre_trading_day_shard,
+                              futures_portfolio_ids, date)
+        # contracts listed for the new trading day, readers keep the previous set until swapped
+        exchangeable_futures.refresh()
+        self.clear()
+        end_msg = 'End pre trading day: '+date.strftime('%Y-%m-%d')
+        logger.info('[FUTURES] [PRE TRADING DAY]'+end_msg)
+        report.raise_for_errors()
+        return report
+
+    @staticmethod
+    def _futures_portfolio_ids(futures_portfolio_ids, portfolio_ids=None):
+        """
+        Futures portfolio ids within portfolio_ids if specified.
+        """
+        if portfolio_ids is None:
+            return futures_portfolio_ids
+        futures_portfolio_ids = set(futures_portfolio_ids)
+        return [portfolio_id for portfolio_id in list_wrap_(portfolio_ids) if portfolio_id in futures_portfolio_ids]
+
+    def _pre_trading_day_shard(self, portfolio_ids, date):
+        """
+        Pre trading day of one shard of portfolios, without touching the shared info of agent.
+
+        Args:
+            portfolio_ids(list): portfolio ids of the shard
+            date(datetime.datetime): base date
+
+        Returns:
+            int: number of portfolios whose position loaded
+        """
+        delete_redis_([SchemaType.position, SchemaType.order], portfolio_ids)
+        position_info = query_by_ids_('mongodb', SchemaType.position, date, portfolio_ids)
+        invalid_portfolios = [key for key in portfolio_ids if key not in position_info]
         if invalid_portfolios:
             invalid_msg = 'Position not loaded'+', '.join(invalid_portfolios)
-            logger.info('[SECURITY] [PRE TRADING DAY]'+invalid_msg)
+            logger.info('[FUTURES] [PRE TRADING DAY]'+invalid_msg)
         dump_to_('redis', SchemaType.position, position_info) if position_info else None
-        order_info = query_by_ids_('mongodb', SchemaType.order, date, futures_portfolio_ids)
+        order_info = query_by_ids_('mongodb', SchemaType.order, date, portfolio_ids)
         dump_to_('redis', SchemaType.order, order_info) if order_info else None
-        self.clear()
-        end_msg = 'End pre trading day: '+date.strftime('%Y-%m-%d')
-        logger.info('[FUTURES] [PRE TRADING DAY]'+end_msg)
+        return len(position_info)
 
+    @traced('futures_pms_agent.accept_orders')
     def accept_orders(self, orders):
         """
         Interface to accept orders from outside. Things to be done: 1) do orders pre_check;
                                                                     2) dump orders to database;
                                                                     3) send valid orders to broker for transact;
         Args:
-            orders(list): orders requests
+            orders(list): orders requests or Order objects
+
+        Returns:
+            list: checked orders, in the order of requests
         """
-        if isinstance(orders, dict):
+        if isinstance(orders, (dict, Order)):
             orders = [orders]
-        pms_orders = \
-            [self._order_check(Order.from_request(order)) for order in orders]
+        pms_orders = self._batch_order_check(
+            [order if isinstance(order, Order) else Order.from_request(order) for order in orders])
         update_('redis', SchemaType.order, pms_orders, date=clock.clearing_date)
         active_pms_orders = [order for order in pms_orders if order.state in OrderState.ACTIVE]
         self.pms_broker.futures_broker.accept_orders(active_pms_orders)
+        return pms_orders
 
-    def post_trading_day(self, force_date=None):
+    def post_trading_day(self, force_date=None, portfolio_ids=None, executor=None):
         """
-        盘后处理
+        盘后处理, sharded by portfolios
 
         Args:
             force_date(datetime.datetime): 执行非当前日期的force_date日post_trading_day
+            portfolio_ids(list): portfolio ids, default all futures portfolios
+            executor(ShardedExecutor): executor of portfolio shards, default by settlement config
+
+        Returns:
+            ShardReport: errors and timings of shards
         """
         date = force_date or clock.current_date
         msg = 'Begin post trading day: '+date.strftime('%Y-%m-%d')
         logger.info('[FUTURES] [POST TRADING DAY]'+msg)
         portfolio_info = query_portfolio_info_by_(SecuritiesType.futures)
-        position_info = query_by_ids_('mongodb', SchemaType.position, date, portfolio_info.keys())
-        self.close_expired_position(position_info)
-
-        benchmark_dict = {e.portfolio_id: e.benchmark for e in portfolio_info.itervalues()}
-        position_info = self.evaluate(position_info, benchmark_dict, force_date)
-        self.position_info.update(position_info)
-        if self.position_info:
-            dump_to_('all', SchemaType.position, self.position_info)
-        new_position_info = self._synchronize_position(date)
-        if new_position_info:
-            dump_to_('mongodb', SchemaType.position, new_position_info)
+        futures_portfolio_ids = self._futures_portfolio_ids(portfolio_info.keys(), portfolio_ids)
+        # prices are loaded once and shared by all shards
+        last_price_info = self._last_price_info(force_date) if futures_portfolio_ids else None
+        executor = executor or ShardedExecutor()
+        report = executor.run('futures_pms_agent.post_trading_day', self._post_trading_day_shard,
+                              futures_portfolio_ids, date, last_price_info)
         self.clear()
         msg = 'End post trading day: '+date.strftime('%Y-%m-%d')
         logger.info('[FUTURES] [POST TRADING DAY]'+msg)
+        report.raise_for_errors()
+        return report
 
-    def evaluate(self, position_info=None, force_evaluate_date=None):
+    def _post_trading_day_shard(self, portfolio_ids, date, last_price_info):
+        """
+        Post trading day of one shard of portfolios, without touching the shared info of agent.
+
+        Args:
+            portfolio_ids(list): portfolio ids of the shard
+            date(datetime.datetime): settlement date
+            last_price_info(dict): price info of evaluation
+
+        Returns:
+            int: number of portfolios settled
+        """
+        position_info = query_by_ids_('mongodb', SchemaType.position, date, portfolio_ids)
+        self.close_expired_position(position_info)
+        position_info = self.evaluate(position_info, last_price_info=last_price_info)
+        if position_info:
+            dump_to_('all', SchemaType.position, position_info)
+        new_position_info = self._synchronize_position(date, position_info)
+        if new_position_info:
+            dump_to_('mongodb', SchemaType.position, new_position_info)
+        return len(position_info)
+
+    @staticmethod
+    def _last_price_info(force_evaluate_date=None, universe=None):
+        """
+        Price info of evaluation: of the latest trading date of force_evaluate_date if specified, else the quote
+        of universe, default the universe of quote.
+        """
+        if force_evaluate_date:
+            latest_trading_date = get_latest_trading_date(force_evaluate_date)
+            return load_equity_market_data(latest_trading_date)
+        market_quote = MarketQuote()
+        return market_quote.get_price_info(security_type=SecuritiesType.futures, universe=universe)
+
+    def evaluate(self, position_info=None, force_evaluate_date=None, last_price_info=None):
         """
         计算持仓市值、浮动盈亏以及当日用户权益
 
         Args:
             position_info(dict): 用户持仓数据
             force_evaluate_date(datetime.datetime): 是否强制对根据该日期进行估值
+            last_price_info(dict): 估值价格, 默认根据force_evaluate_date加载
 
         Returns:
             position_info(dict): 更新之后的持仓数据
         """
         if not position_info:
             return position_info
-        if force_evaluate_date:
-            latest_trading_date = get_latest_trading_date(force_evaluate_date)
-            last_price_info = load_equity_market_data(latest_trading_date)
-        else:
-            market_quote = MarketQuote()
-            last_price_info = market_quote.get_price_info(security_type=SecuritiesType.futures)
+        if last_price_info is None:
+            universe = list({symbol for position_schema in position_info.itervalues()
+                             for symbol in position_schema.positions})
+            last_price_info = self._last_price_info(force_evaluate_date, universe=universe)
 
         for portfolio_id, position_schema in position_info.iteritems():
             total_position_margin = 0
@@ -183,8 +255,9 @@ class FuturesPMSAgent(object):
             return not asset_service.get_asset_info(future_symbol).is_active_within(
                 start=clock.current_date, exclude_last_date=True)
 
-        # orders_to_close group by portfolio_id
+        # orders_to_close group by portfolio_id, checked as one batch
         orders_to_close = DefaultDict(list())
+        orders_to_check = list()
         for portfolio_id, position_schema in position_info.iteritems():
             for symbol, position in position_schema.positions.iteritems():
                 order_time = ' '.join([clock.current_date.strftime('%Y%m%d'), clock.current_minute])
@@ -198,7 +271,7 @@ class FuturesPMSAgent(object):
                         order = Order(symbol=symbol, amount=long_amount, direction=-1, offset_flag='close',
                                       portfolio_id=portfolio_id, order_time=order_time,
                                       state=OrderState.ORDER_SUBMITTED)
-                        self._order_check(order)
+                        orders_to_check.append(order)
                         orders_to_close[portfolio_id].append(order)
                     if short_amount and not np.isnan(short_amount):
                         msg = '{}: The contract {} is expiring and the system ' \
@@ -207,8 +280,9 @@ class FuturesPMSAgent(object):
                         order = Order(symbol=symbol, amount=short_amount, direction=1, offset_flag='close',
                                       portfolio_id=portfolio_id, order_time=order_time,
                                       state=OrderState.ORDER_SUBMITTED)
-                        self._order_check(order)
+                        orders_to_check.append(order)
                         orders_to_close[portfolio_id].append(order)
+        self._batch_order_check(orders_to_check)
         return orders_to_close
 
     def close_expired_position(self, position_info):
@@ -258,9 +332,13 @@ class FuturesPMSAgent(object):
         self.order_info.clear()
         self.trade_info.clear()
 
-    def _synchronize_position(self, date=None):
+    def _synchronize_position(self, date=None, position_info=None):
         """
         同步昨结算持仓信息
+
+        Args:
+            date(datetime.datetime): settlement date
+            position_info(dict): position info to synchronize, default the info of agent
         """
         # here is current date
         date = date or clock.current_date
@@ -276,33 +354,69 @@ class FuturesPMSAgent(object):
             value.daily_return = 0.
             return key, value
 
-        return dict_map(_update_date, copy(self.position_info))
+        return dict_map(_update_date, copy(self.position_info if position_info is None else position_info))
 
-    def _order_check(self, order):
+    def _batch_order_check(self, orders, position_info=None):
+        """
+        Check orders of one batch. Positions of all portfolios closing are fetched by one query, and the closable
+        amounts taken by accepted close orders are reserved across the batch, so that close orders of the same
+        position never exceed it together.
+
+        Args:
+            orders(list): orders
+            position_info(dict): positions of the batch, queried if not specified
+
+        Returns:
+            list: checked orders
+        """
+        if position_info is None:
+            close_portfolio_ids = list({order.portfolio_id for order in orders if order.offset_flag == 'close'})
+            position_info = query_from_('redis', SchemaType.position, portfolio_id=close_portfolio_ids) \
+                if close_portfolio_ids else dict()
+        reserved_amounts = DefaultDict(0)
+        return [self._order_check(order, position_info=position_info, reserved_amounts=reserved_amounts)
+                for order in orders]
+
+    def _order_check(self, order, position_info=None, reserved_amounts=None):
         """
         Check if the order is a valid security order
 
         Args:
             order(Order): order
+            position_info(dict): positions of the batch, queried for the order if not specified
+            reserved_amounts(dict): (portfolio_id, symbol, direction) --> closable amount reserved in the batch
         """
         order.order_time = ' '.join([clock.current_date.strftime('%Y%m%d'), clock.current_minute])
-        if order.symbol not in self.current_exchangeable:
+        current_exchangeable = self.current_exchangeable
+        if current_exchangeable is None:
+            # nothing loaded yet, the order is not checked against the symbols halted
+            order.state = OrderState.ERROR
+            order.state_message = OrderStateMessage.FAILED
+        elif order.symbol not in current_exchangeable:
             order.state = OrderState.REJECTED
             order.state_message = OrderStateMessage.NINC_HALT
         if order.order_amount == 0 or not isinstance(order.order_amount, int):
             order.state = OrderState.REJECTED
             order.state_message = OrderStateMessage.INVALID_AMOUNT
         if order.offset_flag == 'close':
+            if position_info is None:
+                position_info = query_from_('redis', SchemaType.position, portfolio_id=order.portfolio_id)
+            reserved_amounts = DefaultDict(0) if reserved_amounts is None else reserved_amounts
+            reserved_key = (order.portfolio_id, order.symbol, order.direction)
             available_amount = 0
-            position_info = query_from_('redis', SchemaType.position,
-                                        portfolio_id=order.portfolio_id).get(order.portfolio_id)
-            if position_info:
-                position = position_info.positions.get(order.symbol)
+            position_schema = position_info.get(order.portfolio_id)
+            if position_schema:
+                position = position_schema.positions.get(order.symbol)
                 if position:
                     available_amount = position.long_amount if order.direction == -1 else position.short_amount
-            if order.order_amount > available_amount:
+            available_amount -= reserved_amounts[reserved_key]
+            # close amounts may be signed by direction, the closable amount is taken by their size
+            order_amount = abs(order.order_amount or 0)
+            if order_amount > available_amount:
                 order.state = OrderState.REJECTED
                 order.state_message = OrderStateMessage.NO_ENOUGH_AMOUNT
+            elif order.state in OrderState.ACTIVE:
+                reserved_amounts[reserved_key] += order_amount
         msg = order.__repr__()
         logger.debug('[FUTURES] [ACCEPT ORDERS]'+msg)
         return order
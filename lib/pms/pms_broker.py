@@ -6,6 +6,7 @@ from utils.error import Errors
 from . base import list_wrap_
 from . broker.futures_broker import FuturesBroker
 from . broker.security_broker import SecurityBroker
+from . broker.vectorized_broker import VectorizedBroker, TargetType
 from .. market.market_quote import MarketQuote
 from .. const import (
     STOCK_PATTERN,
@@ -115,3 +116,45 @@ class PMSBroker(object):
         """
         daily_data = market_quote.get_current_daily_bar_info(security_type=securities_type)
         return self.pms_brokers[securities_type].playback_daily(order_schema, position_schema, daily_data)
+
+    @staticmethod
+    def playback_daily_vectorized(targets, market_data, initial_value, target_type=TargetType.position,
+                                  securities_type=SecuritiesType.futures, commission=None, slippage=None,
+                                  multipliers=None, margin_rates=None, cap_volumes=True):
+        """
+        Playback target-position or target-weight strategies in daily market as array operations. Trades are
+        blocked on limit moves by the high and low prices of daily bars; cash and margin are not checked,
+        see VectorizedBroker.
+
+        Args:
+            targets(DataFrame): target positions or weights, trading days as index and symbols as columns
+            market_data(MarketData): market data with daily_bars loaded
+            initial_value(float): initial portfolio value
+            target_type(string): TargetType.position or TargetType.weight
+            securities_type(string): securities type
+            commission(Commission): commission
+            slippage(Slippage): slippage
+            multipliers(dict): symbol --> contract multiplier, futures only
+            margin_rates(dict): symbol --> margin rate, futures only
+            cap_volumes(boolean): whether to cap trades by the daily turnover volume
+
+        Returns:
+            PlaybackResult: playback result
+        """
+        trading_days, symbols = list(targets.index), list(targets.columns)
+        futures = securities_type == SecuritiesType.futures
+        broker = VectorizedBroker(
+            commission=commission, slippage=slippage, futures=futures,
+            multipliers=[multipliers[symbol] for symbol in symbols] if multipliers else None,
+            margin_rates=[margin_rates[symbol] for symbol in symbols] if margin_rates else None)
+        close_field = 'settlementPrice' if futures and 'settlementPrice' in market_data.daily_bars else 'closePrice'
+
+        def _field_values(field):
+            if field not in market_data.daily_bars:
+                return None
+            return market_data.daily_bars[field].reindex(index=trading_days, columns=symbols).values
+
+        return broker.playback(targets.values, _field_values('openPrice'), _field_values(close_field), initial_value,
+                               target_type=target_type, trading_days=trading_days, symbols=symbols,
+                               volumes=_field_values('turnoverVol') if cap_volumes else None,
+                               high_prices=_field_values('highPrice'), low_prices=_field_values('lowPrice'))
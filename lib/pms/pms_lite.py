@@ -70,6 +70,16 @@ class PMSLite(object):
         self.total_commission_info = total_commission_info or DefaultDict(DefaultDict(0))
         self.market_roller = market_roller
         self.settlement_info = settlement_info or DefaultDict(DefaultDict(list))
+        self.report_clients = list()
+
+    def add_report_client(self, report_client):
+        """
+        Feed snapshots after trading days and trades to the perf accumulator of report client.
+
+        Args:
+            report_client(ReportClient): report client
+        """
+        self.report_clients.append(report_client)
 
     def deal_with_position(self, position_response):
         """
@@ -96,8 +106,20 @@ class PMSLite(object):
     def deal_with_order(self):
         raise NotImplementedError
 
-    def deal_with_trade(self):
-        raise NotImplementedError
+    def deal_with_trade(self, trade=None, **kwargs):
+        """
+        Deal with trade of one account, matched by its account_id or portfolio_id.
+
+        Args:
+            trade(obj): trade object
+        """
+        account = getattr(trade, 'account_id', None) or getattr(trade, 'portfolio_id', None)
+        if account not in self.accounts:
+            logger.warn('[PMS Lite] [deal with trade] trade of unknown account {}, skipped.'.format(account))
+            return
+        self.trade_info[account][self.clock.clearing_date].append(trade)
+        for report_client in self.report_clients:
+            report_client.on_trade(trade)
 
     def prepare(self, securities_type=SecuritiesType.ALL):
         """
@@ -119,11 +141,17 @@ class PMSLite(object):
             securities_type(string): securities type
             force_date(datetime.datetime): specific a base date
             portfolio_ids(list): portfolio ID list
+
+        Returns:
+            dict: securities type --> ShardReport
         """
+        reports = dict()
         securities_type_list = list_wrap_(securities_type)
         for securities_type in securities_type_list:
             if securities_type == SecuritiesType.futures:
-                self.pms_lites[securities_type].pre_trading_day(force_date=force_date, portfolio_ids=portfolio_ids)
+                reports[securities_type] = \
+                    self.pms_lites[securities_type].pre_trading_day(force_date=force_date, portfolio_ids=portfolio_ids)
+        return reports
 
     def accept_orders(self, orders, securities_type=SecuritiesType.ALL):
         """
@@ -133,8 +161,11 @@ class PMSLite(object):
         Args:
             orders(list): orders requests
             securities_type(string): securities type
+
+        Returns:
+            list: checked orders, in the order of requests
         """
-        self.pms_lites[securities_type].accept_orders(orders)
+        return self.pms_lites[securities_type].accept_orders(orders)
 
     @staticmethod
     def cancel_orders(to_cancel_list=None):
@@ -143,24 +174,32 @@ class PMSLite(object):
 
         Args:
             to_cancel_list: cancel order list
+
+        Returns:
+            list: cancel status of each distinct (portfolio_id, order_id), with state None if order not found
         """
         import pandas as pd
         from lib.trade.order import OrderState, OrderStateMessage
         to_cancel_frame = pd.DataFrame(to_cancel_list).drop_duplicates()
         if to_cancel_frame.empty:
-            return
+            return list()
         group_result = to_cancel_frame.groupby('portfolio_id')
         order_schemas = query_from_('redis', SchemaType.order, portfolio_id=list(group_result.groups))
-        for portfolio_id, order_schema in order_schemas.iteritems():
-            frame = group_result.get_group(portfolio_id)
-            for order_id in frame.order_id:
-                order = order_schema.orders.get(order_id)
-                if not order:
-                    continue
-                if order.state in OrderState.ACTIVE:
-                    order._state = OrderState.CANCELED
-                    order._state_message = OrderStateMessage.CANCELED
-        dump_to_('redis', SchemaType.order, order_schemas)
+        statuses, canceled = list(), False
+        for portfolio_id, order_id in zip(to_cancel_frame.portfolio_id, to_cancel_frame.order_id):
+            order_schema = order_schemas.get(portfolio_id)
+            order = order_schema.orders.get(order_id) if order_schema else None
+            status = {'portfolio_id': portfolio_id, 'order_id': order_id, 'canceled': False, 'state': None}
+            if order and order.state in OrderState.ACTIVE:
+                order.state = OrderState.CANCELED
+                order.state_message = OrderStateMessage.CANCELED
+                status['canceled'] = canceled = True
+            if order:
+                status['state'] = order.state
+            statuses.append(status)
+        if canceled:
+            dump_to_('redis', SchemaType.order, order_schemas)
+        return statuses
 
     def post_trading_day(self, securities_type=SecuritiesType.ALL,
                          force_date=None,
@@ -172,11 +211,19 @@ class PMSLite(object):
             securities_type(string): securities type
             force_date(datetime.datetime): specific a base date
             portfolio_ids(list): portfolio id list
+
+        Returns:
+            dict: securities type --> ShardReport
         """
+        reports = dict()
         securities_type_list = list_wrap_(securities_type)
         for securities_type in securities_type_list:
             if securities_type == SecuritiesType.futures:
-                self.pms_lites[securities_type].post_trading_day(force_date=force_date, portfolio_ids=portfolio_ids)
+                reports[securities_type] = \
+                    self.pms_lites[securities_type].post_trading_day(force_date=force_date, portfolio_ids=portfolio_ids)
+        for report_client in self.report_clients:
+            report_client.on_snapshot(date=force_date)
+        return reports
 
     def clear(self, securities_type=SecuritiesType.ALL):
         """
@@ -0,0 +1,209 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Sharded execution of portfolio tasks, such as pre and post trading day.
+# **********************************************************************************#
+import time
+import traceback
+from threading import Thread
+from multiprocessing import Pool
+from utils.error import TradingException
+from utils.tracing import tracer
+from .. configs import logger, settlement_shards, settlement_mode
+from .. data.connections import connections
+
+
+SHARD_MODES = ('thread', 'process')
+
+# task and arguments inherited by forked shard processes
+_SHARD_TASK = None
+
+
+def partition_(portfolio_ids, shards):
+    """
+    Partition portfolio ids into at most shards disjoint lists of balanced sizes.
+
+    Args:
+        portfolio_ids(list): portfolio ids
+        shards(int): number of shards
+
+    Returns:
+        list: portfolio id lists, empty if no portfolio id
+    """
+    portfolio_ids = sorted(set(portfolio_ids))
+    if not portfolio_ids:
+        return list()
+    shards = max(1, min(shards, len(portfolio_ids)))
+    return [portfolio_ids[index::shards] for index in xrange(shards)]
+
+
+class ShardResult(object):
+    """
+    Result of one shard.
+    """
+    def __init__(self, shard, portfolio_ids, result=None, elapsed=0., error=None):
+        """
+        Args:
+            shard(int): shard index
+            portfolio_ids(list): portfolio ids of the shard
+            result(obj): value returned by the task
+            elapsed(float): elapsed seconds
+            error(string): traceback if the task failed
+        """
+        self.shard = shard
+        self.portfolio_ids = portfolio_ids
+        self.result = result
+        self.elapsed = elapsed
+        self.error = error
+
+    def __repr__(self):
+        return 'ShardResult(shard={}, portfolios={}, elapsed={:.3f}, failed={})'.format(
+            self.shard, len(self.portfolio_ids), self.elapsed, self.error is not None)
+
+
+class ShardReport(object):
+    """
+    Aggregated errors and timings of all shards of one task.
+    """
+    def __init__(self, name, shard_results, elapsed=0.):
+        """
+        Args:
+            name(string): task name
+            shard_results(list): ShardResult of each shard
+            elapsed(float): elapsed seconds of all shards
+        """
+        self.name = name
+        self.shard_results = shard_results
+        self.elapsed = elapsed
+
+    @property
+    def timings(self):
+        return {e.shard: e.elapsed for e in self.shard_results}
+
+    @property
+    def errors(self):
+        return {e.shard: e.error for e in self.shard_results if e.error is not None}
+
+    @property
+    def failed_portfolio_ids(self):
+        return [portfolio_id for e in self.shard_results if e.error is not None for portfolio_id in e.portfolio_ids]
+
+    def summary(self):
+        """
+        One line summary of timings and failed shards.
+        """
+        timings = [e.elapsed for e in self.shard_results]
+        return '{}: {} portfolios in {} shards, {:.3f}s elapsed, slowest shard {:.3f}s, {} shards failed.'.format(
+            self.name, sum(len(e.portfolio_ids) for e in self.shard_results), len(self.shard_results),
+            self.elapsed, max(timings) if timings else 0., len(self.errors))
+
+    def raise_for_errors(self):
+        """
+        Raise TradingException if any shard failed.
+        """
+        if self.errors:
+            raise TradingException('[{}] shards {} failed, portfolios: {}.'.format(
+                self.name, sorted(self.errors), ', '.join(self.failed_portfolio_ids)))
+
+
+def _execute_shard(task, shard, portfolio_ids, args):
+    start = time.time()
+    try:
+        result, error = task(portfolio_ids, *args), None
+    except Exception:
+        result, error = None, traceback.format_exc()
+        logger.error('[SHARD] shard {} failed: {}'.format(shard, error))
+    return ShardResult(shard, portfolio_ids, result=result, elapsed=time.time() - start, error=error)
+
+
+def _initialize_shard_process():
+    connections.reset()
+
+
+def _execute_shard_process(args):
+    shard, portfolio_ids = args
+    task, task_args = _SHARD_TASK
+    return _execute_shard(task, shard, portfolio_ids, task_args)
+
+
+class ShardedExecutor(object):
+    """
+    Sharded executor: partitions portfolio ids into shards and runs a task on each shard concurrently.
+
+    In thread mode, shards share the process and draw their own sockets from the pooled redis and mongodb
+    clients. In process mode, each shard runs in a forked process building its own connections, so tasks
+    have to persist their changes themselves and return picklable results only.
+    """
+    def __init__(self, shards=settlement_shards, mode=settlement_mode):
+        """
+        Args:
+            shards(int): maximum number of shards
+            mode(string): 'thread' or 'process'
+        """
+        if mode not in SHARD_MODES:
+            raise ValueError('Invalid shard mode {}, should be one of {}.'.format(mode, SHARD_MODES))
+        self.shards = max(1, shards)
+        self.mode = mode
+
+    def _run_threads(self, task, partitions, args):
+        results = [None] * len(partitions)
+
+        def _target(shard, portfolio_ids):
+            results[shard] = _execute_shard(task, shard, portfolio_ids, args)
+
+        threads = [Thread(target=_target, args=(shard, portfolio_ids), name='shard-{}'.format(shard))
+                   for shard, portfolio_ids in enumerate(partitions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def _run_processes(self, task, partitions, args):
+        global _SHARD_TASK
+        _SHARD_TASK = (task, args)
+        try:
+            pool = Pool(processes=len(partitions), initializer=_initialize_shard_process)
+            try:
+                return pool.map(_execute_shard_process, list(enumerate(partitions)), chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            _SHARD_TASK = None
+
+    def run(self, name, task, portfolio_ids, *args):
+        """
+        Run task on every shard of portfolio ids, a failed shard does not stop the others.
+
+        Args:
+            name(string): task name, used in logs and traced latencies
+            task(func): function of (portfolio_ids, *args)
+            portfolio_ids(list): portfolio ids
+            *args: other arguments of task
+
+        Returns:
+            ShardReport: results, errors and timings of shards
+        """
+        partitions = partition_(portfolio_ids, self.shards)
+        start = time.time()
+        if len(partitions) <= 1:
+            shard_results = [_execute_shard(task, shard, e, args) for shard, e in enumerate(partitions)]
+        elif self.mode == 'thread':
+            shard_results = self._run_threads(task, partitions, args)
+        else:
+            shard_results = self._run_processes(task, partitions, args)
+        report = ShardReport(name, shard_results, elapsed=time.time() - start)
+        for shard_result in shard_results:
+            tracer.record('{}.shard'.format(name), shard_result.elapsed)
+        tracer.record(name, report.elapsed)
+        logger.info('[SHARD] ' + report.summary())
+        return report
+
+
+__all__ = [
+    'SHARD_MODES',
+    'partition_',
+    'ShardResult',
+    'ShardReport',
+    'ShardedExecutor'
+]
@@ -0,0 +1,79 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Benchmark return store
+# **********************************************************************************#
+from __future__ import division
+import numpy as np
+from utils.error import Errors
+
+
+class BenchmarkReturnStore(object):
+    """
+    Calendar aligned benchmark returns, loaded once per benchmark and shared across accounts and reports.
+    """
+    def __init__(self, market_service, trading_days):
+        """
+        Args:
+            market_service(obj): market service
+            trading_days(list): calendar trading days the returns are aligned to
+        """
+        self.market_service = market_service
+        self.trading_days = sorted(trading_days)
+        self._day_index = {date: index for index, date in enumerate(self.trading_days)}
+        self._returns = dict()
+
+    def _load_returns(self, benchmarks, end_date, time_range):
+        """
+        Load benchmark returns of time_range trading days till end_date in one query.
+
+        Returns:
+            array: returns of shape (time_range, len(benchmarks))
+        """
+        benchmark_data = self.market_service.slice(benchmarks, ['closePrice'], end_date,
+                                                   time_range=time_range + 1)
+        if 'closePrice' not in benchmark_data:
+            raise Errors.INVALID_BENCHMARK
+        prices = np.asarray(benchmark_data['closePrice'].reindex(columns=benchmarks), dtype=float)
+        return prices[1:] / prices[:-1] - 1
+
+    def prefetch(self, benchmarks):
+        """
+        Load returns of benchmarks not cached yet over the whole calendar.
+
+        Args:
+            benchmarks(list): benchmark symbols
+        """
+        missing = sorted(set(benchmarks) - set(self._returns))
+        if not missing or not self.trading_days:
+            return
+        returns = self._load_returns(missing, self.trading_days[-1], len(self.trading_days))
+        for column, benchmark in enumerate(missing):
+            self._returns[benchmark] = returns[:, column]
+
+    def get(self, benchmark, trading_days):
+        """
+        Get benchmark returns aligned with trading days.
+
+        Args:
+            benchmark(string): benchmark symbol
+            trading_days(list): trading days
+
+        Returns:
+            array: benchmark returns
+        """
+        indices = [self._day_index.get(date) for date in trading_days]
+        if None in indices:
+            return self._load_returns([benchmark], trading_days[-1], len(trading_days))[:, 0]
+        self.prefetch([benchmark])
+        return self._returns[benchmark][indices]
+
+    def clear(self):
+        """
+        Clear cached returns.
+        """
+        self._returns.clear()
+
+
+__all__ = [
+    'BenchmarkReturnStore'
+]
@@ -0,0 +1,220 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Incremental performance accumulator
+# **********************************************************************************#
+from __future__ import division
+from copy import copy
+from . risk_metrics import ANNUALIZATION_FACTOR, is_invalid
+
+
+class _PerfState(object):
+    """
+    Running statistics through one snapshot.
+    """
+    __slots__ = ['count', 'date', 'portfolio_value',
+                 'st_sum', 'st_square_sum', 'bm_sum', 'bm_square_sum', 'cross_sum',
+                 'diff_sum', 'diff_square_sum', 'st_value', 'bm_value',
+                 'peak_value', 'peak_date', 'max_drawdown', 'max_drawdown_peak_date', 'trough_date',
+                 'portfolio_value_sum']
+
+    def __init__(self, initial_value):
+        self.count = 0
+        self.date = None
+        self.portfolio_value = initial_value
+        self.st_sum = self.st_square_sum = 0.
+        self.bm_sum = self.bm_square_sum = 0.
+        self.cross_sum = 0.
+        self.diff_sum = self.diff_square_sum = 0.
+        self.st_value = self.bm_value = 1.
+        self.peak_value = 1.
+        self.peak_date = None
+        self.max_drawdown = 0.
+        self.max_drawdown_peak_date = None
+        self.trough_date = None
+        self.portfolio_value_sum = 0.
+
+    def __copy__(self):
+        state = _PerfState.__new__(_PerfState)
+        for key in self.__slots__:
+            setattr(state, key, getattr(self, key))
+        return state
+
+
+def _advance_value(value, ret):
+    """
+    Advance cumulative value, which stays 0 once it turns negative or invalid.
+    """
+    value *= 1. + ret
+    if value < 0 or value != value:
+        return 0.
+    return value
+
+
+def _sample_std(total, square_total, count):
+    """
+    Sample standard deviation from running sums.
+    """
+    if count < 2:
+        return None
+    variance = (square_total - total * total / count) / (count - 1)
+    return max(variance, 0.) ** 0.5
+
+
+class PerfAccumulator(object):
+    """
+    Incremental performance accumulator: ingests daily or intraday portfolio snapshots and trades
+    as they happen, and keeps running statistics so that reading perf is O(1).
+
+    A snapshot of the same date as the latest one replaces it, so intraday polling does not
+    accumulate partial days.
+    """
+    def __init__(self, initial_value, risk_free=0.035, keep_series=True):
+        """
+        Args:
+            initial_value(float): initial portfolio value
+            risk_free(float): risk free rate
+            keep_series(boolean): whether to keep return series for reports
+        """
+        self.initial_value = initial_value
+        self.risk_free = risk_free
+        self.keep_series = keep_series
+        self.trading_days = list()
+        self.returns = list()
+        self.benchmark_returns = list()
+        self.buy_value = self.sell_value = 0.
+        self._closed = _PerfState(initial_value)
+        self._state = self._closed
+
+    @property
+    def count(self):
+        return self._state.count
+
+    @property
+    def date(self):
+        return self._state.date
+
+    def update(self, date, portfolio_value, benchmark_return=0.):
+        """
+        Ingest one portfolio snapshot.
+
+        Args:
+            date(datetime.datetime): trading day of the snapshot
+            portfolio_value(float): portfolio value
+            benchmark_return(float): benchmark return of the trading day
+        """
+        state = self._state
+        if state.count and date == state.date:
+            if self.keep_series:
+                self.trading_days.pop()
+                self.returns.pop()
+                self.benchmark_returns.pop()
+            previous = self._closed
+        elif state.count and date < state.date:
+            raise ValueError('Snapshot of {} is earlier than the latest {}.'.format(date, state.date))
+        else:
+            self._closed = previous = state
+        state = copy(previous)
+        previous_value = previous.portfolio_value
+        if previous_value == 0 or portfolio_value == 0:
+            st_return = 0.
+        else:
+            st_return = portfolio_value / previous_value - 1.
+            if st_return != st_return:
+                st_return = 0.
+        bm_return = float(benchmark_return)
+        diff = st_return - bm_return
+        state.count += 1
+        state.date = date
+        state.portfolio_value = portfolio_value
+        state.portfolio_value_sum += portfolio_value
+        state.st_sum += st_return
+        state.st_square_sum += st_return * st_return
+        state.bm_sum += bm_return
+        state.bm_square_sum += bm_return * bm_return
+        state.cross_sum += st_return * bm_return
+        state.diff_sum += diff
+        state.diff_square_sum += diff * diff
+        state.st_value = _advance_value(state.st_value, st_return)
+        state.bm_value = _advance_value(state.bm_value, bm_return)
+        if state.st_value > state.peak_value:
+            state.peak_value, state.peak_date = state.st_value, date
+        drawdown = 1. - state.st_value / state.peak_value
+        if drawdown > state.max_drawdown or state.trough_date is None:
+            state.max_drawdown = drawdown
+            state.max_drawdown_peak_date = state.peak_date
+            state.trough_date = date
+        self._state = state
+        if self.keep_series:
+            self.trading_days.append(date)
+            self.returns.append(st_return)
+            self.benchmark_returns.append(bm_return)
+
+    def record_trade(self, direction, value):
+        """
+        Record one trade for turnover rate.
+
+        Args:
+            direction(int): 1 for buy, -1 for sell
+            value(float): trade value
+        """
+        if direction > 0:
+            self.buy_value += abs(value)
+        else:
+            self.sell_value += abs(value)
+
+    def perf(self):
+        """
+        Current performance.
+
+        Returns:
+            dict: performance of scalar metrics, same keys as ReportClient perf
+        """
+        state = self._state
+        count = state.count
+        perf = {
+            'treasury_return': self.risk_free,
+            'alpha': None,
+            'beta': None,
+            'information_ratio': None,
+            'max_drawdown': state.max_drawdown,
+            'max_drawdown_period': (state.max_drawdown_peak_date, state.trough_date),
+            'cumulative_return': state.st_value - 1,
+            'benchmark_cumulative_return': state.bm_value - 1,
+        }
+        if not count:
+            perf.update({key: None for key in ['annualized_return', 'volatility', 'benchmark_annualized_return',
+                                               'benchmark_volatility', 'excess_return', 'sharpe', 'turnover_rate']})
+            return perf
+        exponent = float(ANNUALIZATION_FACTOR) / count
+        annualized_return = state.st_value ** exponent - 1
+        benchmark_annualized_return = state.bm_value ** exponent - 1
+        perf['annualized_return'] = annualized_return
+        perf['benchmark_annualized_return'] = benchmark_annualized_return
+        perf['excess_return'] = annualized_return - self.risk_free
+        volatility = _sample_std(state.st_sum, state.st_square_sum, count)
+        benchmark_volatility = _sample_std(state.bm_sum, state.bm_square_sum, count)
+        perf['volatility'] = volatility * ANNUALIZATION_FACTOR ** 0.5 if volatility is not None else None
+        perf['benchmark_volatility'] = \
+            benchmark_volatility * ANNUALIZATION_FACTOR ** 0.5 if benchmark_volatility is not None else None
+        perf['sharpe'] = perf['excess_return'] / perf['volatility'] if perf['volatility'] else None
+        if count > 1:
+            st_mean, bm_mean = state.st_sum / count, state.bm_sum / count
+            bm_variance = state.bm_square_sum / count - bm_mean * bm_mean
+            if bm_variance > 0:
+                beta = (state.cross_sum / count - st_mean * bm_mean) / bm_variance
+                perf['beta'] = beta
+                perf['alpha'] = \
+                    (annualized_return - self.risk_free) - beta * (benchmark_annualized_return - self.risk_free)
+            diff_std = _sample_std(state.diff_sum, state.diff_square_sum, count)
+            if diff_std:
+                information_ratio = state.diff_sum / count / diff_std * ANNUALIZATION_FACTOR ** 0.5
+                perf['information_ratio'] = None if is_invalid(information_ratio) else information_ratio
+        portfolio_mean_value = state.portfolio_value_sum / count
+        perf['turnover_rate'] = \
+            min(self.buy_value, self.sell_value) / portfolio_mean_value if portfolio_mean_value else None
+        return perf
+
+
+__all__ = [
+    'PerfAccumulator'
+]
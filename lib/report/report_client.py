@@ -5,9 +5,10 @@
 from __future__ import division
 import pandas as pd
 from . risk_metrics import *
+from . perf_accumulator import PerfAccumulator
+from . benchmark_store import BenchmarkReturnStore
 from . report import choose_report
 from .. universe.universe import UniverseService
-from .. utils.error_utils import Errors
 from .. utils.pandas_utils import smart_concat
 
 
@@ -62,11 +63,14 @@ class ReportClient(object):
     """
     Report client.
     """
-    def __init__(self, sim_params, data_portal, pms_lite, market_roller):
+    def __init__(self, sim_params, data_portal, pms_lite, market_roller, benchmark_store=None):
         self.sim_params = sim_params
         self.data_portal = data_portal
         self.pms_lite = pms_lite
         self.market_roller = market_roller
+        self.perf_accumulator = None
+        self.benchmark_store = benchmark_store or \
+            BenchmarkReturnStore(data_portal.market_service, data_portal.calendar_service.trading_days)
 
     def output(self):
         """
@@ -89,10 +93,15 @@ class ReportClient(object):
                                    with_turnover_rate=with_turnover_rate)
         return BTReport(bt, perf, bt_by_account)
 
-    def perf(self):
+    def perf(self, incremental=False):
         """
         Generate performance.
+
+        Args:
+            incremental(boolean): read scalar metrics from the perf accumulator instead of recomputing
         """
+        if incremental and self.perf_accumulator is not None:
+            return self.perf_accumulator.perf()
         initial_value = sum(map(lambda x: x['portfolio_value'],
                                 self.pms_lite.initial_value_info.values()))
         portfolio_frame = pd.DataFrame(self.pms_lite.portfolio_value_info)
@@ -107,6 +116,57 @@ class ReportClient(object):
                                           with_turnover_rate=False)
         return performance
 
+    def on_snapshot(self, date=None, benchmark_return=None):
+        """
+        Ingest the latest portfolio snapshot of pms lite into the perf accumulator,
+        a repeated snapshot of the same date replaces the previous one.
+
+        Args:
+            date(datetime.datetime): trading day, default the latest one in pms lite
+            benchmark_return(float): benchmark return of the trading day, queried once per day if not specified
+        """
+        if not any(self.pms_lite.portfolio_value_info.itervalues()):
+            return
+        accumulator = self._get_perf_accumulator()
+        date = date or max(max(_) for _ in self.pms_lite.portfolio_value_info.itervalues() if _)
+        portfolio_value = sum(_.get(date, 0) for _ in self.pms_lite.portfolio_value_info.itervalues())
+        if benchmark_return is None:
+            if accumulator.count and date == accumulator.date and accumulator.benchmark_returns:
+                benchmark_return = accumulator.benchmark_returns[-1]
+            else:
+                benchmark = self.pms_lite.benchmark_info.values()[0]
+                benchmark_return = self._get_benchmark_return(benchmark=benchmark, trading_days=[date],
+                                                              return_type='array')[0]
+        accumulator.update(date, portfolio_value, benchmark_return)
+
+    def on_trade(self, trade):
+        """
+        Ingest one trade into the perf accumulator, valued with the contract multiplier of futures.
+
+        Args:
+            trade(obj): trade obj
+        """
+        accumulator = self._get_perf_accumulator()
+        accumulator.record_trade(trade.direction,
+                                 trade.filled_amount * trade.transact_price * self._get_multiplier(trade.symbol))
+
+    def _get_multiplier(self, symbol):
+        """
+        Contract multiplier of futures, 1 for other assets.
+        """
+        asset_info = self.data_portal.asset_service.get_asset_info(symbol)
+        return getattr(asset_info, 'multiplier', None) or 1
+
+    def _get_perf_accumulator(self):
+        """
+        Get perf accumulator, created with the initial value of pms lite.
+        """
+        if self.perf_accumulator is None:
+            initial_value = sum(map(lambda x: x['portfolio_value'],
+                                    self.pms_lite.initial_value_info.values()))
+            self.perf_accumulator = PerfAccumulator(initial_value)
+        return self.perf_accumulator
+
     def _generate_bt_by_account(self):
         """
         Generate bt by account
@@ -115,6 +175,7 @@ class ReportClient(object):
             dict: respective bt by account
         """
         bt_by_account = dict()
+        self.benchmark_store.prefetch(self.pms_lite.benchmark_info.values())
         for account, config in self.pms_lite.accounts.iteritems():
             cash = self.pms_lite.cash_info[account]
             trade_dates = {date: date for date in self.data_portal.calendar_service.trading_days}
@@ -162,10 +223,10 @@ class ReportClient(object):
                 'benchmark_annualized_return', 'benchmark_volatility', 'benchmark_returns',
                 'benchmark_cumulative_values', 'benchmark_cumulative_returns', 'treasury_return', 'alpha', 'beta',
                 'excess_return', 'sharpe', 'information_ratio',
-                'information_coefficient', 'max_drawdown', 'turnover_rate']
+                'information_coefficient', 'max_drawdown', 'max_drawdown_period', 'turnover_rate']
         perf = {key: None for key in keys}
         st_returns = get_return([initial_value] + portfolio_value)
-        bm_returns = benchmark_return.T.tolist()
+        bm_returns = np.asarray(benchmark_return, dtype=float).ravel()
         perf['returns'] = pd.Series(st_returns)
         perf['returns'].index = trading_days
         perf['benchmark_returns'] = pd.Series(bm_returns)
@@ -186,11 +247,11 @@ class ReportClient(object):
         c_bm_values = get_cumulative_value(bm_returns)
         perf['cumulative_values'] = pd.Series(c_st_values)
         perf['cumulative_values'].index = trading_days
-        perf['cumulative_returns'] = pd.Series([v - 1 for v in c_st_values])
+        perf['cumulative_returns'] = pd.Series(c_st_values - 1)
         perf['cumulative_returns'].index = trading_days
         perf['benchmark_cumulative_values'] = pd.Series(c_bm_values)
         perf['benchmark_cumulative_values'].index = trading_days
-        perf['benchmark_cumulative_returns'] = pd.Series([v - 1 for v in c_bm_values])
+        perf['benchmark_cumulative_returns'] = pd.Series(c_bm_values - 1)
         perf['benchmark_cumulative_returns'].index = trading_days
         perf['annualized_return'] = get_annualized_return(c_st_values)
         perf['benchmark_annualized_return'] = get_annualized_return(c_bm_values)
@@ -214,7 +275,8 @@ class ReportClient(object):
             assert isinstance(universe_service, UniverseService)
             len_universe = len(universe_service.view(with_init_universe=True))
             perf['information_coefficient'] = perf['information_ratio'] / (len_universe * len(trading_days)) ** 0.5
-        perf['max_drawdown'] = get_max_drawdown(c_st_values)
+        perf['max_drawdown'], peak, trough = get_max_drawdown_info(c_st_values)
+        perf['max_drawdown_period'] = (trading_days[peak] if peak >= 0 else None, trading_days[trough])
         perf['turnover_rate'] = 0
         if with_turnover_rate:
             perf['turnover_rate'] = self._get_turnover_rate(portfolio_value, security_position, trading_days)
@@ -230,45 +292,28 @@ class ReportClient(object):
             trading_days: trading days
         """
         end_date = trading_days[-1]
-        data = self.data_portal.market_service.slice(symbols='all', fields=['openPrice'],
-                                                     end_date=end_date, time_range=len(security_position)
-                                                     )['openPrice'].to_dict()
-        buy_value, sell_value = 0, 0
-        for pre_index, current_index in enumerate(range(len(security_position))[1:]):
-            pre_position, current_position = \
-                security_position[pre_index], security_position[current_index]
-            for symbol in set(pre_position) | set(current_position):
-                current_date = trading_days[current_index].strftime('%Y-%m-%d')
-                if not pre_position.get(symbol):
-                    buy_value += current_position[symbol]['amount'] * data[symbol][current_date]
-                elif not current_position.get(symbol):
-                    sell_value += \
-                        pre_position[symbol]['amount'] * data[symbol][current_date]
-                else:
-                    amount_diff = current_position[symbol]['amount'] - pre_position[symbol]['amount']
-                    value = \
-                        abs(amount_diff) * data[symbol][current_date]
-                    if amount_diff > 0:
-                        buy_value += value
-                    elif amount_diff < 0:
-                        sell_value += value
+        prices = self.data_portal.market_service.slice(symbols='all', fields=['openPrice'],
+                                                       end_date=end_date, time_range=len(security_position)
+                                                       )['openPrice']
+        symbols = sorted(set().union(*security_position))
+        symbol_index = {symbol: column for column, symbol in enumerate(symbols)}
+        amounts = np.zeros((len(security_position), len(symbols)))
+        for row, position in enumerate(security_position):
+            for symbol, detail in position.iteritems():
+                amounts[row, symbol_index[symbol]] = detail['amount']
+        dates = [date.strftime('%Y-%m-%d') for date in trading_days[:len(security_position)]]
+        price_matrix = prices.reindex(index=dates, columns=symbols).values
+        buy_value, sell_value = get_trade_values(amounts, price_matrix)
         return get_turnover_rate(buy_value, sell_value, float(np.mean(portfolio_value)))
 
     def _get_benchmark_return(self, benchmark, trading_days, return_type='list'):
         """
-        Get benchmark return
+        Get benchmark return from the benchmark return store.
 
         Args:
             benchmark: benchmark
         """
-        benchmark_data = self.data_portal.market_service.slice([benchmark], ['closePrice'], trading_days[-1],
-                                                               time_range=len(trading_days)+1)
-        if 'closePrice' in benchmark_data:
-            benchmark_series = \
-                np.array(benchmark_data['closePrice'])
-        else:
-            raise Errors.INVALID_BENCHMARK
-        benchmark_return = benchmark_series[1:]/benchmark_series[:-1] - 1
+        benchmark_return = self.benchmark_store.get(benchmark, trading_days)
         if return_type == 'dict':
-            return dict(zip(trading_days, benchmark_return[:, 0].tolist()))
-        return benchmark_return[:, 0]
+            return dict(zip(trading_days, benchmark_return.tolist()))
+        return benchmark_return
@@ -3,9 +3,117 @@
 #     File: Risk metrics file
 # **********************************************************************************#
 import numpy as np
-from datetime import datetime, timedelta
-from ..data_loader.yieldcurve import load_yieldcurve_data
-from ..utils.datetime_utils import get_end_date
+
+
+ANNUALIZATION_FACTOR = 250
+
+
+def is_invalid(value):
+    """
+    Whether value is nan or inf.
+    """
+    return value is None or np.isnan(value) or np.isinf(value)
+
+
+def _rolling_sum(values, window):
+    """
+    Rolling sum by cumulative sum, value at i is the sum of values[i - window + 1: i + 1].
+
+    Args:
+        values (array): 数组
+        window (int): 窗口长度
+
+    Returns:
+        array: 长度为 len(values) - window + 1 的滚动和
+    """
+    cumulative = np.concatenate(([0.], np.cumsum(values)))
+    return cumulative[window:] - cumulative[:-window]
+
+
+def _window_blocks(values, window):
+    """
+    Cut values into blocks of window length, so that every window is a suffix of one block followed by
+    a prefix of the next block. Running statistics over the prefixes and suffixes of blocks give every
+    window in O(n), without visiting each window element by element.
+
+    Args:
+        values (array like): 一维数组
+        window (int): 窗口长度
+
+    Returns:
+        (array, array, array): (块数, window) 的分块数组(末块补 0), 各窗口起点所在块, 各窗口起点在块内的位置
+    """
+    values = np.asarray(values, dtype=float)
+    blocks = -(-values.shape[0] // window)
+    padded = np.zeros(blocks * window)
+    padded[:values.shape[0]] = values
+    starts = np.arange(max(values.shape[0] - window + 1, 0))
+    return padded.reshape(blocks, window), starts // window, starts % window
+
+
+def _block_comoments(x_blocks, y_blocks, reverse=False):
+    """
+    Running means and co-moment of each block by Welford updates, from the first column, or from the
+    last column if reverse. Updates run column by column over all blocks at once.
+
+    Args:
+        x_blocks (array): (块数, 窗口长度) 的分块数组
+        y_blocks (array): (块数, 窗口长度) 的分块数组
+        reverse (boolean): 是否由块尾向块首累计
+
+    Returns:
+        (array, array, array): 各位置累计的 x 均值, y 均值, 协离差平方和
+    """
+    rows, window = x_blocks.shape
+    mean_x, mean_y, comoment = np.zeros((3, rows, window))
+    running_x, running_y, running_comoment = np.zeros((3, rows))
+    columns = range(window - 1, -1, -1) if reverse else range(window)
+    for count, column in enumerate(columns, 1):
+        dx = x_blocks[:, column] - running_x
+        running_x += dx / count
+        running_y += (y_blocks[:, column] - running_y) / count
+        running_comoment += dx * (y_blocks[:, column] - running_y)
+        mean_x[:, column], mean_y[:, column], comoment[:, column] = running_x, running_y, running_comoment
+    return mean_x, mean_y, comoment
+
+
+def _rolling_comoments(x, y, window):
+    """
+    Rolling means and co-moment sum((x - mean_x) * (y - mean_y)), by Welford updates within blocks merged
+    pairwise across blocks, which stays accurate where differences of cumulative sums of squares cancel.
+
+    Args:
+        x (array like): 一维数组
+        y (array like): 一维数组
+        window (int): 窗口长度
+
+    Returns:
+        (array, array, array): 长度为 len(x) - window + 1 的滚动 x 均值, y 均值, 协离差平方和
+    """
+    x_blocks, block, offset = _window_blocks(x, window)
+    y_blocks, _, _ = _window_blocks(y, window)
+    suffix_x, suffix_y, suffix_comoment = _block_comoments(x_blocks, y_blocks, reverse=True)
+    prefix_x, prefix_y, prefix_comoment = _block_comoments(x_blocks, y_blocks)
+    suffix = (block, offset)
+    prefix = (np.minimum(block + 1, x_blocks.shape[0] - 1), offset - 1)
+    suffix_count, prefix_count = (window - offset).astype(float), offset.astype(float)
+    dx = prefix_x[prefix] - suffix_x[suffix]
+    dy = prefix_y[prefix] - suffix_y[suffix]
+    # windows starting a block lie in that block only
+    split = offset > 0
+    mean_x = np.where(split, suffix_x[suffix] + dx * prefix_count / window, suffix_x[suffix])
+    mean_y = np.where(split, suffix_y[suffix] + dy * prefix_count / window, suffix_y[suffix])
+    comoment = np.where(split, suffix_comoment[suffix] + prefix_comoment[prefix] +
+                        dx * dy * suffix_count * prefix_count / window, suffix_comoment[suffix])
+    return mean_x, mean_y, comoment
+
+
+def _drawdown(values, peaks):
+    """
+    Drawdown of values from peaks, 0 where peaks are not positive.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(peaks > 0, 1. - values / peaks, 0.)
 
 
 def get_return(values):
@@ -13,36 +121,36 @@ def get_return(values):
     根据价值计算收益率
 
     Args:
-        values (list): 价值的列表
+        values (array like): 价值序列
 
     Returns:
-        list: 收益率列表
+        array: 收益率序列
     """
-    returns = [0]*(len(values)-1)
-    for key, value in enumerate(values[1:]):
-        if not values[key] or not value or np.isnan(value/values[key]):
-            continue
-        returns[key] = value/values[key] - 1.
+    values = np.asarray(values, dtype=float)
+    previous, current = values[:-1], values[1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = current / previous - 1.
+    returns[(previous == 0) | (current == 0) | np.isnan(returns)] = 0.
     return returns
 
 
 def get_cumulative_value(returns):
     """
-    根据收益率计算累计价值
+    根据收益率计算累计价值, 累计价值首次为负或无效后均置为 0
 
     Args:
-        returns (list): 收益率列表
+        returns (array like): 收益率序列
 
     Returns:
-        list: 累计列表
+        array: 累计价值序列
     """
-
-    values = returns[:]
-    values[0] += 1
-    for i, r in enumerate(values[1:]):
-        values[i+1] = (1 + r) * values[i]
-        if np.isnan(values[i+1]) or values[i+1] < 0:
-            values[i+1] = 0
+    returns = np.asarray(returns, dtype=float)
+    with np.errstate(invalid='ignore', over='ignore'):
+        values = np.cumprod(1. + returns)
+        invalid = np.isnan(values) | (values < 0)
+    invalid[0] = False
+    if invalid.any():
+        values[np.argmax(invalid):] = 0.
     return values
 
 
@@ -51,13 +159,46 @@ def get_annualized_return(c_values):
     根据累计价值计算年化收益率
 
     Args:
-        c_values (list): 累计价值列表
+        c_values (array like): 累计价值序列
 
     Returns:
         float: 年化收益率
     """
 
-    return c_values[-1] ** (250. / len(c_values)) - 1
+    return c_values[-1] ** (float(ANNUALIZATION_FACTOR) / len(c_values)) - 1
+
+
+def get_drawdown(c_values):
+    """
+    根据累计价值计算回撤序列, 高点不低于初始价值 1
+
+    Args:
+        c_values (array like): 累计价值序列
+
+    Returns:
+        array: 回撤序列
+    """
+    c_values = np.asarray(c_values, dtype=float)
+    peaks = np.fmax(np.fmax.accumulate(c_values), 1.)
+    return 1. - c_values / peaks
+
+
+def get_max_drawdown_info(c_values):
+    """
+    根据累计价值计算最大回撤及其高点、低点位置
+
+    Args:
+        c_values (array like): 累计价值序列
+
+    Returns:
+        (float, int, int): 最大回撤, 高点位置, 低点位置; 高点为初始价值时位置为 -1
+    """
+    c_values = np.asarray(c_values, dtype=float)
+    drawdown = get_drawdown(c_values)
+    trough = int(np.nanargmax(drawdown))
+    peak_value = np.nanmax(c_values[:trough + 1])
+    peak = int(np.nanargmax(c_values[:trough + 1])) if peak_value >= 1. else -1
+    return float(drawdown[trough]), peak, trough
 
 
 def get_max_drawdown(c_values):
@@ -65,14 +206,12 @@ def get_max_drawdown(c_values):
     根据累计价值计算最大回撤
 
     Args:
-        c_values (list): 累计价值列表
+        c_values (array like): 累计价值序列
 
     Returns:
         float: 最大回撤
     """
-
-    drawdown = [1 - v/max(1, max(c_values[:i+1])) for i, v in enumerate(c_values)]
-    return max(drawdown)
+    return float(np.nanmax(get_drawdown(c_values)))
 
 
 def get_riskfree_rate(date):
@@ -94,35 +233,29 @@ def get_CAPM(st_returns, bm_returns, rf):
     计算alpha和beta
 
     Args:
-        st_returns (list): 策略收益率列表
-        bm_returns (list): 市场收益率列表
+        st_returns (array like): 策略收益率序列
+        bm_returns (array like): 市场收益率序列
         rf (float): 无风险收益率
 
     Returns:
         (float, float): alpha, beta
     """
+    st_returns = np.asarray(st_returns, dtype=float)
+    bm_returns = np.asarray(bm_returns, dtype=float)
 
-    d = len(st_returns)
-
-    if d == 1:
+    if len(st_returns) == 1:
         return None, None
 
-    mu_st = sum(st_returns) / d
-    mu_bm = sum(bm_returns) / d
-    mul = [st_returns[i] * bm_returns[i] for i in range(d)]
-
-    cov = sum(mul) / d - mu_st * mu_bm
-    var_bm = np.std(bm_returns) ** 2
-    beta = cov / var_bm
-    if beta in [-np.inf, np.inf] or np.isnan(beta):
+    cov = np.mean(st_returns * bm_returns) - np.mean(st_returns) * np.mean(bm_returns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = cov / np.var(bm_returns)
+    if is_invalid(beta):
         return None, None
 
-    cummulative_st = get_cumulative_value(st_returns)
-    annulized_st = get_annualized_return(cummulative_st)
-    cummulative_bm = get_cumulative_value(bm_returns)
-    annulized_bm = get_annualized_return(cummulative_bm)
+    annualized_st = get_annualized_return(get_cumulative_value(st_returns))
+    annualized_bm = get_annualized_return(get_cumulative_value(bm_returns))
 
-    alpha = (annulized_st - rf) - beta * (annulized_bm - rf)
+    alpha = (annualized_st - rf) - beta * (annualized_bm - rf)
     return alpha, beta
 
 
@@ -131,25 +264,135 @@ def get_information_ratio(st_returns, bm_returns):
     计算信息比率
 
     Args:
-        st_returns (list): 策略收益率列表
-        bm_returns (list): 市场收益率列表
+        st_returns (array like): 策略收益率序列
+        bm_returns (array like): 市场收益率序列
 
     Returns:
         float: 信息比率
     """
+    diff = np.asarray(st_returns, dtype=float) - np.asarray(bm_returns, dtype=float)
 
-    d = len(st_returns)
-
-    if d == 1:
+    if len(diff) == 1:
         return None
 
-    diff = [st_returns[i] - bm_returns[i] for i in range(d)]
-    IR = sum(diff) / d / np.std(diff, ddof=1) * 250**0.5
-    if IR in [np.inf, -np.inf] or np.isnan(IR):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        IR = np.mean(diff) / np.std(diff, ddof=1) * ANNUALIZATION_FACTOR ** 0.5
+    if is_invalid(IR):
         return None
     return IR
 
 
+def get_rolling_volatility(returns, window):
+    """
+    计算滚动年化波动率, 由分块 Welford 累计合并
+
+    Args:
+        returns (array like): 收益率序列
+        window (int): 窗口长度
+
+    Returns:
+        array: 长度为 len(returns) - window + 1 的滚动波动率
+    """
+    _, _, squared_deviations = _rolling_comoments(returns, returns, window)
+    return np.sqrt(squared_deviations / (window - 1)) * ANNUALIZATION_FACTOR ** 0.5
+
+
+def get_rolling_CAPM(st_returns, bm_returns, rf, window):
+    """
+    计算滚动alpha和beta, 协方差与方差由分块 Welford 累计合并
+
+    Args:
+        st_returns (array like): 策略收益率序列
+        bm_returns (array like): 市场收益率序列
+        rf (float): 无风险收益率
+        window (int): 窗口长度
+
+    Returns:
+        (array, array): 滚动alpha, 滚动beta; 无效值为 nan
+    """
+    st_returns = np.asarray(st_returns, dtype=float)
+    bm_returns = np.asarray(bm_returns, dtype=float)
+    _, _, cov = _rolling_comoments(st_returns, bm_returns, window)
+    _, _, var_bm = _rolling_comoments(bm_returns, bm_returns, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = cov / var_bm
+        beta[np.isinf(beta)] = np.nan
+        log_st = _rolling_sum(np.log1p(st_returns), window)
+        log_bm = _rolling_sum(np.log1p(bm_returns), window)
+        exponent = float(ANNUALIZATION_FACTOR) / window
+        annualized_st = np.exp(log_st * exponent) - 1
+        annualized_bm = np.exp(log_bm * exponent) - 1
+    alpha = (annualized_st - rf) - beta * (annualized_bm - rf)
+    return alpha, beta
+
+
+def get_rolling_information_ratio(st_returns, bm_returns, window):
+    """
+    计算滚动信息比率
+
+    Args:
+        st_returns (array like): 策略收益率序列
+        bm_returns (array like): 市场收益率序列
+        window (int): 窗口长度
+
+    Returns:
+        array: 滚动信息比率, 无效值为 nan
+    """
+    diff = np.asarray(st_returns, dtype=float) - np.asarray(bm_returns, dtype=float)
+    mean, _, squared_deviations = _rolling_comoments(diff, diff, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        IR = mean / np.sqrt(squared_deviations / (window - 1)) * ANNUALIZATION_FACTOR ** 0.5
+    IR[np.isinf(IR)] = np.nan
+    return IR
+
+
+def get_rolling_max_drawdown(c_values, window):
+    """
+    计算滚动最大回撤, 窗口内高点以窗口内累计价值计. 窗口由前一块的后缀与后一块的前缀组成,
+    最大回撤取后缀内, 前缀内, 以及后缀高点到前缀低点三者之最大, 各块前缀与后缀的累计极值共 O(n)
+
+    Args:
+        c_values (array like): 累计价值序列
+        window (int): 窗口长度
+
+    Returns:
+        array: 长度为 len(c_values) - window + 1 的滚动最大回撤
+    """
+    blocks, block, offset = _window_blocks(c_values, window)
+    prefix_drawdown = np.fmax.accumulate(_drawdown(blocks, np.fmax.accumulate(blocks, axis=1)), axis=1)
+    prefix_troughs = np.fmin.accumulate(blocks, axis=1)
+    reversed_blocks = blocks[:, ::-1]
+    suffix_peaks = np.fmax.accumulate(reversed_blocks, axis=1)[:, ::-1]
+    # within a suffix, every value is a peak for the lowest value after it
+    suffix_troughs = np.fmin.accumulate(reversed_blocks, axis=1)[:, ::-1]
+    suffix_drawdown = np.fmax.accumulate(_drawdown(suffix_troughs, blocks)[:, ::-1], axis=1)[:, ::-1]
+    suffix = (block, offset)
+    prefix = (np.minimum(block + 1, blocks.shape[0] - 1), offset - 1)
+    crossing = np.fmax(prefix_drawdown[prefix], _drawdown(prefix_troughs[prefix], suffix_peaks[suffix]))
+    return np.where(offset > 0, np.fmax(suffix_drawdown[suffix], crossing), suffix_drawdown[suffix])
+
+
+def get_trade_values(amounts, prices):
+    """
+    根据持仓数量矩阵计算买入、卖出总价值, 持仓变动以当日价格计
+
+    Args:
+        amounts (array like): (交易日, 证券) 持仓数量矩阵
+        prices (array like): (交易日, 证券) 价格矩阵
+
+    Returns:
+        (float, float): 买入总价值, 卖出总价值
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    amount_diff = np.diff(amounts, axis=0)
+    with np.errstate(invalid='ignore'):
+        values = np.abs(amount_diff) * prices[1:]
+    buy_value = np.nansum(values[amount_diff > 0])
+    sell_value = np.nansum(values[amount_diff < 0])
+    return float(buy_value), float(sell_value)
+
+
 def get_turnover_rate(buy_value, sell_value, portfolio_mean_value):
     """
     计算换手率
@@ -167,4 +410,3 @@ def get_turnover_rate(buy_value, sell_value, portfolio_mean_value):
     if TR in [np.inf, -np.inf] or np.isnan(TR):
         return None
     return TR
-
@@ -12,6 +12,7 @@ from . order import (
     OrderState,
     OrderStateMessage
 )
+from . order_id import OrderIdGenerator
 from . position import (
     Position,
     MetaPosition,
@@ -29,6 +30,7 @@ __all__ = [
     'Slippage',
     'BaseOrder',
     'Order',
+    'OrderIdGenerator',
     'OrderState',
     'OrderStateMessage',
     'Position',
@@ -7,9 +7,11 @@
 """
 import json
 import numpy as np
+from threading import Lock
 from uuid import uuid1
 from utils.error import Errors
 from . base import SecuritiesType
+from . order_id import OrderIdGenerator
 from .. core.objects import ValueObject
 
 
@@ -137,8 +139,9 @@ class Order(BaseOrder):
     """
     Order instance.
     """
-    __cur_date__, __max_order_id__ = None, 1
-    known_order_ids = set()
+    # created on first order id, or beforehand by a prefork master whose workers share its node allocator
+    _id_generator = None
+    _id_generator_lock = Lock()
 
     __slots__ = [
         'portfolio_id',
@@ -158,6 +161,7 @@ class Order(BaseOrder):
         'slippage',
         'state',
         'state_message',
+        'tick_time',
     ]
 
     def __getstate__(self):
@@ -172,37 +176,38 @@ class Order(BaseOrder):
             setattr(self, slot, value)
 
     def __init__(self, symbol, order_amount, order_time=None, order_type='limit', price=0.,
-                 portfolio_id=None, order_id=None, offset_flag=None, direction=None,
+                 portfolio_id=None, order_id=None, offset_flag=None, direction=None, tick_time=None,
                  **kwargs):
         super(Order, self).__init__(symbol=symbol, order_amount=order_amount, order_time=order_time,
                                     order_type=order_type, price=price)
-        self.order_id = order_id if order_id is not None else self.generate_order_id(order_time=order_time)
+        self.order_id = order_id if order_id is not None else self.generate_order_id()
         self.portfolio_id = portfolio_id
         self.direction = direction if direction is not None else (order_amount / abs(order_amount) if order_amount != 0 else 0)
         self.turnover_value = 0.
         self.offset_flag = offset_flag or ('open' if np.sign(order_amount) == 1 else 'close')
+        # received time of the tick triggering the order, for tick to order latency
+        self.tick_time = tick_time
 
     @classmethod
-    def generate_order_id(cls, order_time, generated_id=None):
+    def generate_order_id(cls, generated_id=None):
         """
-        Generate order id.
+        Generate order id, stamped by the wall clock whatever the order time is.
         Args:
-            order_time(string): order time
             generated_id(string): generate id
         """
-        _get_date_hash = (lambda x: x[:10])
-        order_date = _get_date_hash(order_time)
-        if order_date != cls.__cur_date__:
-            cls.__cur_date__ = order_date
-            cls.__max_order_id__ = 1
-        if generated_id is None:
-            generated_id = '%07d' % (cls.__max_order_id__,)
-            while generated_id in cls.known_order_ids:
-                cls.__max_order_id__ += 1
-                generated_id = '%07d' % (cls.__max_order_id__,)
-            cls.__max_order_id__ += 1
-        cls.known_order_ids.add(generated_id)
-        return generated_id
+        if generated_id is not None:
+            return generated_id
+        return cls.get_id_generator().next_id()
+
+    @classmethod
+    def get_id_generator(cls):
+        """
+        Order id generator, created on first call.
+        """
+        with Order._id_generator_lock:
+            if Order._id_generator is None:
+                Order._id_generator = OrderIdGenerator()
+        return Order._id_generator
 
     def to_dict(self):
         """
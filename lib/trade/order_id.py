@@ -0,0 +1,167 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Order id generation.
+# **********************************************************************************#
+import os
+import time
+import errno
+from datetime import datetime
+from threading import Lock
+from multiprocessing import Array
+from utils.error import Errors
+
+
+ORDER_ID_NODE_SLOTS = 100
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as error:
+        return error.errno == errno.EPERM
+    return True
+
+
+class NodeAllocator(object):
+    """
+    Node slots in shared memory, shared by the process creating the allocator and by every process forked
+    from it afterwards. Each process claims the first slot which is free or left by a dead process, so that
+    live processes never share a slot.
+    """
+    def __init__(self, size=ORDER_ID_NODE_SLOTS):
+        """
+        Args:
+            size(int): number of slots
+        """
+        self.size = size
+        self._owners = Array('i', size)
+
+    def allocate(self, pid=None):
+        """
+        Slot of process, claimed on first call.
+
+        Args:
+            pid(int): process id, default current process
+
+        Returns:
+            int: slot index
+        """
+        pid = pid or os.getpid()
+        with self._owners.get_lock():
+            free_slot = None
+            for slot, owner in enumerate(self._owners):
+                if owner == pid:
+                    return slot
+                if free_slot is None and (owner == 0 or not _alive(owner)):
+                    free_slot = slot
+            if free_slot is None:
+                raise Errors.ORDER_ID_NODES_EXHAUSTED
+            self._owners[free_slot] = pid
+            return free_slot
+
+    def release(self, pid=None):
+        """
+        Release the slot of process.
+        """
+        pid = pid or os.getpid()
+        with self._owners.get_lock():
+            for slot, owner in enumerate(self._owners):
+                if owner == pid:
+                    self._owners[slot] = 0
+
+
+class OrderIdGenerator(object):
+    """
+    Order id generator, collision free across processes without any membership set.
+
+    Ids are 12 digits, fitting the OrderRef of ctp: 5 digits of the wall clock second of day, 3 digits of node
+    and 4 digits of sequence within the second. Ids are unique within a day, as orders are stored by portfolio
+    and date.
+
+    With environment variable ORDER_ID_NODE set, the node of a process is that base plus the slot the process
+    claims from the node allocator, which is shared by all processes forked after the generator is created, such
+    as prefork, uwsgi or multiprocessing workers. Services sharing order storage use bases at least the number
+    of slots apart. Without it, the node of a process is its pid modulo max_node, so that processes of one host
+    started apart, which share no allocator, still use different nodes unless their pids are equal modulo
+    max_node; hosts sharing order storage set ORDER_ID_NODE. When the sequence of a second runs out,
+    next_id waits for the next second instead of running ahead of the clock, so the second field never passes
+    the end of day.
+    """
+    max_node = 1000
+    max_sequence = 10000
+
+    def __init__(self, node=None, base=None, allocator=None, now=datetime.now, sleep=time.sleep):
+        """
+        Args:
+            node(int): fixed node, skipping the allocator
+            base(int): node base, default environment variable ORDER_ID_NODE, nodes are derived from pids if neither
+            allocator(NodeAllocator): node allocator, a new one if not specified and a node base is
+            now(func): wall clock
+            sleep(func): sleep function
+        """
+        if base is None and os.environ.get('ORDER_ID_NODE'):
+            base = int(os.environ['ORDER_ID_NODE'])
+        self._node = node
+        self._base = base
+        self._allocator = allocator or (NodeAllocator() if node is None and base is not None else None)
+        self._now = now
+        self._sleep = sleep
+        self._pid = None
+        self._process_node = None
+        self._date = None
+        self._second = -1
+        self._sequence = 0
+        self._lock = Lock()
+
+    @property
+    def node(self):
+        """
+        Node of current process.
+        """
+        if self._node is not None:
+            return self._node % self.max_node
+        pid = os.getpid()
+        if pid != self._pid:
+            # a forked process claims its own node and drops the state and lock of its parent
+            if self._base is None:
+                node = pid % self.max_node
+            else:
+                node = self._base + self._allocator.allocate(pid)
+            if node >= self.max_node:
+                raise Errors.INVALID_ORDER_ID_NODE
+            self._lock = Lock()
+            self._date, self._second, self._sequence = None, -1, 0
+            self._process_node, self._pid = node, pid
+        return self._process_node
+
+    def next_id(self):
+        """
+        Next order id.
+
+        Returns:
+            string: order id
+        """
+        node = self.node
+        with self._lock:
+            while True:
+                now = self._now()
+                second = now.hour * 3600 + now.minute * 60 + now.second
+                if now.date() != self._date:
+                    self._date, self._second, self._sequence = now.date(), second, 0
+                    break
+                if second > self._second:
+                    self._second, self._sequence = second, 0
+                    break
+                if self._sequence + 1 < self.max_sequence:
+                    self._sequence += 1
+                    break
+                # sequence of the second runs out
+                self._sleep(1. - now.microsecond / 1e6)
+            return '%05d%03d%04d' % (self._second, node, self._sequence)
+
+
+__all__ = [
+    'ORDER_ID_NODE_SLOTS',
+    'NodeAllocator',
+    'OrderIdGenerator'
+]
@@ -198,7 +198,7 @@ class FuturesPosition(LongShortPosition):
 
     def calc_close_pnl(self, trade, multiplier):
         """
-        仅计算并返回平仓盈亏，不更新价格、amount及value
+        仅计算并返回平仓盈亏，不更新价格、amount及value. 卖出成交平多仓, 买入成交平空仓
 
         Args:
             trade(PMSTrade): 成交记录
@@ -207,13 +207,53 @@ class FuturesPosition(LongShortPosition):
         Returns(float): 平仓盈亏
 
         """
-        amount = self.long_amount if trade.direction == 1 else self.short_amount
+        amount = self.long_amount if trade.direction == -1 else self.short_amount
         if amount < trade.filled_amount:
             raise ExceptionsFormat.INVALID_FILLED_AMOUNT.format(trade.filled_amount)
-        cost = self.long_cost if trade.direction == 1 else self.short_cost
-        close_pnl = trade.direction * (trade.transact_price - cost) * trade.filled_amount * multiplier
+        cost = self.long_cost if trade.direction == -1 else self.short_cost
+        close_pnl = -trade.direction * (trade.transact_price - cost) * trade.filled_amount * multiplier
         return close_pnl
 
+    def update_by_trade(self, trade, multiplier, margin_rate):
+        """
+        按成交更新持仓数量、成本及估值, 返回成交导致的账户价值变化(不含佣金)
+
+        Args:
+            trade(PMSTrade): 成交记录
+            multiplier(float): 合约乘数
+            margin_rate(float): 保证金率
+
+        Returns(float): 平仓盈亏与持仓浮动盈亏增量之和
+
+        """
+        offset = 1 if trade.offset_flag == 'open' else -1
+        trade_mv = offset * trade.direction * trade.filled_amount * multiplier
+        if trade.offset_flag == 'open':
+            # 更新持仓浮动盈亏
+            _, float_pnl = self.evaluate(trade.transact_price, multiplier, margin_rate)
+            if trade.direction == 1:
+                original_amount, self.long_amount = self.long_amount, self.long_amount + trade.filled_amount
+                self.long_cost = \
+                    (self.long_cost * original_amount + trade.filled_amount * trade.transact_price) / \
+                    self.long_amount if self.long_amount else 0
+            else:
+                original_amount, self.short_amount = self.short_amount, self.short_amount + trade.filled_amount
+                self.short_cost = \
+                    (self.short_cost * original_amount + trade.filled_amount * trade.transact_price) / \
+                    self.short_amount if self.short_amount else 0
+            self.value += trade.transact_price * trade_mv
+            return float_pnl
+        # 先处理成交的平仓盈亏, 再更新持仓浮动盈亏增量, 平仓不更改持仓成本
+        close_pnl = self.calc_close_pnl(trade, multiplier)
+        if trade.direction == 1:
+            self.short_amount -= trade.filled_amount
+            self.value -= self.short_cost * trade_mv
+        else:
+            self.long_amount -= trade.filled_amount
+            self.value -= self.long_cost * trade_mv
+        _, float_pnl = self.evaluate(trade.transact_price, multiplier, margin_rate)
+        return close_pnl + float_pnl
+
     @classmethod
     def from_request(cls, request):
         """
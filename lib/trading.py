@@ -4,8 +4,9 @@
 # **********************************************************************************#
 import sys
 import time
+from utils.error import TradingException
+from utils.metrics import start_metrics_server
 from . core.clock import Clock
-from . context.context import Context
 from . account.account import AccountManager
 from . instrument.data_portal import DataPortal
 from . event.event_engine import (
@@ -18,20 +19,24 @@ from . gateway import (
     CTPGateway
 )
 from . pms.pms_lite import PMSLite
+from . report.report_client import ReportClient
 from . market import MarketRoller
 from . trading_base import (
     strategy_from_code,
-    parse_sim_params
+    parse_sim_params,
+    create_context
 )
 from . trading_agent import TradingAgent
 from . configs import (
     ctp_config,
+    metrics_trading_port,
     logger
 )
 from . const import RETURN_CODE_EXIT_ERROR
 
 
-def trading(strategy_code, config=None, debug=False, log_obj=None, **kwargs):
+def trading(strategy_code, config=None, debug=False, log_obj=None, data_portal=None,
+            replay_files=None, replay_speed=None, exit_on_error=True, metrics_port=metrics_trading_port, **kwargs):
     """
     Trading function according to strategy code.
 
@@ -40,15 +45,27 @@ def trading(strategy_code, config=None, debug=False, log_obj=None, **kwargs):
         config(dict): config parameters
         debug(boolean): whether to debug
         log_obj(obj): log object
+        data_portal(DataPortal): data portal already loaded, e.g. shared by a parameter sweep
+        replay_files(string or list): recorded ctp files, if specified trading runs offline on the replay gateway
+                                      and no ctp front is connected
+        replay_speed(float): replay speed multiplier, None or 0 for as fast as possible
+        exit_on_error(boolean): whether to exit the process on failure, else raise TradingException
+        metrics_port(int): port of the metrics exporter of this process, None for no exporter. The event engine,
+                           market roller, data portal and market service caches are collected in this process
+                           only, so the /metrics endpoint of the web service does not see them
         **kwargs: key-value parameters
+
+    Returns:
+        TradingAgent: trading agent after trading
     """
     config = config or dict()
     log_obj = log_obj or logger
     strategy, local_variables = strategy_from_code(strategy_code, log_obj=log_obj)
     sim_params = parse_sim_params(config, local_variables)
     clock = Clock(sim_params.freq)
-    data_portal = DataPortal()
-    data_portal.batch_load_data(sim_params)
+    if data_portal is None:
+        data_portal = DataPortal()
+        data_portal.batch_load_data(sim_params)
     event_engine = EventEngine(log=log_obj)
     trading_scheduler = TradingScheduler(start=sim_params.start, end=sim_params.end,
                                          freq=sim_params.freq,
@@ -65,19 +82,19 @@ def trading(strategy_code, config=None, debug=False, log_obj=None, **kwargs):
             minute_bar_loading_rate=5,
             debug=debug,
             paper=True)
-    ctp_gateway = CTPGateway.from_config(ctp_config, event_engine=event_engine)
+    if replay_files:
+        ctp_gateway = CTPGateway.from_replay(replay_files, speed=replay_speed, event_engine=event_engine)
+    else:
+        ctp_gateway = CTPGateway.from_config(ctp_config, event_engine=event_engine)
     pms_gateway = PMSGateway.from_config(clock, sim_params, data_portal,
                                          ctp_gateway=ctp_gateway)
     account_manager = AccountManager.from_config(clock, sim_params, data_portal,
                                                  event_engine=event_engine,
                                                  pms_gateway=pms_gateway)
     pms_lite = PMSLite(clock=clock, accounts=account_manager.registered_accounts, data_portal=data_portal)
-    context = Context(clock, sim_params, strategy,
-                      market_service=data_portal.market_service,
-                      universe_service=data_portal.universe_service,
-                      asset_service=data_portal.asset_service,
-                      calendar_service=data_portal.calendar_service,
-                      account_manager=account_manager)
+    report_client = ReportClient(sim_params, data_portal, pms_lite, market_roller)
+    pms_lite.add_report_client(report_client)
+    context = create_context(clock, sim_params, strategy, data_portal, market_roller, account_manager)
     trading_agent = TradingAgent(clock=clock,
                                  sim_params=sim_params,
                                  strategy=strategy,
@@ -88,18 +105,31 @@ def trading(strategy_code, config=None, debug=False, log_obj=None, **kwargs):
                                  trading_scheduler=trading_scheduler,
                                  event_engine=event_engine,
                                  ctp_gateway=ctp_gateway,
-                                 pms_lite=pms_lite)
+                                 pms_lite=pms_lite,
+                                 report_client=report_client)
     trading_agent.prepare_initialize(minute_loading_rate=5)
     trading_agent.pre_trading_day(clock.clearing_date)
     trading_agent.rolling_load_minute_data(trading_scheduler.rolling_load_ranges_minutely(clock.clearing_date))
     trading_agent.pre_trading_minute(clock.clearing_date)
+    metrics_server = start_metrics_server(metrics_port) if metrics_port else None
     trading_agent.start()
     event_engine.start()
+    if replay_files:
+        ctp_gateway.market_gateway.start()
     while trading_agent.is_active():
         time.sleep(1)
+        if replay_files and not ctp_gateway.market_gateway.is_active():
+            trading_agent.stop()
+            break
         ctp_gateway.query_information()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+        metrics_server.server_close()
     if event_engine.is_active():
         event_engine.publish(EventType.event_stop)
         event_engine.stop()
-    else:
+    elif exit_on_error:
         sys.exit(RETURN_CODE_EXIT_ERROR)
+    else:
+        raise TradingException('[TRADING] event engine stopped before trading finished.')
+    return trading_agent
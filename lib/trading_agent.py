@@ -4,6 +4,7 @@
 # **********************************************************************************#
 from copy import copy
 from datetime import datetime
+from utils.tracing import traced
 from . trading_base import *
 from . event.event_base import EventType
 from . gateway.trading_gateway import TradingGateway
@@ -21,7 +22,7 @@ class TradingAgent(TradingGateway):
                  context=None, account_manager=None,
                  market_roller=None, trading_scheduler=None,
                  event_engine=None, ctp_gateway=None,
-                 pms_lite=None, log=None, debug=False):
+                 pms_lite=None, report_client=None, log=None, debug=False):
         super(TradingAgent, self).__init__()
         assert isinstance(sim_params, SimulationParameters)
         self.clock = clock
@@ -35,6 +36,7 @@ class TradingAgent(TradingGateway):
         self.event_engine = event_engine
         self.ctp_gateway = ctp_gateway
         self.pms_lite = pms_lite
+        self.report_client = report_client
         self.log = log
         self.debug = debug
         self.trading_days_length = None
@@ -59,6 +61,7 @@ class TradingAgent(TradingGateway):
         """
         return self._active
 
+    @traced('trading_agent.on_bar')
     def on_bar(self, bar, **kwargs):
         """
         On bar.
@@ -70,7 +73,7 @@ class TradingAgent(TradingGateway):
         current_bars = \
             self.data_portal.market_service.minute_bar_map.get(self.clock.current_date.strftime('%Y-%m-%d'), list())
         self._update_clock(current_bars=current_bars)
-        if self.clock.current_minute in self.trading_scheduler.trigger_minutes(current_bars):
+        if self.trading_scheduler.is_trigger_minute(self.clock.current_minute, current_bars):
             self.handle_data()
             self.send_orders()
 
@@ -148,6 +151,7 @@ class TradingAgent(TradingGateway):
         self.market_roller.prepare_minute_data(current_date=date,
                                                extend_loading_days=minute_window)
 
+    @traced('trading_agent.handle_data')
     def handle_data(self):
         """
         Publish reference information and handle users data.
@@ -171,6 +175,7 @@ class TradingAgent(TradingGateway):
             del account.submitted_cancel_orders[:]
         return cash_orders, submitted_orders, submitted_cancel_orders
 
+    @traced('trading_agent.send_orders')
     def send_orders(self, response=None):
         """
         Send orders
@@ -5,6 +5,7 @@
 from utils.datetime import get_clearing_date_of
 from . context.parameters import SimulationParameters
 from . context.strategy import TradingStrategy
+from . context.context import Context
 from . trade import Commission, Slippage
 from . const import DEFAULT_KEYWORDS
 
@@ -97,6 +98,30 @@ def strategy_from_code(code, log_obj=None):
     return strategy, locals()
 
 
+def create_context(clock, sim_params, strategy, data_portal, market_roller, account_manager):
+    """
+    Create strategy context on the services of data portal, history served by market roller.
+
+    Args:
+        clock(Clock): clock
+        sim_params(SimulationParameters): simulation parameters
+        strategy(TradingStrategy): strategy
+        data_portal(DataPortal): data portal
+        market_roller(MarketRoller): market roller
+        account_manager(AccountManager): account manager
+
+    Returns:
+        Context: context
+    """
+    return Context(clock, sim_params, strategy,
+                   market_service=data_portal.market_service,
+                   universe_service=data_portal.universe_service,
+                   asset_service=data_portal.asset_service,
+                   calendar_service=data_portal.calendar_service,
+                   market_roller=market_roller,
+                   account_manager=account_manager)
+
+
 def orders_to_response(trading_orders, sub_portfolio_info, registered_accounts=None, key='account_type'):
     """
 
@@ -112,5 +137,6 @@ __all__ = [
     'parse_prior_params',
     'parse_sim_params',
     'strategy_from_code',
+    'create_context',
     'orders_to_response'
 ]
@@ -2,6 +2,7 @@
 # **********************************************************************************#
 #     File:
 # **********************************************************************************#
+import bisect
 from datetime import datetime
 from utils.datetime import *
 from utils.error import Errors
@@ -35,10 +36,22 @@ class TradingScheduler(object):
         self.trading_days_for_window = max(self.trading_days_daily_window, self.trading_days_minute_window)
         self.trading_days_bt_idx = {v: k for (k, v) in enumerate(self.trading_days_bt)}
         self.trading_days_for_window_idx = {v: k for (k, v) in enumerate(self.trading_days_for_window)}
+        self._trading_days_with_history = {
+            'd': self.trading_days_daily_window + self.trading_days_bt,
+            'm': self.trading_days_minute_window + self.trading_days_bt
+        }
+        self._trading_days_with_history_idx = {
+            freq: {v: k for (k, v) in enumerate(trading_days)}
+            for freq, trading_days in self._trading_days_with_history.iteritems()
+        }
 
         self.minute_loading_signal = 0
 
         self._trigger_days = []
+        self._trigger_days_set = set()
+        self._trigger_minutes_source = None
+        self._trigger_minutes_length = 0
+        self._trigger_minutes_set = set()
         self._rolling_load_range_d = dict()
         self._rolling_load_range_m = dict()
         self._minute_bars_loading_events = DefaultDict(list)
@@ -75,6 +88,7 @@ class TradingScheduler(object):
         if not trigger_days:
             raise Errors.INVALID_TRIGGER_DAYS
         self._trigger_days = trigger_days
+        self._trigger_days_set = set(trigger_days)
 
     def trigger_days(self):
         """
@@ -100,6 +114,23 @@ class TradingScheduler(object):
             raise Errors.INVALID_REFRESH_RATE
         return trigger_minutes
 
+    def is_trigger_minute(self, minute, minutes):
+        """
+        Judge whether minute is a trigger minute of minutes, trigger minutes being computed once per minute list.
+
+        Args:
+            minute(string): minute
+            minutes(list): minute list
+
+        Returns:
+            boolean: True or False
+        """
+        if minutes is not self._trigger_minutes_source or len(minutes) != self._trigger_minutes_length:
+            self._trigger_minutes_source = minutes
+            self._trigger_minutes_length = len(minutes)
+            self._trigger_minutes_set = set(self.trigger_minutes(minutes))
+        return minute in self._trigger_minutes_set
+
     def previous_date(self, date):
         """
         Get previous date.
@@ -122,7 +153,7 @@ class TradingScheduler(object):
         Returns:
             boolean: True or False
         """
-        return date in self._trigger_days
+        return date in self._trigger_days_set
 
     def _prepare_rolling_load_ranges(self, loading_rate=5, freq='d'):
         """
@@ -131,8 +162,9 @@ class TradingScheduler(object):
         Args:
             loading_rate(int): loading rate
         """
-        all_trading_days = self.trading_days(include_max_history=True, freq=freq)
-        all_trading_days_idx = {v: k for (k, v) in enumerate(all_trading_days)}
+        freq = 'm' if freq == 'm' else 'd'
+        all_trading_days = self._trading_days_with_history[freq]
+        all_trading_days_idx = self._trading_days_with_history_idx[freq]
         end_index = 0
         rolling_load_range = dict()
         for index, date in enumerate(self._trigger_days):
@@ -183,14 +215,10 @@ class TradingScheduler(object):
         Returns:
             list: trading days list
         """
-        trading_days = self.trading_days_bt
         if include_max_history:
-            if freq == 'm':
-                trading_days = self.trading_days_minute_window + trading_days
-            else:
-                trading_days = self.trading_days_daily_window + trading_days
-        if start_date is not None:
-            trading_days = [trading_day for trading_day in trading_days if trading_day >= start_date]
-        if end_date is not None:
-            trading_days = [trading_day for trading_day in trading_days if trading_day <= end_date]
-        return trading_days
+            trading_days = self._trading_days_with_history['m' if freq == 'm' else 'd']
+        else:
+            trading_days = self.trading_days_bt
+        begin_index = 0 if start_date is None else bisect.bisect_left(trading_days, start_date)
+        end_index = len(trading_days) if end_date is None else bisect.bisect_right(trading_days, end_date)
+        return trading_days[begin_index:end_index]
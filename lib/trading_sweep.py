@@ -0,0 +1,154 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Parameter sweep over the trading pipeline with shared market data.
+# **********************************************************************************#
+import os
+import shutil
+import tempfile
+import traceback
+import numpy as np
+import pandas as pd
+from copy import copy
+from string import Template
+from multiprocessing import Pool
+from . trading import trading
+from . trading_base import (
+    strategy_from_code,
+    parse_sim_params
+)
+from . instrument.data_portal import DataPortal
+from . configs import logger
+
+
+# data portal inherited by forked workers
+_SHARED_DATA_PORTAL = None
+
+
+def _memory_map_frame(frame, file_path):
+    """
+    Dump frame values to file_path and rebuild the frame on a copy-on-write memory map.
+
+    Args:
+        frame(DataFrame): frame of one dtype
+        file_path(string): memory map file path
+
+    Returns:
+        DataFrame: memory mapped frame
+    """
+    values = np.ascontiguousarray(frame.values)
+    memory_map = np.memmap(file_path, dtype=values.dtype, mode='w+', shape=values.shape)
+    memory_map[:] = values
+    memory_map.flush()
+    del memory_map
+    values = np.memmap(file_path, dtype=values.dtype, mode='c', shape=values.shape)
+    return pd.DataFrame(values, index=frame.index, columns=frame.columns, copy=False)
+
+
+def share_market_data(data_portal, directory):
+    """
+    Move daily bars of all market data onto memory maps under directory, so that forked workers
+    read the same pages instead of copying them.
+
+    Args:
+        data_portal(DataPortal): loaded data portal
+        directory(string): memory map directory
+
+    Returns:
+        DataPortal: data portal
+    """
+    for market_data in data_portal.market_service.market_data_list:
+        if market_data is None:
+            continue
+        for field, frame in market_data.daily_bars.items():
+            if not isinstance(frame, pd.DataFrame) or frame.empty or frame.values.dtype == object:
+                continue
+            file_path = os.path.join(directory, '{}_{}.dat'.format(id(market_data), field))
+            market_data.daily_bars[field] = _memory_map_frame(frame, file_path)
+    return data_portal
+
+
+def _variant_of(strategy_code, config, params):
+    """
+    Strategy code and config of one variant: params substitute $name placeholders in strategy code
+    and override config.
+    """
+    variant_config = copy(config)
+    variant_config.update(params)
+    return Template(strategy_code).safe_substitute(params), variant_config
+
+
+def _run_variant(args):
+    """
+    Run one variant in a forked worker against the shared data portal, offline on the replay gateway.
+
+    Args:
+        args(tuple): index, strategy code, config, params, debug, replay files, replay speed
+
+    Returns:
+        tuple: index, params, BTReport or None if failed, error traceback or None
+    """
+    index, strategy_code, config, params, debug, replay_files, replay_speed = args
+    strategy_code, config = _variant_of(strategy_code, config, params)
+    try:
+        trading_agent = trading(strategy_code, config=config, debug=debug, data_portal=_SHARED_DATA_PORTAL,
+                                replay_files=replay_files, replay_speed=replay_speed, exit_on_error=False,
+                                metrics_port=None)
+        report = trading_agent.report_client.output()
+    except Exception:
+        error = traceback.format_exc()
+        logger.error('[SWEEP] variant {} {} failed: {}'.format(index, params, error))
+        return index, params, None, error
+    return index, params, report, None
+
+
+def sweep(strategy_code, param_sets, replay_files, config=None, processes=None, debug=False, directory=None,
+          replay_speed=None):
+    """
+    Run strategy variants of a parameter sweep in forked workers. Data portal is loaded once by the base
+    config and shared through memory maps, so all variants should share its date range and universe.
+    Variants run on the replay gateway of recorded ctp callbacks, no ctp front is connected and no order
+    leaves the process. Each worker process runs a single variant, since the clock, pms lite and the other
+    singletons built by trading last as long as their process.
+
+    Args:
+        strategy_code(string): strategy code, $name placeholders are substituted by params
+        param_sets(list of dict): params of each variant, also overriding config
+        replay_files(string or list): recorded ctp files replayed to every variant
+        config(dict): base config parameters
+        processes(int): worker processes, default cpu count
+        debug(boolean): whether to debug
+        directory(string): memory map directory, a temporary one removed after the sweep if not specified
+        replay_speed(float): replay speed multiplier, None or 0 for as fast as possible
+
+    Returns:
+        list: (params, BTReport or None, error traceback or None) in the order of param_sets
+    """
+    global _SHARED_DATA_PORTAL
+    config = config or dict()
+    base_code, base_config = _variant_of(strategy_code, config, param_sets[0] if param_sets else dict())
+    _, local_variables = strategy_from_code(base_code)
+    sim_params = parse_sim_params(base_config, local_variables)
+    temporary = directory is None
+    directory = tempfile.mkdtemp(prefix='sweep_') if temporary else directory
+    try:
+        data_portal = DataPortal().batch_load_data(sim_params)
+        _SHARED_DATA_PORTAL = share_market_data(data_portal, directory)
+        tasks = [(index, strategy_code, config, params, debug, replay_files, replay_speed)
+                 for index, params in enumerate(param_sets)]
+        pool = Pool(processes=processes, maxtasksperchild=1)
+        try:
+            results = pool.map(_run_variant, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        _SHARED_DATA_PORTAL = None
+        if temporary:
+            shutil.rmtree(directory, ignore_errors=True)
+    return [(params, report, error) for _, params, report, error in results]
+
+
+__all__ = [
+    'share_market_data',
+    'sweep'
+]
@@ -1,16 +1,122 @@
 # -*- coding: UTF-8 -*-
 # **********************************************************************************#
 #     File: Web interface.
+#
+#     Shared state: in prefork serving every worker process imports this module after fork, so the
+#     PMSLite and FuturesPMSAgent singletons, event engines, caches and connections are private to
+#     one worker, and concurrent requests of a worker are greenlets sharing them. State that must be
+#     seen by every worker lives in redis and mongodb: orders, positions and portfolios are written to
+#     redis on each request. Worker memory still keeps the order pool of FuturesBroker: the active
+#     orders accepted by a worker, and those loaded from redis by its prepare, stay in that worker's
+#     pool between requests and are transacted by that worker only. A worker does not see orders
+#     accepted or cancelled through other workers until its pool is reloaded by prepare.
+#     Background workers run once per service through start_background_workers, not per worker.
+#     Metrics are per process as well: /metrics of a worker renders that worker's registry only, its
+#     redis queues, traced latencies and caches, and prometheus should scrape every worker or aggregate
+#     the series it gets. The event engine, market roller, data portal and market service cache collectors
+#     live in the trading process, and are served by the exporter trading starts on metrics trading_port.
 # **********************************************************************************#
-from flask import Flask
+from flask import Flask, Response
 from flask_restful import Api
+from utils.flask_tools import cross_site, get_request_info
+from utils.metrics import CONTENT_TYPE, registry
+from utils.tracing import enable_tracing
+from . configs import tracing_enable, tracing_dump_interval
+from . core.enums import SecuritiesType
+from . data import redis_base  # registers redis queue metrics
+from . pms.pms_lite import PMSLite
+from . pms.pms_agent.futures_pms_agent import FuturesPMSAgent
+from . trade.order import Order, OrderState
 from . trader import (
     feedback_worker,
     database_worker
 )
 
 
+MAX_BATCH_ORDERS = 2000
+
 server = Flask(__name__)
 api = Api(server)
-feedback_worker()
-database_worker()
+if tracing_enable:
+    enable_tracing(dump_interval=tracing_dump_interval)
+# every worker imports this module after fork, and loads its own exchangeable futures before serving
+FuturesPMSAgent().prepare()
+
+
+def start_background_workers():
+    """
+    Start feedback and database workers, once per service.
+    """
+    feedback_worker()
+    database_worker()
+
+
+@server.route('/metrics')
+def metrics():
+    """
+    Operational metrics of this worker process in Prometheus text format, see the module header.
+    """
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+def _batch_items():
+    """
+    Items of a batch request {"orders": [...]}.
+
+    Returns:
+        tuple: items, error response or None
+    """
+    items = get_request_info()['req_data'].get('orders')
+    if not isinstance(items, list) or not items:
+        return None, (400, {'message': 'orders should be a non-empty list.'})
+    if len(items) > MAX_BATCH_ORDERS:
+        return None, (400, {'message': 'at most {} orders per batch.'.format(MAX_BATCH_ORDERS)})
+    return items, None
+
+
+@server.route('/orders/batch', methods=['POST'])
+@cross_site
+def batch_orders():
+    """
+    Accept the orders of one request through a single accept_orders call, so that they are checked together
+    and persisted to redis in one step. Malformed orders are rejected alone.
+
+    Returns:
+        dict: status of each order, in the order of requests
+    """
+    order_requests, error = _batch_items()
+    if error:
+        return error
+    statuses, orders = [None] * len(order_requests), list()
+    for index, order_request in enumerate(order_requests):
+        try:
+            orders.append((index, Order.from_request(order_request)))
+        except (TypeError, ValueError, ZeroDivisionError) as exception:
+            statuses[index] = {'portfolio_id': None, 'order_id': None, 'state': OrderState.REJECTED,
+                               'state_message': 'invalid order request: {}'.format(exception)}
+    if orders:
+        checked_orders = PMSLite().accept_orders([order for _, order in orders], securities_type=SecuritiesType.futures)
+        for (index, _), order in zip(orders, checked_orders):
+            statuses[index] = {'portfolio_id': order.portfolio_id, 'order_id': order.order_id,
+                               'state': order.state, 'state_message': order.state_message}
+    return {'orders': statuses}
+
+
+@server.route('/orders/cancel/batch', methods=['POST'])
+@cross_site
+def batch_cancel_orders():
+    """
+    Cancel the orders of one request, {"orders": [{"portfolio_id": ..., "order_id": ...}]}, with one redis query
+    and one redis dump.
+
+    Returns:
+        dict: cancel status of each distinct order
+    """
+    cancel_requests, error = _batch_items()
+    if error:
+        return error
+    if not all(isinstance(item, dict) and item.get('portfolio_id') and item.get('order_id')
+               for item in cancel_requests):
+        return 400, {'message': 'each order should have portfolio_id and order_id.'}
+    to_cancel_list = [{'portfolio_id': item['portfolio_id'], 'order_id': item['order_id']} for item in cancel_requests]
+    return {'orders': PMSLite().cancel_orders(to_cancel_list)}
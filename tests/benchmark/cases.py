@@ -0,0 +1,177 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Hot path benchmark cases.
+# **********************************************************************************#
+import threading
+from collections import namedtuple
+from . harness import SkipBenchmark, benchmark
+
+
+EVENTS_PER_CALL = 1000
+PORTFOLIOS = 50
+ORDERS_PER_CALL = 20
+
+BarData = namedtuple('BarData', ['security_id', 'bar_minute', 'open_price', 'high_price', 'low_price',
+                                 'close_price', 'total_volume'])
+
+
+class BenchmarkEnvironment(object):
+    """
+    Shared fixtures of benchmark cases, built lazily against the installed stand-ins.
+    """
+    def __init__(self, symbols, start, end, data_client=None, redis_client=None, mongodb_client=None):
+        """
+        Args:
+            symbols(list): futures symbols
+            start(datetime.datetime): start date
+            end(datetime.datetime): end date
+            data_client(SyntheticDataClient): DataAPI stand-in
+            redis_client(obj): redis stand-in, None if not available
+            mongodb_client(obj): mongodb stand-in, None if not available
+        """
+        self.symbols = symbols
+        self.start = start
+        self.end = end
+        self.data_client = data_client
+        self.redis_client = redis_client
+        self.mongodb_client = mongodb_client
+        self._market_service = None
+
+    def require_redis(self):
+        if self.redis_client is None:
+            raise SkipBenchmark('redis stand-in is not available, install fakeredis')
+
+    @property
+    def market_service(self):
+        """
+        Market service of symbols with daily bars and the last two days of minute bars loaded.
+        """
+        if self._market_service is None:
+            from lib.instrument.asset_service import AssetService
+            from lib.instrument.calendar_service import CalendarService
+            from lib.instrument.market_service import MarketService
+            from lib.instrument.universe_service import UniverseService
+            calendar_service = CalendarService().batch_load_data(self.start, self.end)
+            universe_service = UniverseService()
+            universe_service.full_universe_set |= set(self.symbols)
+            asset_service = AssetService.from_symbols(self.symbols)
+            market_service = MarketService.create_with_service(asset_service=asset_service,
+                                                               universe_service=universe_service,
+                                                               calendar_service=calendar_service)
+            market_service.rolling_load_daily_data(calendar_service.all_trading_days)
+            market_service.rolling_load_minute_data(calendar_service.trading_days[-2:])
+            self._market_service = market_service
+        return self._market_service
+
+    def position_info(self, portfolios=PORTFOLIOS):
+        """
+        Position schemas holding every symbol.
+        """
+        from lib.core.schema import PositionSchema
+        from lib.trade.position import FuturesPosition
+        date = self.end.strftime('%Y%m%d')
+        return {
+            'portfolio_{}'.format(index): PositionSchema(
+                portfolio_id='portfolio_{}'.format(index), date=date, cash=1e6,
+                positions={symbol: FuturesPosition(symbol=symbol, price=3000., long_amount=2, long_cost=3000.,
+                                                   long_margin=6000., margin_rate=0.1)
+                           for symbol in self.symbols},
+                pre_portfolio_value=1e6, portfolio_value=1e6)
+            for index in range(portfolios)
+        }
+
+
+@benchmark('market_service.slice', number=20)
+def market_service_slice(environment):
+    market_service = environment.market_service
+    end_date = market_service.calendar_service.trading_days[-1]
+    return lambda: market_service.slice(environment.symbols, ['closePrice', 'openPrice', 'turnoverVol'],
+                                        end_date, time_range=20, style='ast', rtype='frame')
+
+
+@benchmark('market_roller.prepare_minute_data', number=3)
+def market_roller_prepare_minute_data(environment):
+    from lib.market.market_roller import MarketRoller
+    market_service = environment.market_service
+    trading_days = market_service.calendar_service.trading_days
+    market_roller = MarketRoller(environment.symbols, market_service, trading_days, 5, 1)
+    date = trading_days[-1]
+
+    def _prepare():
+        market_roller.tas_minute_cache = None
+        market_roller.prepare_minute_data(date, extend_loading_days=1)
+    return _prepare
+
+
+@benchmark('futures_broker.transact_minute', number=5, items=ORDERS_PER_CALL)
+def futures_broker_transact_minute(environment):
+    environment.require_redis()
+    from lib.core.schema import SchemaType
+    from lib.data.database_api import dump_to_
+    from lib.pms.broker.futures_broker import FuturesBroker
+    from lib.trade.order import Order
+    symbol = environment.symbols[0]
+    position_info = environment.position_info()
+    portfolio_ids = sorted(position_info)
+    broker = FuturesBroker()
+    bar_data = BarData(symbol, '09:31', 3000., 3010., 2990., 3005., 1e6)
+
+    def _transact():
+        dump_to_('redis', SchemaType.position, position_info)
+        broker.accept_orders([Order(symbol, 1, order_time=environment.end.strftime('%Y-%m-%d 09:30'),
+                                    order_type='market', portfolio_id=portfolio_ids[index % len(portfolio_ids)],
+                                    offset_flag='open', direction=1)
+                              for index in range(ORDERS_PER_CALL)])
+        broker.transact_minute(bar_data)
+    return _transact
+
+
+@benchmark('futures_pms_agent.evaluate', number=5, items=PORTFOLIOS)
+def futures_pms_agent_evaluate(environment):
+    from lib.pms.pms_agent.futures_pms_agent import FuturesPMSAgent
+    pms_agent = FuturesPMSAgent()
+    position_info = environment.position_info()
+    return lambda: pms_agent.evaluate(position_info)
+
+
+@benchmark('event_engine.dispatch', number=5, items=EVENTS_PER_CALL)
+def event_engine_dispatch(environment):
+    from lib.event.event_engine import EventEngine
+    engine = EventEngine()
+    done = threading.Event()
+    counter = [0]
+
+    def _handler(**kwargs):
+        counter[0] += 1
+        if counter[0] >= EVENTS_PER_CALL:
+            done.set()
+    engine.register_handlers('benchmark', _handler)
+    engine.start()
+
+    def _dispatch():
+        counter[0] = 0
+        done.clear()
+        for index in xrange(EVENTS_PER_CALL):
+            engine.publish('benchmark', index=index)
+        done.wait(60)
+    _dispatch.teardown = engine.stop
+    return _dispatch
+
+
+@benchmark('redis_api.round_trip', number=20, items=PORTFOLIOS)
+def redis_api_round_trip(environment):
+    environment.require_redis()
+    from lib.core.schema import SchemaType
+    from lib.data.redis_api import dump_schema_to_redis, query_from_redis
+    position_info = environment.position_info()
+    portfolio_ids = sorted(position_info)
+
+    def _round_trip():
+        dump_schema_to_redis(SchemaType.position, position_info)
+        query_from_redis(SchemaType.position, portfolio_ids)
+    return _round_trip
+
+
+__all__ = [
+    'BenchmarkEnvironment'
+]
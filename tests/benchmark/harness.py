@@ -0,0 +1,206 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Benchmark registry, timing and JSON baselines.
+# **********************************************************************************#
+import sys
+import json
+import platform
+import traceback
+import subprocess
+from datetime import datetime
+from timeit import default_timer
+from collections import OrderedDict
+
+
+DEFAULT_TOLERANCE = 0.2
+_BENCHMARKS = OrderedDict()
+
+
+class SkipBenchmark(Exception):
+    """
+    Raised by a benchmark setup whose stand-in or module is not available.
+    """
+    pass
+
+
+class Benchmark(object):
+    """
+    One benchmark: setup(environment) prepares data outside timing and returns the callable to time,
+    whose optional teardown attribute is called after timing.
+    """
+    def __init__(self, name, setup, number=10, repeat=5, items=1):
+        """
+        Args:
+            name(string): benchmark name
+            setup(func): setup function of environment, returning the callable to time
+            number(int): calls per timing
+            repeat(int): timings
+            items(int): items processed per call, such as events or orders, for the rate
+        """
+        self.name = name
+        self.setup = setup
+        self.number = number
+        self.repeat = repeat
+        self.items = items
+
+
+def benchmark(name, number=10, repeat=5, items=1):
+    """
+    Register a benchmark setup function.
+    """
+    def decorator(setup):
+        _BENCHMARKS[name] = Benchmark(name, setup, number=number, repeat=repeat, items=items)
+        return setup
+    return decorator
+
+
+def registered_benchmarks():
+    """
+    Registered benchmarks by name.
+    """
+    return _BENCHMARKS
+
+
+def measure(func, number=10, repeat=5):
+    """
+    Time func.
+
+    Returns:
+        list: seconds per call of each repeat
+    """
+    timings = list()
+    for _ in xrange(repeat):
+        start = default_timer()
+        for _ in xrange(number):
+            func()
+        timings.append((default_timer() - start) / number)
+    return timings
+
+
+def run_benchmark(bench, environment):
+    """
+    Run one benchmark, recording skips and errors instead of raising.
+
+    Returns:
+        dict: result
+    """
+    try:
+        func = bench.setup(environment)
+    except (SkipBenchmark, ImportError) as error:
+        return {'status': 'skipped', 'reason': str(error)}
+    except Exception:
+        return {'status': 'error', 'reason': traceback.format_exc().strip().splitlines()[-1]}
+    try:
+        timings = sorted(measure(func, number=bench.number, repeat=bench.repeat))
+    except Exception:
+        return {'status': 'error', 'reason': traceback.format_exc().strip().splitlines()[-1]}
+    finally:
+        if getattr(func, 'teardown', None):
+            func.teardown()
+    best = timings[0]
+    return {
+        'status': 'ok',
+        'number': bench.number,
+        'repeat': bench.repeat,
+        'best': best,
+        'median': timings[len(timings) // 2],
+        'rate': bench.items / best if best else None,
+    }
+
+
+def run(environment, names=None, log=None):
+    """
+    Run registered benchmarks.
+
+    Args:
+        environment(obj): benchmark environment passed to setups
+        names(list): names to run, default all
+        log(func): line logger
+
+    Returns:
+        OrderedDict: name --> result
+    """
+    results = OrderedDict()
+    for name, bench in _BENCHMARKS.iteritems():
+        if names and name not in names:
+            continue
+        results[name] = result = run_benchmark(bench, environment)
+        if log:
+            log(format_result(name, result))
+    return results
+
+
+def format_result(name, result):
+    if result['status'] != 'ok':
+        return '{:<36} {:>8}  {}'.format(name, result['status'], result['reason'])
+    rate = '{:>12.1f}/s'.format(result['rate']) if result['rate'] else ''
+    return '{:<36} {:>10.3f} ms {}'.format(name, result['best'] * 1e3, rate)
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD']).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_baseline(results, file_path):
+    """
+    Save results with the current commit as a JSON baseline.
+    """
+    baseline = {
+        'meta': {
+            'commit': _git_commit(),
+            'created': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    with open(file_path, 'w') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+    return baseline
+
+
+def load_baseline(file_path):
+    with open(file_path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare best timings against a baseline.
+
+    Args:
+        results(dict): name --> result
+        baseline(dict): loaded baseline
+        tolerance(float): relative slowdown tolerated before reporting a regression
+
+    Returns:
+        list: (name, baseline seconds, current seconds, ratio, regressed) of benchmarks ok in both
+    """
+    comparison = list()
+    baseline_results = baseline['results']
+    for name, result in results.iteritems():
+        previous = baseline_results.get(name)
+        if result['status'] != 'ok' or not previous or previous['status'] != 'ok':
+            continue
+        ratio = result['best'] / previous['best'] if previous['best'] else float('inf')
+        comparison.append((name, previous['best'], result['best'], ratio, ratio > 1 + tolerance))
+    return comparison
+
+
+__all__ = [
+    'DEFAULT_TOLERANCE',
+    'SkipBenchmark',
+    'Benchmark',
+    'benchmark',
+    'registered_benchmarks',
+    'measure',
+    'run_benchmark',
+    'run',
+    'format_result',
+    'save_baseline',
+    'load_baseline',
+    'compare'
+]
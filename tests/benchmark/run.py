@@ -0,0 +1,66 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Offline benchmark runner.
+#    Usage: python -m tests.benchmark.run [-k NAME] [--save FILE] [--compare FILE] [--tolerance 0.2]
+#           exits 1 on regressions and on requested benchmarks skipped or failed.
+# **********************************************************************************#
+import sys
+import argparse
+from datetime import datetime
+from . import cases
+from . harness import DEFAULT_TOLERANCE, run, save_baseline, load_baseline, compare
+from . stand_ins import SyntheticDataClient, redis_stand_in, mongodb_stand_in, stand_ins
+
+
+DEFAULT_SYMBOLS = ['RB1810', 'RM809', 'AG1812', 'CU1809', 'IF1809', 'IH1809', 'IC1809', 'TA809', 'M1809', 'Y1809']
+
+
+def _optional(factory):
+    try:
+        return factory()
+    except ImportError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run offline benchmarks against local stand-ins.')
+    parser.add_argument('-k', dest='names', action='append', help='benchmark name, repeatable')
+    parser.add_argument('--symbols', type=int, default=len(DEFAULT_SYMBOLS), help='number of symbols')
+    parser.add_argument('--start', default='2018-06-01', help='start date')
+    parser.add_argument('--end', default='2018-08-31', help='end date')
+    parser.add_argument('--save', help='save results as a JSON baseline')
+    parser.add_argument('--compare', help='compare results with a JSON baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='tolerated relative slowdown')
+    args = parser.parse_args(argv)
+
+    symbols = (DEFAULT_SYMBOLS * (args.symbols // len(DEFAULT_SYMBOLS) + 1))[:args.symbols]
+    symbols = [symbol if index < len(DEFAULT_SYMBOLS) else '{}{}'.format(symbol[:2], 1900 + index)
+               for index, symbol in enumerate(symbols)]
+    data_client = SyntheticDataClient(symbols)
+    redis_client = _optional(redis_stand_in)
+    mongodb_client = _optional(mongodb_stand_in)
+    environment = cases.BenchmarkEnvironment(symbols, datetime.strptime(args.start, '%Y-%m-%d'),
+                                             datetime.strptime(args.end, '%Y-%m-%d'),
+                                             data_client=data_client, redis_client=redis_client,
+                                             mongodb_client=mongodb_client)
+    with stand_ins(data_client=data_client, redis_client=redis_client, mongodb_client=mongodb_client):
+        results = run(environment, names=args.names, log=lambda line: sys.stdout.write(line + '\n'))
+    if args.save:
+        save_baseline(results, args.save)
+    regressions = 0
+    if args.compare:
+        for name, previous, current, ratio, regressed in compare(results, load_baseline(args.compare),
+                                                                 tolerance=args.tolerance):
+            regressions += regressed
+            sys.stdout.write('{:<36} {:>10.3f} ms -> {:>10.3f} ms  x{:.2f}{}\n'.format(
+                name, previous * 1e3, current * 1e3, ratio, '  REGRESSED' if regressed else ''))
+    # a requested benchmark that did not run fails the run as a regression does
+    failures = [name for name in args.names or [] if name not in results]
+    failures += [name for name, result in results.iteritems() if result['status'] != 'ok']
+    if failures:
+        sys.stderr.write('benchmarks not run: {}\n'.format(', '.join(failures)))
+    return 1 if regressions or failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
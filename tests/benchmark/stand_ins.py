@@ -0,0 +1,249 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Local stand-ins of Redis, Mongodb and DataAPI for offline benchmarks.
+# **********************************************************************************#
+import re
+import json
+import zlib
+import bisect
+import random
+import importlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urlparse import parse_qsl
+
+
+CONTRACT_OBJECT_PATTERN = re.compile('^[A-Za-z]+')
+ZCE_TICKER_PATTERN = re.compile('^[A-Za-z]{2}\d{3}$')
+DAY_SESSION_BREAKS = [('09:00', 75), ('10:30', 60), ('13:30', 90)]
+
+
+def _bar_times(minutes_per_day, unit=1):
+    """
+    Bar times of one trading day in sessions, every unit minutes.
+    """
+    bar_times = list()
+    for session_start, session_minutes in DAY_SESSION_BREAKS:
+        start = datetime.strptime(session_start, '%H:%M')
+        bar_times.extend((start + timedelta(minutes=minute)).strftime('%H:%M')
+                         for minute in range(1, session_minutes + 1))
+    bar_times = bar_times[:minutes_per_day]
+    return bar_times[unit - 1::unit]
+
+
+class SyntheticDataClient(object):
+    """
+    Stand-in of database_api.client: answers the DataAPI urls requested by database_api with
+    deterministic synthetic futures data. Weekdays are trading days.
+    """
+    def __init__(self, symbols, minutes_per_day=225, seed=0):
+        """
+        Args:
+            symbols(list): futures symbols served by base info and real-time bars
+            minutes_per_day(int): minute bars of each trading day
+            seed(int): seed of synthetic prices
+        """
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.minutes_per_day = minutes_per_day
+        self.seed = seed
+        self.requests = 0
+        self._closes = dict()
+        self._handlers = {
+            'getTradeCal.json': self._trade_calendar,
+            'getMktFutd.json': self._daily_bars,
+            'getFutureBarHistDateRange.json': self._minute_bars,
+            'getFutureBarRTIntraDay.json': self._rt_minute_bars,
+            'getFutu.json': self._base_info,
+            'getMktMFutd.json': self._main_contracts,
+        }
+
+    def init(self, token):
+        pass
+
+    def getData(self, url):
+        """
+        Answer one DataAPI url.
+
+        Returns:
+            tuple: http code, json response
+        """
+        path, _, query = url.partition('?')
+        handler = self._handlers.get(path.rsplit('/', 1)[-1])
+        if handler is None:
+            return 404, ''
+        self.requests += 1
+        return 200, json.dumps({'data': handler(dict(parse_qsl(query)))})
+
+    @staticmethod
+    def _trading_days(begin_date, end_date):
+        begin, end = [datetime.strptime(date.replace('-', ''), '%Y%m%d') for date in (begin_date, end_date)]
+        return [begin + timedelta(days=i) for i in range((end - begin).days + 1)
+                if (begin + timedelta(days=i)).weekday() < 5]
+
+    def _close(self, symbol, date):
+        """
+        Synthetic close price of symbol on date, a random walk by trading day.
+        """
+        symbol = symbol.upper()
+        if symbol not in self._closes:
+            self._closes[symbol] = (random.Random(zlib.crc32(symbol) + self.seed), list(), list())
+        generator, dates, closes = self._closes[symbol]
+        if not dates:
+            dates.append(datetime(2006, 1, 2))
+            closes.append(round(generator.uniform(2000, 5000), 1))
+        while dates[-1] < date:
+            dates.append(dates[-1] + timedelta(days=3 if dates[-1].weekday() == 4 else 1))
+            closes.append(round(closes[-1] * (1 + generator.gauss(0, 0.01)), 1))
+        return closes[bisect.bisect_left(dates, date)]
+
+    def _trade_calendar(self, params):
+        begin = datetime.strptime(params['beginDate'], '%Y%m%d')
+        end = datetime.strptime(params['endDate'], '%Y%m%d')
+        dates = [begin + timedelta(days=i) for i in range((end - begin).days + 1)]
+        return [{'calendarDate': date.strftime('%Y-%m-%d'), 'isOpen': int(date.weekday() < 5)} for date in dates]
+
+    def _daily_bars(self, params):
+        rows = list()
+        for ticker in params['ticker'].split(','):
+            for date in self._trading_days(params['beginDate'], params['endDate']):
+                close = self._close(ticker, date)
+                pre_close = self._close(ticker, date - timedelta(days=3 if date.weekday() == 0 else 1))
+                volume = 1000 + zlib.crc32(ticker + date.strftime('%Y%m%d')) % 10000
+                rows.append({
+                    'ticker': ticker.lower(),
+                    'tradeDate': date.strftime('%Y-%m-%d'),
+                    'openPrice': pre_close,
+                    'highestPrice': max(pre_close, close) * 1.005,
+                    'lowestPrice': min(pre_close, close) * 0.995,
+                    'closePrice': close,
+                    'settlePrice': close,
+                    'preSettlePrice': pre_close,
+                    'turnoverVol': volume,
+                    'turnoverValue': volume * close,
+                    'openInt': volume * 3,
+                })
+        return rows
+
+    def _minute_rows(self, ticker, date, unit=1):
+        close = self._close(ticker, date)
+        pre_close = self._close(ticker, date - timedelta(days=3 if date.weekday() == 0 else 1))
+        bar_times = _bar_times(self.minutes_per_day, unit)
+        date_string = date.strftime('%Y-%m-%d')
+        rows = list()
+        for index, bar_time in enumerate(bar_times):
+            price = round(pre_close + (close - pre_close) * (index + 1) / float(len(bar_times)), 1)
+            rows.append({
+                'dataDate': date_string,
+                'clearingDay': date_string,
+                'barTime': bar_time,
+                'openPrice': price,
+                'highPrice': price + 1,
+                'lowPrice': price - 1,
+                'closePrice': price,
+                'totalVolume': 10 * unit,
+                'totalValue': 10 * unit * price,
+                'openInterest': 1000,
+            })
+        return rows
+
+    def _minute_bars(self, params):
+        ticker = params['instrumentID']
+        rows = list()
+        for date in self._trading_days(params['startDate'], params['endDate']):
+            rows.extend(self._minute_rows(ticker, date, int(params.get('unit', 1))))
+        return [{'barBodys': rows}]
+
+    def _rt_minute_bars(self, params):
+        today = datetime.today()
+        while today.weekday() >= 5:
+            today -= timedelta(days=1)
+        return [{'ticker': ticker.lower(), 'barBodys': self._minute_rows(ticker, today)}
+                for ticker in params['instrumentID'].split(',')]
+
+    def _base_info(self, params):
+        tickers = params['ticker'].split(',') if 'ticker' in params else self.symbols
+        rows = list()
+        for ticker in tickers:
+            # zce tickers have three digits, resolved by the decade of today as their contracts are current
+            zce = ZCE_TICKER_PATTERN.match(ticker) is not None
+            exchange = 'XZCE' if zce else 'CCFX'
+            rows.append({
+                'ticker': ticker.lower(),
+                'secID': '{}.{}'.format(ticker.upper(), exchange),
+                'secShortName': ticker.upper(),
+                'contractObject': CONTRACT_OBJECT_PATTERN.match(ticker).group().upper(),
+                'exchangeCD': exchange,
+                'contMultNum': 10,
+                'contMultUnit': 'ton',
+                'listDate': '2006-01-04',
+                'lastTradeDate': '{}9-12-31'.format(datetime.today().year // 10) if zce else '2099-12-31',
+                'minChgPriceNum': 1,
+                'minChgPriceUnit': 'CNY',
+                'priceUnit': 'CNY',
+                'priceValidDecimal': 0,
+                'tradeCommiNum': 0.0001,
+                'tradeCommiUnit': 'rate',
+                'tradeMarginRatio': 10,
+            })
+        return rows
+
+    def _main_contracts(self, params):
+        rows = list()
+        contracts = dict()
+        for symbol in self.symbols:
+            contracts.setdefault(CONTRACT_OBJECT_PATTERN.match(symbol).group(), symbol)
+        for date in self._trading_days(params['startDate'], params['endDate']):
+            for contract_object, ticker in sorted(contracts.iteritems()):
+                rows.append({'tradeDate': date.strftime('%Y-%m-%d'), 'contractObject': contract_object,
+                             'ticker': ticker.lower(), 'mainCon': 1})
+        return rows
+
+
+def redis_stand_in():
+    """
+    In-memory redis client, provided by fakeredis.
+    """
+    import fakeredis
+    return fakeredis.FakeStrictRedis()
+
+
+def mongodb_stand_in():
+    """
+    In-memory mongodb client, provided by mongomock.
+    """
+    import mongomock
+    return mongomock.MongoClient()
+
+
+@contextmanager
+def stand_ins(data_client=None, redis_client=None, mongodb_client=None):
+    """
+    Set stand-ins as the DataAPI, redis and mongodb connections of lib.data, dropping them on exit.
+
+    Args:
+        data_client(obj): stand-in of the data_api connection
+        redis_client(obj): stand-in of the redis connection
+        mongodb_client(obj): stand-in of the mongodb connection
+    """
+    importlib.import_module('lib.data.database_api')
+    importlib.import_module('lib.data.redis_base')
+    importlib.import_module('lib.data.mongodb_base')
+    connections = importlib.import_module('lib.data.connections').connections
+    replaced = list()
+    try:
+        for name, stand_in in [('data_api', data_client), ('redis', redis_client), ('mongodb', mongodb_client)]:
+            if stand_in is not None:
+                connections[name].set(stand_in)
+                replaced.append(connections[name])
+        yield
+    finally:
+        for connection in replaced:
+            connection.reset()
+
+
+__all__ = [
+    'SyntheticDataClient',
+    'redis_stand_in',
+    'mongodb_stand_in',
+    'stand_ins'
+]
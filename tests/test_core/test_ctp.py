@@ -0,0 +1,33 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+from unittest import TestCase
+from lib.core.ctp import Tick, PositionResponse
+
+
+class TestCTPObject(TestCase):
+
+    def test_from_ctp(self):
+        """
+        Test decoding ctp items.
+        """
+        tick = Tick.from_ctp({'InstrumentID': 'rb1810', 'LastPrice': 3800., 'UpdateMillisec': 500})
+        self.assertEqual(tick.instrument_id, 'rb1810')
+        self.assertEqual(tick.last_price, 3800.)
+        self.assertEqual(tick.update_millisecond, 500)
+        self.assertIsNone(tick.turnover)
+        position = PositionResponse.from_ctp({'InstrumentID': 'rb1810', 'PosiDirection': '2'})
+        self.assertEqual(position.position_direction, '2')
+
+    def test_decoder_layout(self):
+        """
+        Test decoders follow the ctp struct, not the fields of the first item decoded.
+        """
+        self.assertEqual(len(Tick.__ctp_fields__), len(Tick.__slots__) - 1)
+        self.assertIsNone(Tick.from_ctp({'InstrumentID': 'rb1810'}).received_time)
+        self.assertIsNone(PositionResponse.from_ctp({}).instrument_id)
+        position = PositionResponse.from_ctp({'InstrumentID': 'rb1810', 'Position': 3, 'TodayPosition': 1})
+        self.assertEqual((position.instrument_id, position.position, position.today_position), ('rb1810', 3, 1))
+        tick = Tick.from_ctp({'InstrumentID': 'rb1810', 'Turnover': 1.5e6, 'BidPrice1': 3799.})
+        self.assertEqual((tick.turnover, tick.bid_price1), (1.5e6, 3799.))
@@ -0,0 +1,76 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+from unittest import TestCase
+from lib.gateway.ctpGateway.order_scheduler import OrderScheduler, TokenBucket
+
+
+class _Order(object):
+
+    def __init__(self, order_id, price=None):
+        self.order_id = order_id
+        self.price = price
+
+
+class _TraderGateway(object):
+
+    def __init__(self):
+        self.requests = list()
+
+    def send_order(self, order):
+        self.requests.append(('order', order.order_id, order.price))
+
+    def cancel_order(self, order_id):
+        self.requests.append(('cancel', order_id, None))
+
+
+class TestOrderScheduler(TestCase):
+
+    def test_token_bucket(self):
+        """
+        Test token bucket refill.
+        """
+        now = [0.]
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+        self.assertEqual(bucket.consume(), 0.)
+        self.assertEqual(bucket.consume(), 0.)
+        self.assertAlmostEqual(bucket.consume(), 0.5)
+        now[0] = 0.5
+        self.assertEqual(bucket.consume(), 0.)
+
+    def test_priority_and_coalescing(self):
+        """
+        Test cancels go first, replaces and cancels of queued orders are coalesced.
+        """
+        gateway = _TraderGateway()
+        scheduler = OrderScheduler(gateway, rate=1000, burst=1000)
+        scheduler.submit_order(_Order('1', 10.))
+        scheduler.submit_order(_Order('2', 20.))
+        scheduler.submit_order(_Order('1', 11.))
+        self.assertFalse(scheduler.submit_cancel('2'))
+        self.assertTrue(scheduler.submit_cancel('0'))
+        self.assertEqual(scheduler.queue_depth(), {'cancel': 1, 'order': 1})
+        scheduler.flush()
+        self.assertEqual(gateway.requests, [('cancel', '0', None), ('order', '1', 11.)])
+        self.assertEqual(scheduler.get_metrics()['coalesced'], 2)
+
+    def test_throttled_once_per_token_wait(self):
+        """
+        Test a throttled request is counted once while waiting for its token, however often the worker wakes up.
+        """
+        now = [0.]
+        gateway = _TraderGateway()
+        scheduler = OrderScheduler(gateway)
+        scheduler.token_bucket = TokenBucket(rate=1, capacity=1, clock=lambda: now[0])
+        scheduler.submit_order(_Order('1'))
+        scheduler.submit_order(_Order('2'))
+        for _ in range(3):
+            self.assertAlmostEqual(scheduler.dispatch_ready(), 1.)
+        self.assertEqual(scheduler.get_metrics()['throttled'], 1)
+        now[0] = 1.
+        self.assertEqual(scheduler.dispatch_ready(), 0.)
+        scheduler.submit_order(_Order('3'))
+        self.assertAlmostEqual(scheduler.dispatch_ready(), 1.)
+        self.assertEqual(gateway.requests, [('order', '1', None), ('order', '2', None)])
+        self.assertEqual(scheduler.get_metrics()['throttled'], 2)
@@ -0,0 +1,101 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import time
+import threading
+from unittest import TestCase
+from lib.gateway.ctpGateway.ctp_base import GatewayReadiness, ReadinessStage
+from lib.gateway.ctpGateway.market_gateway import CTPMarketGateway
+
+
+class TestGatewayReadiness(TestCase):
+
+    def setUp(self):
+        self.readiness = GatewayReadiness(timeout=5)
+
+    def test_retry_after_failure(self):
+        """A failed stage returns at once until it is reset for a retry, which then waits for its own outcome."""
+        self.readiness.fail(ReadinessStage.logged_in, {'ErrorID': 3})
+        self.assertFalse(self.readiness.wait(ReadinessStage.logged_in))
+        self.readiness.reset(ReadinessStage.logged_in)
+        self.assertFalse(self.readiness.wait(ReadinessStage.logged_in, timeout=0.05))
+        timer = threading.Timer(0.05, self.readiness.set, args=(ReadinessStage.logged_in,))
+        timer.start()
+        self.assertTrue(self.readiness.wait(ReadinessStage.logged_in))
+        timer.join()
+
+    def test_reset_stages(self):
+        """Resetting clears ready stages as well as failed ones."""
+        self.readiness.set(ReadinessStage.connected)
+        self.readiness.fail(ReadinessStage.settlement_confirmed)
+        self.readiness.reset()
+        for stage in ReadinessStage.ALL:
+            self.assertFalse(self.readiness.wait(stage, timeout=0.01))
+        self.readiness.set(ReadinessStage.settlement_confirmed)
+        self.assertTrue(self.readiness.is_ready(ReadinessStage.settlement_confirmed))
+
+    def test_queries_aborted_on_reset(self):
+        """Queries pending when the session resets are reported as failed, not as finished."""
+        self.readiness.register_query(1)
+        self.readiness.register_query(2)
+        self.readiness.finish_query(1)
+        results = dict()
+        waiter = threading.Thread(target=lambda: results.update(query=self.readiness.wait_query(2)))
+        waiter.start()
+        self.readiness.reset()
+        waiter.join(5)
+        self.assertTrue(self.readiness.wait_query(1))
+        self.assertEqual(results, {'query': False})
+        self.readiness.register_query(2)
+        self.readiness.finish_query(2)
+        self.assertTrue(self.readiness.wait_query(2))
+        self.assertEqual((self.readiness._aborted, self.readiness._waiters), (set(), dict()))
+
+    def test_aborted_queries_released(self):
+        """Aborted ids are discarded once all their waiters are released, unwaited ones when the next session ends."""
+        self.readiness.register_query(1)
+        self.readiness.register_query(2)
+        results = list()
+        waiters = [threading.Thread(target=lambda: results.append(self.readiness.wait_query(1))) for _ in range(2)]
+        for waiter in waiters:
+            waiter.start()
+        while self.readiness._waiters.get(1) != 2:
+            time.sleep(0.01)
+        self.readiness.reset()
+        for waiter in waiters:
+            waiter.join(5)
+        self.assertEqual(results, [False, False])
+        self.assertEqual(self.readiness._aborted, {2})
+        self.readiness.register_query(3)
+        self.readiness.reset()
+        self.assertEqual(self.readiness._aborted, {3})
+        self.assertFalse(self.readiness.wait_query(3))
+        self.assertEqual((self.readiness._aborted, self.readiness._waiters), (set(), dict()))
+
+    def test_queries_kept_on_stage_reset(self):
+        """Resetting a stage other than logged_in leaves pending queries of the session pending."""
+        self.readiness.register_query(1)
+        self.readiness.reset(ReadinessStage.settlement_confirmed)
+        self.assertFalse(self.readiness.wait_query(1, timeout=0.01))
+        self.readiness.finish_query(1, last=False)
+        self.assertFalse(self.readiness.wait_query(1, timeout=0.01))
+        self.readiness.finish_query(1)
+        self.assertTrue(self.readiness.wait_query(1))
+
+
+class TestMarketGatewayConnect(TestCase):
+
+    def test_connect_after_login_failure(self):
+        """Connecting again after a failed login returns at once instead of waiting out the readiness timeout."""
+        gateway = CTPMarketGateway(user_id='user', password='password', broker_id='broker', readiness_timeout=5)
+        gateway.createFtdcMdApi = gateway.registerFront = lambda *args: None
+        gateway.init = gateway.onFrontConnected
+        gateway.reqUserLogin = lambda request, request_id: gateway.onRspUserLogin(
+            dict(), {'ErrorID': 3, 'ErrorMsg': 'invalid login'}, request_id, True)
+        for _ in range(2):
+            gateway.connection_status = False
+            start = time.time()
+            self.assertFalse(gateway.connect())
+            self.assertLess(time.time() - start, 1)
+        self.assertFalse(gateway.connect())
@@ -0,0 +1,87 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import os
+import json
+import tempfile
+from unittest import TestCase
+from lib.event.event_base import EventType
+from lib.core.ctp import OrderResponse
+from lib.gateway.ctp_gateway import CTPGateway
+from lib.gateway.ctpGateway.replay_gateway import CTPReplayGateway, CTPRecorder, load_records
+from lib.trade.order import Order
+
+
+class _EventCollector(object):
+
+    def __init__(self):
+        self.events = list()
+
+    def publish(self, event_type, **kwargs):
+        self.events.append((event_type, kwargs))
+
+
+class TestReplayGateway(TestCase):
+
+    def setUp(self):
+        self.file_path = tempfile.mktemp(suffix='.json')
+        records = [
+            {'timestamp': 1., 'callback': 'onRtnDepthMarketData',
+             'data': {'InstrumentID': 'rb1810', 'LastPrice': 3800., 'UpdateMillisec': 0}},
+            {'timestamp': 2., 'callback': 'onRtnDepthMarketData',
+             'data': {'InstrumentID': 'RM809', 'LastPrice': 2400., 'UpdateMillisec': 0}},
+            {'timestamp': 3., 'callback': 'onRtnOrder', 'data': {'OrderRef': '1'}},
+        ]
+        with open(self.file_path, 'w') as record_file:
+            for record in records:
+                record_file.write(json.dumps(record) + '\n')
+
+    def tearDown(self):
+        os.remove(self.file_path)
+
+    def test_replay_as_fast_as_possible(self):
+        """
+        Test replaying recorded callbacks into the event engine.
+        """
+        event_engine = _EventCollector()
+        gateway = CTPReplayGateway(file_paths=self.file_path, event_engine=event_engine)
+        gateway.subscribe(['rb1810'])
+        statistics = gateway.replay()
+        self.assertEqual(statistics.records, 3)
+        self.assertEqual(statistics.ticks, 1)
+        self.assertEqual([_[0] for _ in event_engine.events], [EventType.event_on_tick, EventType.event_on_order])
+        self.assertEqual(event_engine.events[0][1]['tick'].instrument_id, 'rb1810')
+        self.assertIsInstance(event_engine.events[1][1]['order'], OrderResponse)
+        self.assertEqual(event_engine.events[1][1]['order'].order_ref, '1')
+
+    def test_record_gbk_fields(self):
+        """
+        Test recording ctp items carrying GBK encoded strings.
+        """
+        status_message = u'全部成交报单已提交'
+        recorder = CTPRecorder(self.file_path, open_style='w')
+        recorder.record('onRtnOrder', {'OrderRef': '2', 'StatusMsg': status_message.encode('GBK')})
+        recorder.close()
+        (_, callback, data), = list(load_records(self.file_path))
+        self.assertEqual(callback, 'onRtnOrder')
+        self.assertEqual(OrderResponse.from_ctp(data).status_msg, status_message)
+
+    def test_tick_to_order_latency(self):
+        """
+        Test latency is measured from the tick carried by each order, sent straight to the unthrottled replay.
+        """
+        event_engine = _EventCollector()
+        ctp_gateway = CTPGateway.from_replay(self.file_path, event_engine=event_engine)
+        self.assertIsNone(ctp_gateway.order_scheduler)
+        replay_gateway = ctp_gateway.trader_gateway
+        replay_gateway.replay()
+        ticks = [kwargs['tick'] for event_type, kwargs in event_engine.events if event_type == EventType.event_on_tick]
+        self.assertTrue(ticks[0].received_time <= ticks[1].received_time)
+        ctp_gateway.send_order(Order('rb1810', 1, tick_time=ticks[0].received_time - 1.))
+        ctp_gateway.send_order(Order('RM809', 1))
+        self.assertTrue(ctp_gateway.cancel_order('1'))
+        self.assertEqual(replay_gateway.statistics.orders, 2)
+        latency, = replay_gateway.statistics.tick_to_order_latencies
+        self.assertGreaterEqual(latency, 1.)
+        self.assertIsNotNone(CTPGateway.from_replay(self.file_path, throttled=True).order_scheduler)
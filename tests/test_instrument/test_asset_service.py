@@ -0,0 +1,126 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import os
+import tempfile
+import pandas as pd
+from datetime import datetime
+from unittest import TestCase
+from lib.instrument import asset_service
+from lib.instrument.asset_service import (
+    AssetService,
+    AssetType,
+    FuturesAssetInfo,
+    FuturesAssetTable,
+    ContinuousFuturesAssetInfo
+)
+
+
+def _base_info(symbols, exchange='XSGE', last_date='2019-01-15'):
+    """
+    Futures base info frame as load_futures_base_info.
+    """
+    return pd.DataFrame([{
+        'symbol': symbol, 'secShortName': symbol, 'exchangeCD': exchange, 'contMultNum': 10.,
+        'contMultUnit': None, 'listDate': '2018-01-16', 'lastTradeDate': last_date, 'minChgPriceNum': 1.,
+        'minChgPriceUnit': None, 'priceUnit': None, 'priceValidDecimal': 0, 'tradeCommiNum': 0.0001,
+        'tradeCommiUnit': None, 'tradeMarginRatio': 10.} for symbol in symbols])
+
+
+class TestAssetService(TestCase):
+
+    def setUp(self):
+        self.asset_service = AssetService()
+        self.assets = [
+            FuturesAssetInfo(symbol='RB1901', exchange='XSGE', last_date=datetime(2019, 1, 15)),
+            FuturesAssetInfo(symbol='IF1901', exchange='CCFX', last_date=datetime(2019, 1, 18)),
+            ContinuousFuturesAssetInfo(symbol='RBM0', contract_object='RB', main_contract='RB1901')
+        ]
+        zce_asset = FuturesAssetInfo(symbol='SR901', exchange='XZCE', last_date=datetime(2019, 1, 15))
+        zce_asset.other_symbols.append('SR1901')
+        self.assets.append(zce_asset)
+        for asset in self.assets:
+            self.asset_service.include_asset(asset)
+
+    def test_lookups(self):
+        """
+        Test asset lookups by symbol.
+        """
+        asset_service = self.asset_service
+        self.assertIs(asset_service.get_asset_info('SR901', datetime(2018, 6, 1)), self.assets[3])
+        self.assertIs(asset_service.get_asset_info('RB1901', datetime(2018, 6, 1)), self.assets[0])
+        self.assertEqual(asset_service.filter_symbols(AssetType.BASE_FUTURES, ['RB1901', 'RBM0', 'SR901', 'X']),
+                         {'RB1901', 'SR901'})
+        self.assertEqual(asset_service.filter_symbols(AssetType.FUTURES, 'RBM0'), {'RBM0'})
+        self.assertEqual(asset_service.filter_symbols(AssetType.FUTURES),
+                         {'RB1901', 'IF1901', 'RBM0', 'SR901'})
+        self.assertEqual([asset_service.get_symbol_id(asset.symbol) for asset in self.assets], [0, 1, 2, 3])
+        asset_service.include_asset(self.assets[0])
+        self.assertEqual(asset_service.get_symbol_id('RB1901'), 0)
+
+
+class TestFuturesAssetTable(TestCase):
+
+    def setUp(self):
+        self.frame = pd.concat([_base_info(['RB1901', 'RB1905']), _base_info(['SR901'], exchange='XZCE')],
+                               ignore_index=True)
+        self.snapshot = tempfile.mktemp(suffix='.pkl')
+        self.original_table, AssetService.futures_asset_table = AssetService.futures_asset_table, None
+        self.original_loader = asset_service.load_futures_base_info
+        self.loaded = list()
+
+        def _load_futures_base_info(symbols=None):
+            self.loaded.append(symbols)
+            if symbols is None:
+                return self.frame
+            return _base_info([symbol for symbol in symbols if symbol.startswith('RB')])
+
+        asset_service.load_futures_base_info = _load_futures_base_info
+
+    def tearDown(self):
+        AssetService.futures_asset_table = self.original_table
+        asset_service.load_futures_base_info = self.original_loader
+        if os.path.exists(self.snapshot):
+            os.remove(self.snapshot)
+
+    def test_load_and_snapshot(self):
+        """Tables are loaded once into a snapshot, and then from the snapshot without any request."""
+        table = FuturesAssetTable.load(snapshot=self.snapshot)
+        self.assertEqual(self.loaded, [None])
+        self.assertTrue(os.path.exists(self.snapshot))
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.rows(), [0, 1, 2])
+        self.assertEqual(table.record(1)['symbol'], 'RB1905')
+        self.assertEqual(table.record(1)['contMultNum'], 10.)
+        reloaded = FuturesAssetTable.load(snapshot=self.snapshot)
+        self.assertEqual(self.loaded, [None])
+        self.assertEqual([reloaded.record(row) for row in reloaded.rows()], [table.record(row) for row in table.rows()])
+        self.assertIs(AssetService.load_futures_asset_table(), AssetService.load_futures_asset_table())
+        self.assertEqual(self.loaded, [None, None])
+
+    def test_zce_aliases(self):
+        """ZCE rows are indexed by their normalized symbols as well, and looked up as one row."""
+        table = FuturesAssetTable(self.frame)
+        self.assertIn('SR901', table)
+        self.assertIn('SR1901', table)
+        self.assertNotIn('RB901', table)
+        self.assertEqual(table.rows(['SR1901', 'SR901', 'RB1901', 'X']), [0, 2])
+        AssetService.futures_asset_table = table
+        assets = AssetService.all_future_assets(['SR1901'])
+        self.assertEqual([asset.symbol for asset in assets], ['SR901'])
+        self.assertEqual(assets[0].other_symbols, ['SR1901'])
+
+    def test_append_missing_symbols(self):
+        """Symbols missing from the table are requested alone and appended, existing rows keep their index."""
+        AssetService.futures_asset_table = FuturesAssetTable(self.frame)
+        assets = AssetService.all_future_assets(['RB1909', 'RB1901', 'RB2001'])
+        self.assertEqual(self.loaded, [['RB1909', 'RB2001']])
+        self.assertEqual([asset.symbol for asset in assets], ['RB1901', 'RB1909', 'RB2001'])
+        table = AssetService.futures_asset_table
+        self.assertEqual([table.symbol_index[symbol] for symbol in ['RB1901', 'RB1905', 'SR901', 'RB1909']],
+                         [0, 1, 2, 3])
+        table.append(_base_info(['RB1901']))
+        self.assertEqual(len(table), 5)
+        AssetService.all_future_assets(['RB1909', 'SR1901'])
+        self.assertEqual(len(self.loaded), 1)
@@ -0,0 +1,78 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import time
+from threading import Lock
+from unittest import TestCase
+from lib.instrument.loader_dag import LoaderDAG, LoaderStage
+
+
+class TestLoaderDAG(TestCase):
+
+    def setUp(self):
+        self.lock = Lock()
+        self.events = list()
+        self.running = 0
+        self.max_running = 0
+
+    def _stage(self, name, seconds=0.05):
+        def _load():
+            with self.lock:
+                self.running += 1
+                self.max_running = max(self.max_running, self.running)
+                self.events.append(name)
+            time.sleep(seconds)
+            with self.lock:
+                self.running -= 1
+        return _load
+
+    def test_dependencies(self):
+        """
+        Test stages run after their dependencies and independent stages overlap.
+        """
+        dag = LoaderDAG([
+            LoaderStage('calendar', self._stage('calendar')),
+            LoaderStage('asset_table', self._stage('asset_table')),
+            LoaderStage('universe', self._stage('universe'), ['calendar']),
+            LoaderStage('assets', self._stage('assets'), ['universe', 'asset_table']),
+            LoaderStage('disabled', self._stage('disabled'), ['assets'], enabled=False),
+            LoaderStage('market', self._stage('market'), ['disabled']),
+        ], max_workers=4)
+        timings = dag.run()
+        self.assertEqual(set(timings), {'calendar', 'asset_table', 'universe', 'assets', 'disabled', 'market'})
+        self.assertNotIn('disabled', self.events)
+        self.assertLess(self.events.index('calendar'), self.events.index('universe'))
+        self.assertLess(self.events.index('universe'), self.events.index('assets'))
+        self.assertEqual(self.events[-1], 'market')
+        self.assertEqual(self.max_running, 2)
+
+    def test_max_workers(self):
+        """
+        Test max workers bounds running stages.
+        """
+        LoaderDAG([LoaderStage(str(i), self._stage(str(i))) for i in range(4)], max_workers=1).run()
+        self.assertEqual(self.max_running, 1)
+
+    def test_failure(self):
+        """
+        Test the first failure is raised and dependents are not run.
+        """
+        def _fail():
+            raise KeyError('calendar')
+
+        dag = LoaderDAG([
+            LoaderStage('calendar', _fail),
+            LoaderStage('universe', self._stage('universe'), ['calendar']),
+        ])
+        self.assertRaises(KeyError, dag.run)
+        self.assertEqual(self.events, [])
+
+    def test_check(self):
+        """
+        Test unknown dependencies and cycles are rejected.
+        """
+        self.assertRaises(ValueError, LoaderDAG([LoaderStage('a', self._stage('a'), ['b'])]).run)
+        self.assertRaises(ValueError, LoaderDAG([LoaderStage('a', self._stage('a'), ['b']),
+                                                 LoaderStage('b', self._stage('b'), ['a'])]).run)
+        self.assertRaises(ValueError, LoaderDAG().add(LoaderStage('a', None)).add, LoaderStage('a', None))
@@ -0,0 +1,56 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import random
+from datetime import datetime, timedelta
+from unittest import TestCase
+from lib.instrument.universe_service import UniverseService
+
+
+class TestUniverseService(TestCase):
+
+    def setUp(self):
+        random.seed(0)
+        symbols = ['IF{}'.format(i) for i in range(200)]
+        self.trading_days = [datetime(2018, 1, 1) + timedelta(days=i) for i in range(10)]
+        self.universe_service = UniverseService(benchmarks=['IF0'], init_universe_list=['IH1', 'IH2'])
+        self.universe_service.full_universe_set |= set(symbols[:150])
+        self.universe_service.dynamic_universe_dict = \
+            {date: set(random.sample(symbols, 100)) for date in self.trading_days}
+        self.universe_service.dynamic_universe_ranked = \
+            {date: sorted(universe) for date, universe in self.universe_service.dynamic_universe_dict.items()}
+        self.universe_service.untradable_dict = {date: set(random.sample(symbols, 20)) for date in self.trading_days}
+        self.universe_service.st_dict = {date: set(random.sample(symbols, 20)) for date in self.trading_days}
+
+    def test_view(self):
+        """
+        Test view by masks against set algebra.
+        """
+        universe_service = self.universe_service
+        for date in self.trading_days:
+            expected = (universe_service.full_universe_set | {'IF199'}) & universe_service.dynamic_universe_dict[date]
+            expected = (expected | {'IC1'} | universe_service.benchmarks) - universe_service.untradable_dict[date]
+            expected -= universe_service.st_dict[date]
+            for _ in range(2):
+                result = universe_service.view(current_date=date, mergeset=['IF199'], position_securities=['IC1'],
+                                               with_benchmark=True, remove_halt=True, st_level='no_st')
+                self.assertEqual(result, expected)
+            result = universe_service.view(current_date=date, st_level='st', apply_sort=True)
+            self.assertEqual(result, sorted(universe_service.full_universe_set &
+                                            universe_service.dynamic_universe_dict[date] &
+                                            universe_service.st_dict[date]))
+
+    def test_view_invalidation(self):
+        """
+        Test views follow in place changes of universes.
+        """
+        universe_service = self.universe_service
+        universe_service.dynamic_universe_ranked = dict()
+        self.assertNotIn('IC1', universe_service.view(with_init_universe=True))
+        universe_service.full_universe_set |= {'IC1'}
+        self.assertIn('IC1', universe_service.view(with_init_universe=True))
+        universe_service.remove(['IC1'])
+        self.assertNotIn('IC1', universe_service.view(with_init_universe=True))
+        universe_service.add_init_universe(['IC2'])
+        self.assertIn('IC2', universe_service.full_universe)
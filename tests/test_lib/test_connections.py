@@ -0,0 +1,77 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import time
+import redis
+from unittest import TestCase
+from lib.configs import redis_max_connections, redis_pool_timeout
+from lib.data import redis_base
+from lib.data.connections import LazyConnection
+
+
+class _Client(object):
+
+    def __init__(self, index):
+        self.index = index
+        self.healthy = True
+        self.closed = False
+
+    def ping(self):
+        return self.healthy
+
+
+class TestLazyConnection(TestCase):
+
+    def setUp(self):
+        self.clients = list()
+
+        def _factory():
+            self.clients.append(_Client(len(self.clients)))
+            return self.clients[-1]
+
+        def _close(client):
+            client.closed = True
+
+        self.connection = LazyConnection('test', _factory, health_check=(lambda client: client.ping()),
+                                         close=_close, health_check_interval=0)
+
+    def test_deferred(self):
+        """Client is built on first use only, and reused afterwards."""
+        self.assertEqual(self.clients, [])
+        self.assertEqual(self.connection.index, 0)
+        self.assertEqual(self.connection.index, 0)
+        self.assertEqual(len(self.clients), 1)
+
+    def test_forked(self):
+        """A client inherited from another process is rebuilt without being closed."""
+        self.connection.get()
+        self.connection._pid = -1
+        self.assertEqual(self.connection.index, 1)
+        self.assertFalse(self.clients[0].closed)
+
+    def test_health_check(self):
+        """An unhealthy client is closed and rebuilt, and connections depending on it follow."""
+        dependent = LazyConnection('dependent', lambda: ('database', self.connection.get().index),
+                                   depends_on=self.connection, health_check_interval=0)
+        self.assertEqual(dependent.get(), ('database', 0))
+        self.connection._health_check_interval = 1e-9
+        self.clients[0].healthy = False
+        self.assertEqual(dependent.get(), ('database', 1))
+        self.assertTrue(self.clients[0].closed)
+
+
+class TestRedisPool(TestCase):
+
+    def test_blocking_pool(self):
+        """Redis requests beyond max connections wait for a free connection until the pool timeout."""
+        pool = redis_base._create_redis_client().connection_pool
+        self.assertIsInstance(pool, redis.BlockingConnectionPool)
+        self.assertEqual((pool.max_connections, pool.timeout), (redis_max_connections, redis_pool_timeout))
+        while not pool.pool.empty():
+            pool.pool.get_nowait()
+        pool.timeout = 0.05
+        start = time.time()
+        with self.assertRaisesRegexp(redis.ConnectionError, 'No connection available'):
+            pool.get_connection('ping')
+        self.assertGreaterEqual(time.time() - start, 0.05)
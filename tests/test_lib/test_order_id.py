@@ -0,0 +1,99 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import os
+from datetime import datetime, timedelta
+from multiprocessing import Process, Queue, Event
+from unittest import TestCase
+from lib.trade.order import Order
+from lib.trade.order_id import NodeAllocator, OrderIdGenerator
+
+
+class _Clock(object):
+
+    def __init__(self, now):
+        self.current = now
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+
+def _report_node(generator, queue, stop):
+    queue.put((generator.node, generator.next_id()))
+    stop.wait(10)
+
+
+class TestOrderIdGenerator(TestCase):
+
+    def tearDown(self):
+        os.environ.pop('ORDER_ID_NODE', None)
+
+    def test_nodes_across_processes(self):
+        """Forked workers inheriting the same environment claim different nodes, offset by the base."""
+        os.environ['ORDER_ID_NODE'] = '200'
+        generator = OrderIdGenerator()
+        queue, stop = Queue(), Event()
+        workers = [Process(target=_report_node, args=(generator, queue, stop)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        reported = [queue.get(timeout=10) for _ in workers]
+        nodes = [node for node, _ in reported] + [generator.node]
+        stop.set()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(len(set(nodes)), 4)
+        self.assertTrue(all(200 <= node < 200 + 4 for node in nodes))
+        self.assertEqual(len(set(order_id for _, order_id in reported)), 3)
+
+    def test_pid_nodes(self):
+        """Without a node base, nodes are derived from pids and no shared memory is allocated."""
+        generator = OrderIdGenerator()
+        self.assertIsNone(generator._allocator)
+        queue, stop = Queue(), Event()
+        workers = [Process(target=_report_node, args=(generator, queue, stop)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        reported = [queue.get(timeout=10) for _ in workers]
+        stop.set()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(sorted(node for node, _ in reported), sorted(worker.pid % 1000 for worker in workers))
+        self.assertEqual(generator.node, os.getpid() % 1000)
+
+    def test_lazy_order_generator(self):
+        """Orders share one generator, created on first use."""
+        generator = Order.get_id_generator()
+        self.assertIs(Order.get_id_generator(), generator)
+        self.assertEqual(Order('IF1809', 1).order_id[5:8], '%03d' % generator.node)
+
+    def test_released_slot(self):
+        """Slots of dead processes are reused."""
+        allocator = NodeAllocator(size=2)
+        self.assertEqual(allocator.allocate(pid=os.getpid()), 0)
+        worker = Process(target=lambda: None)
+        worker.start()
+        worker.join()
+        self.assertEqual(allocator.allocate(pid=worker.pid), 1)
+        self.assertEqual(allocator.allocate(pid=os.getppid()), 1)
+
+    def test_sequence_overflow(self):
+        """An exhausted second waits for the next one instead of running ahead of the clock."""
+        clock = _Clock(datetime(2018, 6, 26, 10, 0, 0, 500000))
+        generator = OrderIdGenerator(node=7, now=clock.now, sleep=clock.sleep)
+        generator.max_sequence = 3
+        order_ids = [generator.next_id() for _ in range(4)]
+        self.assertEqual(order_ids, ['360000070000', '360000070001', '360000070002', '360010070000'])
+        self.assertEqual(clock.current, datetime(2018, 6, 26, 10, 0, 1))
+
+    def test_id_width_at_end_of_day(self):
+        """Ids keep 12 digits when the last second of day runs out."""
+        clock = _Clock(datetime(2018, 6, 26, 23, 59, 59, 900000))
+        generator = OrderIdGenerator(node=999, now=clock.now, sleep=clock.sleep)
+        generator.max_sequence = 2
+        order_ids = [generator.next_id() for _ in range(3)]
+        self.assertEqual(order_ids, ['863999990000', '863999990001', '000009990000'])
+        self.assertTrue(all(len(order_id) == 12 for order_id in order_ids))
@@ -0,0 +1,44 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import os
+from unittest import TestCase
+from utils.error import TradingException
+from lib.pms.sharding import partition_, ShardedExecutor
+
+
+def _settle(portfolio_ids, failed_id):
+    if failed_id in portfolio_ids:
+        raise ValueError(failed_id)
+    return os.getpid(), portfolio_ids
+
+
+class TestShardedExecutor(TestCase):
+
+    def test_partition(self):
+        """Portfolio ids are partitioned into disjoint and balanced shards."""
+        self.assertEqual(partition_(['d', 'b', 'a', 'c', 'e', 'a'], 2), [['a', 'c', 'e'], ['b', 'd']])
+        self.assertEqual(partition_(['a'], 4), [['a']])
+        self.assertEqual(partition_([], 4), [])
+
+    def test_thread_mode(self):
+        """A failed shard does not stop the others, and its error and portfolios are reported."""
+        portfolio_ids = ['p{}'.format(i) for i in xrange(10)]
+        report = ShardedExecutor(shards=3, mode='thread').run('settle', _settle, portfolio_ids, 'p4')
+        self.assertEqual(len(report.shard_results), 3)
+        self.assertEqual(sorted(report.timings), [0, 1, 2])
+        self.assertEqual(sorted(report.errors), [1])
+        self.assertIn('ValueError', report.errors[1])
+        self.assertEqual(report.failed_portfolio_ids, ['p1', 'p4', 'p7'])
+        settled = [e for shard_result in report.shard_results if shard_result.result
+                   for e in shard_result.result[1]]
+        self.assertEqual(sorted(settled), sorted(set(portfolio_ids) - {'p1', 'p4', 'p7'}))
+        self.assertRaises(TradingException, report.raise_for_errors)
+
+    def test_process_mode(self):
+        """Shards run in their own processes."""
+        report = ShardedExecutor(shards=2, mode='process').run('settle', _settle, ['a', 'b', 'c'], None)
+        report.raise_for_errors()
+        self.assertEqual([e.result[1] for e in report.shard_results], [['a', 'c'], ['b']])
+        self.assertNotIn(os.getpid(), [e.result[0] for e in report.shard_results])
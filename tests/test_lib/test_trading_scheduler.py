@@ -0,0 +1,69 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+from datetime import datetime, timedelta
+from unittest import TestCase
+from lib.trading_schedular import TradingScheduler
+
+
+class _CalendarService(object):
+
+    def __init__(self, trading_days):
+        self.trading_days = trading_days
+        self.previous_trading_day_map = dict(zip(trading_days[1:], trading_days[:-1]))
+
+    def within(self, start, end):
+        return [date for date in self.trading_days if start <= date <= end]
+
+    def within_interval(self, end_date, interval):
+        end_index = self.trading_days.index(end_date)
+        return self.trading_days[max(end_index - interval + 1, 0):end_index + 1]
+
+
+class TestTradingScheduler(TestCase):
+
+    def setUp(self):
+        self.all_trading_days = [datetime(2018, 1, 1) + timedelta(days=i) for i in range(120)]
+        self.scheduler = TradingScheduler(self.all_trading_days[40], self.all_trading_days[100],
+                                          refresh_rate_d=3, refresh_rate_m=5, max_history_window_d=10,
+                                          calendar_service=_CalendarService(self.all_trading_days))
+
+    def test_trading_days(self):
+        """
+        Test trading days windows against date filtering.
+        """
+        start, end = datetime(2018, 2, 3, 12), datetime(2018, 3, 5)
+        trading_days_with_history = self.all_trading_days[30:101]
+        self.assertEqual(self.scheduler.trading_days(), self.all_trading_days[40:101])
+        self.assertEqual(self.scheduler.trading_days(include_max_history=True), trading_days_with_history)
+        self.assertEqual(self.scheduler.trading_days(start, end, include_max_history=True),
+                         [date for date in trading_days_with_history if start <= date <= end])
+        self.assertEqual(self.scheduler.trading_days(end_date=datetime(2018, 2, 10, 12)), self.all_trading_days[40:41])
+        self.assertEqual(self.scheduler.trading_days(start_date=end, end_date=start), [])
+
+    def test_rolling_load_ranges(self):
+        """
+        Test rolling load ranges cover the trigger days.
+        """
+        self.scheduler.prepare_initialize(daily_loading_rate=7)
+        trigger_days = self.scheduler.trigger_days()
+        self.assertEqual(trigger_days, self.all_trading_days[40:101:3])
+        self.assertTrue(self.scheduler.is_trigger_day(self.all_trading_days[43]))
+        self.assertFalse(self.scheduler.is_trigger_day(self.all_trading_days[44]))
+        loaded = []
+        for date in trigger_days:
+            loaded.extend(self.scheduler.rolling_load_ranges_daily(date))
+            self.assertIn(date, loaded)
+        self.assertEqual(loaded, sorted(set(loaded)))
+
+    def test_trigger_minutes(self):
+        """
+        Test trigger minutes follow the minute list.
+        """
+        minutes = ['09:{:02d}'.format(i) for i in range(1, 60)]
+        self.assertTrue(self.scheduler.is_trigger_minute('09:06', minutes))
+        self.assertFalse(self.scheduler.is_trigger_minute('09:07', minutes))
+        minutes.insert(0, '09:00')
+        self.assertTrue(self.scheduler.is_trigger_minute('09:05', minutes))
+        self.assertFalse(self.scheduler.is_trigger_minute('09:06', minutes))
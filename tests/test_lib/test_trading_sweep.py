@@ -0,0 +1,108 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import os
+from unittest import TestCase
+from lib import trading_sweep
+from lib.trading_sweep import sweep, _run_variant
+
+
+STRATEGY_CODE = """
+universe = ['RB1901']
+start = '2018-06-01'
+end = '2018-06-05'
+window = $window
+
+
+def initialize(context):
+    pass
+
+
+def handle_data(context):
+    pass
+"""
+
+
+# variants run by the current process, kept as the singletons built by trading are
+_VARIANTS = list()
+
+
+class _MarketService(object):
+
+    def __init__(self):
+        self.market_data_list = list()
+
+
+class _DataPortal(object):
+
+    def __init__(self):
+        self.market_service = _MarketService()
+
+    def batch_load_data(self, sim_params):
+        return self
+
+
+class _ReportClient(object):
+
+    def __init__(self, report):
+        self.report = report
+
+    def output(self):
+        return self.report
+
+
+class _TradingAgent(object):
+
+    def __init__(self, report):
+        self.report_client = _ReportClient(report)
+
+
+def _trading(strategy_code, config=None, data_portal=None, replay_files=None, exit_on_error=True, **kwargs):
+    """
+    Trading in place of lib.trading, reporting the variants seen by its process.
+    """
+    if config.get('window') < 0:
+        raise ValueError('invalid window')
+    _VARIANTS.append(config['window'])
+    return _TradingAgent({'pid': os.getpid(), 'variants': list(_VARIANTS), 'code': strategy_code,
+                          'data_portal': data_portal is not None, 'replay_files': replay_files,
+                          'exit_on_error': exit_on_error})
+
+
+class TestTradingSweep(TestCase):
+
+    def setUp(self):
+        self.originals = trading_sweep.trading, trading_sweep.DataPortal
+        trading_sweep.trading, trading_sweep.DataPortal = _trading, _DataPortal
+
+    def tearDown(self):
+        trading_sweep.trading, trading_sweep.DataPortal = self.originals
+        del _VARIANTS[:]
+
+    def test_run_variant(self):
+        """A variant substitutes its params into strategy code and config, failures are returned as tracebacks."""
+        index, params, report, error = _run_variant(
+            (3, STRATEGY_CODE, {'capital_base': 1e6}, {'window': 5}, False, 'ctp.json', None))
+        self.assertEqual((index, params, error), (3, {'window': 5}, None))
+        self.assertIn('window = 5', report['code'])
+        self.assertEqual((report['replay_files'], report['exit_on_error']), ('ctp.json', False))
+        index, params, report, error = _run_variant(
+            (4, STRATEGY_CODE, dict(), {'window': -1}, False, 'ctp.json', None))
+        self.assertIsNone(report)
+        self.assertIn('invalid window', error)
+
+    def test_sweep(self):
+        """Every variant runs alone in a fresh worker process, results keep the order of param sets."""
+        param_sets = [{'window': window} for window in [5, 10, -1, 20]]
+        results = sweep(STRATEGY_CODE, param_sets, 'ctp.json', processes=1)
+        self.assertEqual([params for params, _, _ in results], param_sets)
+        reports = [report for _, report, _ in results]
+        self.assertIsNone(reports[2])
+        self.assertIn('invalid window', results[2][2])
+        reports = [reports[index] for index in [0, 1, 3]]
+        self.assertEqual([report['variants'] for report in reports], [[5], [10], [20]])
+        self.assertEqual(len({report['pid'] for report in reports}), 3)
+        self.assertNotIn(os.getpid(), {report['pid'] for report in reports})
+        self.assertTrue(all(report['data_portal'] for report in reports))
+        self.assertIsNone(trading_sweep._SHARED_DATA_PORTAL)
@@ -0,0 +1,152 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import json
+from unittest import TestCase
+from utils.refresh import RefreshedSet
+from lib import web
+from lib.core.enums import SecuritiesType
+from lib.core.schema import SchemaType, OrderSchema, PositionSchema
+from lib.pms import pms_lite
+from lib.pms.pms_lite import PMSLite
+from lib.pms.pms_agent import futures_pms_agent
+from lib.pms.pms_agent.futures_pms_agent import FuturesPMSAgent
+from lib.trade.order import Order, OrderState
+from lib.trade.position import FuturesPosition
+
+
+class _FuturesBroker(object):
+
+    def __init__(self):
+        self.accepted = list()
+
+    def accept_orders(self, orders):
+        self.accepted.append(list(orders))
+
+
+class _PMSBroker(object):
+
+    def __init__(self):
+        self.futures_broker = _FuturesBroker()
+
+
+class _Redis(object):
+    """
+    Schemas by portfolio in place of redis, recording updates and dumps.
+    """
+    def __init__(self, positions=None, orders=None):
+        self.schemas = {SchemaType.position: positions or dict(), SchemaType.order: orders or dict()}
+        self.updates = list()
+        self.dumps = list()
+
+    def query_from_(self, database, schema_type, portfolio_id=None, **kwargs):
+        portfolio_ids = portfolio_id if isinstance(portfolio_id, list) else [portfolio_id]
+        schemas = self.schemas[schema_type]
+        return {key: schemas[key] for key in portfolio_ids if key in schemas}
+
+    def update_(self, database, schema_type, items, date=None, **kwargs):
+        self.updates.append((schema_type, list(items)))
+
+    def dump_to_(self, database, schema_type, items, **kwargs):
+        self.dumps.append((schema_type, items))
+
+
+class TestBatchOrders(TestCase):
+
+    def setUp(self):
+        self.patched = [(futures_pms_agent, 'exchangeable_futures'), (futures_pms_agent, 'query_from_'),
+                        (futures_pms_agent, 'update_'), (pms_lite, 'query_from_'), (pms_lite, 'dump_to_')]
+        self.originals = [getattr(module, name) for module, name in self.patched]
+        self.redis = _Redis(positions={
+            'p1': PositionSchema(portfolio_id='p1', positions={
+                'IF1809': FuturesPosition(symbol='IF1809', long_amount=3)})
+        })
+        futures_pms_agent.exchangeable_futures = RefreshedSet('exchangeable_futures', lambda: ['IF1809'],
+                                                              interval=3600)
+        futures_pms_agent.exchangeable_futures.refresh()
+        futures_pms_agent.query_from_ = pms_lite.query_from_ = self.redis.query_from_
+        futures_pms_agent.update_ = self.redis.update_
+        pms_lite.dump_to_ = self.redis.dump_to_
+        self.agent = FuturesPMSAgent()
+        self.agent.pms_broker = _PMSBroker()
+        self.client = web.server.test_client()
+
+    def tearDown(self):
+        for (module, name), original in zip(self.patched, self.originals):
+            setattr(module, name, original)
+        del self.agent.pms_broker
+
+    def _post(self, path, items):
+        response = self.client.post(path, data=json.dumps({'orders': items}), content_type='application/json')
+        return response.status_code, json.loads(response.data)
+
+    @staticmethod
+    def _request(amount, portfolio_id='p1', **kwargs):
+        request = {'symbol': 'IF1809', 'order_amount': amount, 'portfolio_id': portfolio_id}
+        request.update(kwargs)
+        return request
+
+    def test_accept_orders(self):
+        """accept_orders returns the checked orders in the order of requests, handing the active ones on."""
+        orders = [Order.from_request(self._request(1)), Order.from_request(self._request(0)),
+                  Order.from_request(self._request(-2, offset_flag='close'))]
+        checked = PMSLite().accept_orders(orders, securities_type=SecuritiesType.futures)
+        self.assertEqual([order.order_id for order in checked], [order.order_id for order in orders])
+        self.assertEqual([order.state for order in checked],
+                         [OrderState.ORDER_SUBMITTED, OrderState.REJECTED, OrderState.ORDER_SUBMITTED])
+        self.assertEqual(self.redis.updates, [(SchemaType.order, checked)])
+        self.assertEqual(self.agent.pms_broker.futures_broker.accepted, [[checked[0], checked[2]]])
+
+    def test_batch_orders(self):
+        """Malformed requests are rejected alone, and every order gets its status in the order of requests."""
+        status_code, response = self._post('/orders/batch', [
+            self._request(1), {'symbol': 'IF1809', 'portfolio_id': 'p1'}, self._request(-2, offset_flag='close'),
+            self._request(1.5), self._request(-2, offset_flag='close'), self._request(1, symbol='IC1809')])
+        self.assertEqual(status_code, 200)
+        statuses = response['orders']
+        self.assertEqual([status['state'] for status in statuses],
+                         [OrderState.ORDER_SUBMITTED, OrderState.REJECTED, OrderState.ORDER_SUBMITTED,
+                          OrderState.REJECTED, OrderState.REJECTED, OrderState.REJECTED])
+        self.assertIsNone(statuses[1]['order_id'])
+        self.assertTrue(statuses[1]['state_message'].startswith('invalid order request'))
+        self.assertTrue(all(status['order_id'] for index, status in enumerate(statuses) if index != 1))
+        self.assertEqual(len(self.redis.updates), 1)
+        self.assertEqual(len(self.redis.updates[0][1]), 5)
+        accepted = self.agent.pms_broker.futures_broker.accepted
+        self.assertEqual([order.order_id for order in accepted[0]], [statuses[0]['order_id'], statuses[2]['order_id']])
+
+    def test_batch_limits(self):
+        """Batches must be non-empty lists of at most MAX_BATCH_ORDERS orders."""
+        status_code, _ = self._post('/orders/batch', [self._request(1)] * (web.MAX_BATCH_ORDERS + 1))
+        self.assertEqual(status_code, 400)
+        self.assertEqual(self._post('/orders/batch', [])[0], 400)
+        self.assertEqual(self._post('/orders/batch', {'symbol': 'IF1809'})[0], 400)
+        self.assertEqual(self._post('/orders/cancel/batch', [{'portfolio_id': 'p1'}])[0], 400)
+        self.assertEqual(self.redis.updates, [])
+        status_code, response = self._post('/orders/batch', [self._request(1)] * web.MAX_BATCH_ORDERS)
+        self.assertEqual(status_code, 200)
+        self.assertEqual(len(response['orders']), web.MAX_BATCH_ORDERS)
+
+    def test_batch_cancel_orders(self):
+        """Active orders are cancelled, final and missing ones are reported as they are, dumped once at most."""
+        active, filled = Order.from_request(self._request(1)), Order.from_request(self._request(1))
+        filled.state = OrderState.FILLED
+        self.redis.schemas[SchemaType.order]['p1'] = OrderSchema(
+            portfolio_id='p1', orders={active.order_id: active, filled.order_id: filled})
+        items = [{'portfolio_id': 'p1', 'order_id': active.order_id},
+                 {'portfolio_id': 'p1', 'order_id': filled.order_id},
+                 {'portfolio_id': 'p1', 'order_id': 'missing'},
+                 {'portfolio_id': 'p2', 'order_id': 'missing'},
+                 {'portfolio_id': 'p1', 'order_id': active.order_id}]
+        status_code, response = self._post('/orders/cancel/batch', items)
+        self.assertEqual(status_code, 200)
+        self.assertEqual([(status['order_id'], status['canceled'], status['state']) for status in response['orders']],
+                         [(active.order_id, True, OrderState.CANCELED), (filled.order_id, False, OrderState.FILLED),
+                          ('missing', False, None), ('missing', False, None)])
+        self.assertEqual(len(self.redis.dumps), 1)
+        self.assertIs(self.redis.dumps[0][1]['p1'].orders[active.order_id], active)
+        statuses = PMSLite().cancel_orders(items[:3])
+        self.assertEqual([status['canceled'] for status in statuses], [False, False, False])
+        self.assertEqual(statuses[0]['state'], OrderState.CANCELED)
+        self.assertEqual(len(self.redis.dumps), 1)
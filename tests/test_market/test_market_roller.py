@@ -0,0 +1,131 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from unittest import TestCase
+from lib.market.market_roller import MarketRoller, LazyFrames
+from lib.trading_base import create_context
+
+
+class _MarketData(object):
+
+    asset_type = 'FUTURES'
+    _daily_bar_check_field = 'closePrice'
+
+    def __init__(self, daily_bars):
+        self.daily_bars = daily_bars
+        self.daily_bars_loaded_days = [datetime.strptime(date, '%Y-%m-%d')
+                                       for date in daily_bars['closePrice'].index]
+
+    def adjust(self, raw_data_dict, symbols, time_bars, **kwargs):
+        return raw_data_dict, time_bars
+
+
+class _MarketService(object):
+
+    def __init__(self, market_data_list):
+        self.market_data_list = market_data_list
+
+
+class _Clock(object):
+
+    freq = 'd'
+    current_date = datetime(2018, 1, 6)
+    previous_date = datetime(2018, 1, 5)
+
+
+class _SimParams(object):
+
+    freq = 'd'
+    major_benchmark = 'IF1801'
+
+
+class _Strategy(object):
+
+    def initialize(self, context):
+        pass
+
+
+class _AccountManager(object):
+
+    compatible_account = None
+    registered_accounts = dict()
+    registered_accounts_params = dict()
+
+
+class _DataPortal(object):
+
+    def __init__(self, market_service):
+        self.market_service = market_service
+        self.universe_service = None
+        self.asset_service = None
+        self.calendar_service = None
+
+
+class TestMarketRoller(TestCase):
+
+    def setUp(self):
+        dates = ['2018-01-0{}'.format(i) for i in range(2, 7)]
+        symbols = ['IF1801', 'IH1801', 'IC1801']
+        self.close = pd.DataFrame(np.arange(15, dtype=float).reshape(5, 3), index=dates, columns=symbols)
+        self.open = self.close - 0.5
+        self.market_data = _MarketData({'closePrice': self.close, 'openPrice': self.open})
+        self.market_roller = MarketRoller(symbols, _MarketService([self.market_data]), [], 5, 1)
+
+    def test_daily_history(self):
+        """
+        Test daily history windows against DataFrame selection.
+        """
+        end_date = datetime(2018, 1, 5)
+        history = self.market_roller.daily_history(['IH1801', 'IF1801'], ['closePrice', 'openPrice'],
+                                                   end_date, 3, style='ast', rtype='frame')
+        self.assertIsInstance(history, LazyFrames)
+        expected = self.close.loc['2018-01-03':'2018-01-05', ['IH1801', 'IF1801']]
+        self.assertTrue(history['closePrice'].equals(expected))
+        history = self.market_roller.daily_history(None, ['closePrice'], end_date, 10, style='sat', rtype='array')
+        self.assertEqual(sorted(history), ['IC1801', 'IF1801', 'IH1801'])
+        np.testing.assert_array_equal(history['IC1801']['closePrice'], self.close['IC1801'].values[:4])
+        self.assertEqual(list(history['IC1801']['time']), self.close.index.tolist()[:4])
+
+    def test_daily_history_views(self):
+        """
+        Test all symbols windows are views of the cached arrays, refreshed after reloading.
+        """
+        end_date = datetime(2018, 1, 6)
+        history = self.market_roller.daily_history(None, ['closePrice'], end_date, 2, style='ast', rtype='array')
+        cache = self.market_roller.daily_history_caches['FUTURES']
+        self.assertTrue(np.shares_memory(history['closePrice']['IF1801'], cache.arrays['closePrice']))
+        self.market_data.daily_bars = {'closePrice': self.close * 2, 'openPrice': self.open}
+        self.market_data.daily_bars_loaded_days = self.market_data.daily_bars_loaded_days[1:]
+        history = self.market_roller.daily_history(['IF1801'], ['closePrice'], end_date, 1, style='sat', rtype='array')
+        self.assertEqual(history['IF1801']['closePrice'][-1], self.close.loc['2018-01-06', 'IF1801'] * 2)
+
+    def test_lazy_frames(self):
+        """
+        Test lazy frames build each value once on access.
+        """
+        calls = []
+
+        def _build(key):
+            calls.append(key)
+            return key * 2
+
+        frames = LazyFrames({'a': lambda: _build('a'), 'b': lambda: _build('b')})
+        self.assertEqual(frames['a'], 'aa')
+        self.assertEqual(frames.get('a'), 'aa')
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(sorted(frames.values()), ['aa', 'bb'])
+        self.assertEqual(calls, ['a', 'b'])
+        self.assertEqual(frames.get('c', 1), 1)
+
+    def test_context_history(self):
+        """
+        Test history through the context created by the trading pipeline.
+        """
+        context = create_context(_Clock(), _SimParams(), _Strategy(), _DataPortal(self.market_roller.market_service),
+                                 self.market_roller, _AccountManager())
+        history = context.history('IF1801', 'closePrice', time_range=2, style='ast', rtype='frame')
+        self.assertTrue(history['closePrice'].equals(self.close.loc['2018-01-04':'2018-01-05', ['IF1801']]))
@@ -0,0 +1,65 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+from unittest import TestCase
+from utils.refresh import RefreshedSet
+from lib.core.schema import PositionSchema
+from lib.pms.pms_agent import futures_pms_agent
+from lib.pms.pms_agent.futures_pms_agent import FuturesPMSAgent
+from lib.trade.order import Order, OrderState, OrderStateMessage
+from lib.trade.position import FuturesPosition
+
+
+class TestFuturesOrderCheck(TestCase):
+
+    def setUp(self):
+        self.exchangeable_futures = futures_pms_agent.exchangeable_futures
+        futures_pms_agent.exchangeable_futures = RefreshedSet('exchangeable_futures', lambda: ['IF1809'],
+                                                              interval=3600)
+        futures_pms_agent.exchangeable_futures.refresh()
+        self.agent = FuturesPMSAgent()
+        self.position_info = {
+            'p1': PositionSchema(portfolio_id='p1', positions={
+                'IF1809': FuturesPosition(symbol='IF1809', long_amount=4, short_amount=1)})
+        }
+
+    def tearDown(self):
+        futures_pms_agent.exchangeable_futures = self.exchangeable_futures
+
+    def _close(self, amount, direction=-1, portfolio_id='p1'):
+        return Order('IF1809', amount, portfolio_id=portfolio_id, direction=direction, offset_flag='close')
+
+    def test_batch_reservation(self):
+        """Close orders of one position are accepted until their sizes together exceed it."""
+        orders = self.agent._batch_order_check([self._close(-2), self._close(-2), self._close(-1)],
+                                               position_info=self.position_info)
+        self.assertEqual([order.state for order in orders],
+                         [OrderState.ORDER_SUBMITTED, OrderState.ORDER_SUBMITTED, OrderState.REJECTED])
+        self.assertEqual(orders[2].state_message, OrderStateMessage.NO_ENOUGH_AMOUNT)
+
+    def test_signed_close_amount(self):
+        """A negative close amount reserves its size, so it does not make room for later orders."""
+        orders = self.agent._batch_order_check([self._close(-2), self._close(5)], position_info=self.position_info)
+        self.assertEqual(orders[0].state, OrderState.ORDER_SUBMITTED)
+        self.assertEqual(orders[1].state, OrderState.REJECTED)
+        orders = self.agent._batch_order_check([self._close(-5)], position_info=self.position_info)
+        self.assertEqual(orders[0].state, OrderState.REJECTED)
+
+    def test_reservation_by_position(self):
+        """Reservations are kept apart by portfolio and direction, and rejected orders reserve nothing."""
+        orders = self.agent._batch_order_check(
+            [self._close(-5), self._close(-4), self._close(1, direction=1), self._close(1, portfolio_id='p2'),
+             self._close(-1)], position_info=self.position_info)
+        self.assertEqual([order.state for order in orders],
+                         [OrderState.REJECTED, OrderState.ORDER_SUBMITTED, OrderState.ORDER_SUBMITTED,
+                          OrderState.REJECTED, OrderState.REJECTED])
+
+    def test_exchangeable_not_loaded(self):
+        """Orders checked before exchangeable futures are loaded fail as errors, not as halted symbols."""
+        futures_pms_agent.exchangeable_futures = RefreshedSet('exchangeable_futures', lambda: ['IF1809'],
+                                                              interval=3600)
+        orders = self.agent._batch_order_check([self._close(-2), self._close(-2), self._close(-2)],
+                                               position_info=self.position_info)
+        self.assertEqual([order.state for order in orders], [OrderState.ERROR] * 3)
+        self.assertEqual(orders[0].state_message, OrderStateMessage.FAILED)
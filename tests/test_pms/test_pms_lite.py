@@ -0,0 +1,58 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+from datetime import datetime
+from unittest import TestCase
+from utils.dict import DefaultDict
+from lib.pms.pms_lite import PMSLite
+from lib.trade.trade import MetaTrade
+
+
+class _Clock(object):
+    clearing_date = datetime(2018, 6, 20)
+
+
+class _ReportClient(object):
+
+    def __init__(self):
+        self.trades = list()
+
+    def on_trade(self, trade):
+        self.trades.append(trade)
+
+
+class _AccountTrade(object):
+
+    def __init__(self, account_id, symbol='IF1809'):
+        self.account_id = account_id
+        self.symbol = symbol
+
+
+class TestPMSLite(TestCase):
+
+    def setUp(self):
+        self.pms_lite = PMSLite()
+        self.patched = ['clock', 'accounts', 'trade_info', 'report_clients']
+        self.originals = [getattr(self.pms_lite, name) for name in self.patched]
+        self.pms_lite.clock = _Clock()
+        self.pms_lite.accounts = {'futures_account': None, 'futures_account_2': None}
+        self.pms_lite.trade_info = DefaultDict(DefaultDict(list))
+        self.report_client = _ReportClient()
+        self.pms_lite.report_clients = [self.report_client]
+
+    def tearDown(self):
+        for name, original in zip(self.patched, self.originals):
+            setattr(self.pms_lite, name, original)
+
+    def test_deal_with_trade(self):
+        """Trades are recorded and reported for their own account only, trades of unknown accounts are skipped."""
+        trade = _AccountTrade('futures_account')
+        meta_trade = MetaTrade(symbol='IF1809', portfolio_id='futures_account_2')
+        for item in [trade, meta_trade, _AccountTrade('other_account'), _AccountTrade(None)]:
+            self.pms_lite.deal_with_trade(trade=item)
+        clearing_date = _Clock.clearing_date
+        self.assertEqual(self.pms_lite.trade_info['futures_account'][clearing_date], [trade])
+        self.assertEqual(self.pms_lite.trade_info['futures_account_2'][clearing_date], [meta_trade])
+        self.assertEqual(sorted(self.pms_lite.trade_info), ['futures_account', 'futures_account_2'])
+        self.assertEqual(self.report_client.trades, [trade, meta_trade])
@@ -0,0 +1,261 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import numpy as np
+from collections import namedtuple
+from unittest import TestCase
+from lib.core.schema import PositionSchema
+from lib.trade.cost import Commission, Slippage
+from lib.trade.order import Order
+from lib.trade.position import FuturesPosition
+from lib.trade.trade import Trade
+from lib.pms.broker import futures_broker
+from lib.pms.broker.futures_broker import FuturesBroker
+from lib.pms.broker.vectorized_broker import VectorizedBroker, TargetType
+
+
+_BarData = namedtuple('_BarData', ['security_id', 'bar_minute', 'open_price', 'high_price', 'low_price',
+                                   'close_price', 'total_volume'])
+
+
+def _playback_by_trades(targets, open_prices, close_prices, initial_value, commission,
+                        futures=False, multipliers=None):
+    """
+    Playback order by order as the event driven futures broker settles them: each day trades towards the
+    targets at the open, closing before opening, settles every trade by FuturesPosition.update_by_trade and
+    marks positions to the close.
+    """
+    multipliers = multipliers or [1.] * targets.shape[1]
+    positions = [FuturesPosition(symbol) for symbol in range(targets.shape[1])]
+    portfolio_value, portfolio_values = initial_value, list()
+    for day in range(targets.shape[0]):
+        for symbol, position in enumerate(positions):
+            price, multiplier = open_prices[day, symbol], multipliers[symbol]
+            holding = position.long_amount - position.short_amount
+            amount = targets[day, symbol] - holding
+            direction = 1 if amount > 0 else -1
+            close_amount = min(abs(amount), abs(holding)) if holding * amount < 0 else 0
+            for offset_flag, filled_amount in [('close', close_amount), ('open', abs(amount) - close_amount)]:
+                if not filled_amount:
+                    continue
+                if futures:
+                    cost = commission.calculate_futures_commission(price * multiplier, offset_flag) * filled_amount
+                else:
+                    cost = commission.calculate_stock_commission(price, direction) * filled_amount
+                trade = Trade(None, symbol, direction, offset_flag, filled_amount, price, None, cost, 0.)
+                portfolio_value += position.update_by_trade(trade, multiplier, 0.) - trade.commission
+        for symbol, position in enumerate(positions):
+            _, float_pnl = position.evaluate(close_prices[day, symbol], multipliers[symbol], 0.)
+            portfolio_value += float_pnl
+        portfolio_values.append(portfolio_value)
+    return portfolio_values
+
+
+class _AssetService(object):
+
+    def __init__(self, commission, multipliers, margin_rates):
+        self.commission = commission
+        self.multipliers = multipliers
+        self.margin_rates = margin_rates
+
+    def get_future_trade_params(self, symbol, custom_properties=None):
+        return self.margin_rates[symbol], self.commission, self.multipliers[symbol], 1., None
+
+
+class _MarketQuote(object):
+
+    def __init__(self):
+        self.prices = dict()
+
+    def get_price_info(self, security_type=None, universe=None):
+        return {symbol: {'closePrice': price} for symbol, price in self.prices.iteritems()}
+
+
+class _Redis(object):
+    """
+    One position schema in place of redis.
+    """
+    def __init__(self, position_schema):
+        self.position_schema = position_schema
+
+    def query_from_(self, database, schema_type, portfolio_id=None, **kwargs):
+        return {self.position_schema.portfolio_id: self.position_schema}
+
+    def update_(self, *args, **kwargs):
+        pass
+
+    def dump_to_(self, *args, **kwargs):
+        pass
+
+    def put(self, items, key=None):
+        pass
+
+
+def _playback_by_futures_broker(targets, open_prices, close_prices, initial_value, commission, multipliers,
+                                margin_rates):
+    """
+    Playback through the event driven FuturesBroker: each day closing and opening orders towards the targets
+    are transacted by the open bar of each symbol in turn, and positions are marked to the close.
+    """
+    symbols = ['F{}'.format(symbol) for symbol in range(targets.shape[1])]
+    position_schema = PositionSchema(portfolio_id='p1', date='2018-06-20', cash=initial_value,
+                                     portfolio_value=initial_value)
+    redis, market_quote = _Redis(position_schema), _MarketQuote()
+    futures_broker.asset_service = _AssetService(commission, dict(zip(symbols, multipliers)),
+                                                 dict(zip(symbols, margin_rates)))
+    futures_broker.MarketQuote = lambda: market_quote
+    futures_broker.query_from_, futures_broker.update_, futures_broker.dump_to_ = \
+        redis.query_from_, redis.update_, redis.dump_to_
+    futures_broker.redis_queue = redis
+    broker = FuturesBroker()
+    positions, portfolio_values = np.zeros_like(targets), list()
+    for day in range(targets.shape[0]):
+        market_quote.prices = dict(zip(symbols, open_prices[day]))
+        for index, symbol in enumerate(symbols):
+            position = position_schema.positions.get(symbol)
+            holding = position.long_amount - position.short_amount if position else 0
+            amount = targets[day, index] - holding
+            direction = 1 if amount > 0 else -1
+            close_amount = min(abs(amount), abs(holding)) if holding * amount < 0 else 0
+            orders = [Order(symbol, filled_amount, order_type='market', portfolio_id='p1', offset_flag=offset_flag,
+                            direction=direction)
+                      for offset_flag, filled_amount in [('close', close_amount), ('open', abs(amount) - close_amount)]
+                      if filled_amount]
+            if orders:
+                broker.accept_orders(orders)
+                price = open_prices[day, index]
+                broker.transact_minute(_BarData(symbol, '09:30', price, price, price, price, 1e9))
+        for index, symbol in enumerate(symbols):
+            position = position_schema.positions.get(symbol)
+            if position:
+                _, float_pnl = position.evaluate(close_prices[day, index], multipliers[index], margin_rates[index])
+                position_schema.portfolio_value += float_pnl
+                positions[day, index] = position.long_amount - position.short_amount
+        portfolio_values.append(position_schema.portfolio_value)
+    return positions, portfolio_values
+
+
+class TestVectorizedBroker(TestCase):
+
+    def setUp(self):
+        random_state = np.random.RandomState(0)
+        self.close_prices = 10 * np.cumprod(1 + random_state.normal(0, 0.02, (60, 4)), axis=0)
+        self.open_prices = self.close_prices * (1 + random_state.normal(0, 0.005, (60, 4)))
+        self.targets = random_state.randint(0, 5, (60, 4)) * 100.
+        self.patched = ['asset_service', 'MarketQuote', 'query_from_', 'update_', 'dump_to_', 'redis_queue']
+        self.originals = [getattr(futures_broker, name) for name in self.patched]
+        FuturesBroker().clear()
+
+    def tearDown(self):
+        for name, original in zip(self.patched, self.originals):
+            setattr(futures_broker, name, original)
+        FuturesBroker().clear()
+
+    def test_security_positions(self):
+        """
+        Test target positions of securities against order by order settlement.
+        """
+        commission = Commission(0.001, 0.002)
+        broker = VectorizedBroker(commission=commission, slippage=Slippage(0))
+        result = broker.playback(self.targets, self.open_prices, self.close_prices, 100000.)
+        expected = _playback_by_trades(self.targets, self.open_prices, self.close_prices, 100000., commission)
+        np.testing.assert_allclose(result.portfolio_value, expected)
+        np.testing.assert_array_equal(result.positions, self.targets)
+
+    def test_futures_positions(self):
+        """
+        Test target positions of futures with short positions against order by order settlement.
+        """
+        targets = self.targets / 100 - 2
+        multipliers = [10., 5., 300., 1.]
+        commission = Commission(0.0001, 0.0003)
+        broker = VectorizedBroker(commission=commission, slippage=Slippage(0), futures=True,
+                                  multipliers=multipliers, margin_rates=[0.1] * 4)
+        result = broker.playback(targets, self.open_prices, self.close_prices, 1000000.)
+        expected = _playback_by_trades(targets, self.open_prices, self.close_prices, 1000000., commission,
+                                       futures=True, multipliers=multipliers)
+        np.testing.assert_allclose(result.portfolio_value, expected)
+        np.testing.assert_allclose(result.margins.sum(axis=1),
+                                   (np.abs(targets) * self.close_prices * multipliers * 0.1).sum(axis=1))
+
+    def test_weights(self):
+        """
+        Test target weights are converted by the previous portfolio value.
+        """
+        weights = np.full((60, 4), 0.2)
+        broker = VectorizedBroker(commission=Commission(0, 0), slippage=Slippage(0))
+        result = broker.playback(weights, self.open_prices, self.close_prices, 1000000.,
+                                 target_type=TargetType.weight)
+        self.assertEqual(result.positions[0, 0], np.floor(0.2 * 1000000. / self.open_prices[0, 0] / 100) * 100)
+        expected = _playback_by_trades(result.positions, self.open_prices, self.close_prices, 1000000.,
+                                       Commission(0, 0))
+        np.testing.assert_allclose(result.portfolio_value, expected)
+
+    def test_slippage(self):
+        """
+        Test slippage costs are the only difference from fills at the open.
+        """
+        targets = self.targets / 100 - 2
+        multipliers = [10., 5., 300., 1.]
+        results = [VectorizedBroker(slippage=slippage, futures=True, multipliers=multipliers).playback(
+            targets, self.open_prices, self.close_prices, 1000000.) for slippage in [Slippage(0), Slippage(0.0002)]]
+        self.assertTrue((results[1].slippages > 0).any())
+        np.testing.assert_allclose(results[1].portfolio_value,
+                                   results[0].portfolio_value - np.cumsum(results[1].slippages.sum(axis=1)))
+
+    def test_trade_caps(self):
+        """
+        Test trades are capped by daily volumes and blocked on one price days of limit moves.
+        """
+        targets = np.zeros((8, 2))
+        targets[2:, 0], targets[2:, 1] = 10, 3
+        open_prices, close_prices = self.open_prices[:8, :2].copy(), self.close_prices[:8, :2]
+        open_prices[2, 1] = close_prices[1, 1] * 1.1
+        high_prices, low_prices = open_prices * 1.01, open_prices * 0.99
+        high_prices[2, 1] = low_prices[2, 1] = open_prices[2, 1]
+        volumes = np.full((8, 2), 4.)
+        broker = VectorizedBroker(futures=True)
+        result = broker.playback(targets, open_prices, close_prices, 1000000., volumes=volumes,
+                                 high_prices=high_prices, low_prices=low_prices)
+        np.testing.assert_array_equal(result.positions[:, 0], [0, 0, 4, 8, 10, 10, 10, 10])
+        np.testing.assert_array_equal(result.positions[:, 1], [0, 0, 0, 3, 3, 3, 3, 3])
+        targets[5:, 0] = -2
+        open_prices[5, 0] = close_prices[4, 0] * 0.9
+        high_prices[5, 0] = low_prices[5, 0] = open_prices[5, 0]
+        result = broker.playback(targets, open_prices, close_prices, 1000000., volumes=volumes,
+                                 high_prices=high_prices, low_prices=low_prices)
+        np.testing.assert_array_equal(result.positions[:, 0], [0, 0, 4, 8, 10, 10, 6, 2])
+
+    def test_futures_broker_parity(self):
+        """
+        Test futures playback against the event driven futures broker, with openings rejected beyond the margin.
+        """
+        targets = self.targets / 100 - 2
+        multipliers, margin_rates = [10., 5., 300., 1.], [0.1, 0.2, 0.1, 0.5]
+        commission = Commission(0.0001, 0.0003)
+        broker = VectorizedBroker(commission=commission, slippage=Slippage(0), futures=True,
+                                  multipliers=multipliers, margin_rates=margin_rates)
+        result = broker.playback(targets, self.open_prices, self.close_prices, 1000.)
+        positions, portfolio_values = _playback_by_futures_broker(
+            targets, self.open_prices, self.close_prices, 1000., commission, multipliers, margin_rates)
+        np.testing.assert_array_equal(result.positions, positions)
+        np.testing.assert_allclose(result.portfolio_value, portfolio_values)
+        self.assertTrue((result.positions != targets).any())
+        self.assertTrue((result.cash >= 0).all())
+
+    def test_security_cash_caps(self):
+        """
+        Test buying of securities is cut to the cash in lots, after the sells of the day.
+        """
+        commission = Commission(0.001, 0.002)
+        broker = VectorizedBroker(commission=commission, slippage=Slippage(0))
+        result = broker.playback(self.targets, self.open_prices, self.close_prices, 10000.)
+        self.assertTrue((result.positions < self.targets).any())
+        self.assertTrue((result.cash >= 0).all())
+        self.assertTrue((result.positions % 100 == 0).all())
+        expected = _playback_by_trades(result.positions, self.open_prices, self.close_prices, 10000., commission)
+        np.testing.assert_allclose(result.portfolio_value, expected)
+        uncapped = VectorizedBroker(commission=commission, slippage=Slippage(0), cap_by_cash=False).playback(
+            self.targets, self.open_prices, self.close_prices, 10000.)
+        np.testing.assert_array_equal(uncapped.positions, self.targets)
@@ -0,0 +1,58 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import numpy as np
+from datetime import datetime, timedelta
+from unittest import TestCase
+from lib.report.risk_metrics import *
+from lib.report.perf_accumulator import PerfAccumulator
+
+
+class TestPerfAccumulator(TestCase):
+
+    def setUp(self):
+        random_state = np.random.RandomState(0)
+        self.initial_value = 1000000.
+        self.st_returns = random_state.normal(0.001, 0.02, 250)
+        self.bm_returns = random_state.normal(0.0005, 0.01, 250)
+        self.portfolio_value = (self.initial_value * np.cumprod(1 + self.st_returns)).tolist()
+        self.trading_days = [datetime(2018, 1, 1) + timedelta(days=i) for i in range(250)]
+
+    def test_perf(self):
+        """
+        Test incremental perf against full recomputation.
+        """
+        accumulator = PerfAccumulator(self.initial_value)
+        for date, value, bm_return in zip(self.trading_days, self.portfolio_value, self.bm_returns):
+            accumulator.update(date, value, bm_return)
+        perf = accumulator.perf()
+        st_returns = get_return([self.initial_value] + self.portfolio_value)
+        c_values = get_cumulative_value(st_returns)
+        alpha, beta = get_CAPM(st_returns, self.bm_returns, 0.035)
+        max_drawdown, peak, trough = get_max_drawdown_info(c_values)
+        self.assertAlmostEqual(perf['annualized_return'], get_annualized_return(c_values))
+        self.assertAlmostEqual(perf['volatility'], np.std(st_returns, ddof=1) * 250 ** 0.5)
+        self.assertAlmostEqual(perf['alpha'], alpha)
+        self.assertAlmostEqual(perf['beta'], beta)
+        self.assertAlmostEqual(perf['information_ratio'], get_information_ratio(st_returns, self.bm_returns))
+        self.assertAlmostEqual(perf['max_drawdown'], max_drawdown)
+        self.assertEqual(perf['max_drawdown_period'], (self.trading_days[peak], self.trading_days[trough]))
+
+    def test_intraday_snapshots(self):
+        """
+        Test snapshots of the same date replace each other.
+        """
+        accumulator = PerfAccumulator(self.initial_value)
+        expected = PerfAccumulator(self.initial_value)
+        for date, value, bm_return in zip(self.trading_days[:10], self.portfolio_value, self.bm_returns):
+            for intraday_value in [value * 0.5, value * 1.5, value]:
+                accumulator.update(date, intraday_value, bm_return)
+            expected.update(date, value, bm_return)
+        self.assertEqual(accumulator.count, 10)
+        self.assertEqual(accumulator.returns, expected.returns)
+        self.assertEqual(accumulator.perf(), expected.perf())
+        accumulator.record_trade(1, 2000.)
+        accumulator.record_trade(-1, 1000.)
+        self.assertAlmostEqual(accumulator.perf()['turnover_rate'],
+                               1000. / np.mean(self.portfolio_value[:10]))
@@ -0,0 +1,57 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+from datetime import datetime
+from unittest import TestCase
+from lib.report.report_client import ReportClient
+from lib.trade.trade import Trade
+
+
+class _AssetInfo(object):
+
+    def __init__(self, multiplier=None):
+        self.multiplier = multiplier
+
+
+class _AssetService(object):
+
+    def get_asset_info(self, symbol, date=None):
+        return {'IF1809': _AssetInfo(300)}.get(symbol, _AssetInfo())
+
+
+class _DataPortal(object):
+    asset_service = _AssetService()
+
+
+class _PMSLite(object):
+
+    def __init__(self):
+        self.initial_value_info = {'futures_account': {'portfolio_value': 1000000.}}
+        self.portfolio_value_info = {'futures_account': dict()}
+        self.benchmark_info = {'futures_account': '000300.ZICN'}
+
+
+class TestReportClient(TestCase):
+
+    def setUp(self):
+        self.pms_lite = _PMSLite()
+        self.report_client = ReportClient(None, _DataPortal(), self.pms_lite, None, benchmark_store=object())
+
+    def test_on_trade(self):
+        """Trades of futures are valued with the contract multiplier."""
+        self.report_client.on_trade(Trade('1', 'IF1809', 1, 'open', 2, 3500., None, 0., 0.))
+        self.report_client.on_trade(Trade('2', 'rb1810', -1, 'close', 10, 3800., None, 0., 0.))
+        accumulator = self.report_client.perf_accumulator
+        self.assertEqual(accumulator.buy_value, 2 * 3500. * 300)
+        self.assertEqual(accumulator.sell_value, 10 * 3800.)
+
+    def test_on_snapshot(self):
+        """Snapshots of the latest trading day are ingested once pms lite has any."""
+        self.report_client.on_snapshot(benchmark_return=0.)
+        self.assertIsNone(self.report_client.perf_accumulator)
+        self.pms_lite.portfolio_value_info['futures_account'][datetime(2018, 6, 26)] = 1010000.
+        self.report_client.on_snapshot(benchmark_return=0.01)
+        accumulator = self.report_client.perf_accumulator
+        self.assertEqual(accumulator.count, 1)
+        self.assertEqual(accumulator.date, datetime(2018, 6, 26))
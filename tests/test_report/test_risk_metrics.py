@@ -0,0 +1,88 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import numpy as np
+from unittest import TestCase
+from lib.report.risk_metrics import *
+
+
+class TestRiskMetrics(TestCase):
+
+    def setUp(self):
+        random_state = np.random.RandomState(0)
+        self.st_returns = random_state.normal(0.001, 0.02, 500)
+        self.bm_returns = random_state.normal(0.0005, 0.01, 500)
+
+    def test_max_drawdown(self):
+        """
+        Test running-max drawdown against pairwise comparison.
+        """
+        c_values = get_cumulative_value(self.st_returns)
+        expected = max(1 - v / max(1, max(c_values[:i + 1])) for i, v in enumerate(c_values))
+        max_drawdown, peak, trough = get_max_drawdown_info(c_values)
+        self.assertAlmostEqual(get_max_drawdown(c_values), expected)
+        self.assertAlmostEqual(max_drawdown, expected)
+        self.assertAlmostEqual(1 - c_values[trough] / max(1, c_values[peak]), expected)
+
+    def test_rolling_metrics(self):
+        """
+        Test rolling metrics against full window metrics.
+        """
+        window = 60
+        volatility = get_rolling_volatility(self.st_returns, window)
+        alpha, beta = get_rolling_CAPM(self.st_returns, self.bm_returns, 0.035, window)
+        information_ratio = get_rolling_information_ratio(self.st_returns, self.bm_returns, window)
+        self.assertEqual(len(volatility), len(self.st_returns) - window + 1)
+        for start in [0, 100, 440]:
+            st_returns = self.st_returns[start:start + window]
+            bm_returns = self.bm_returns[start:start + window]
+            expected_alpha, expected_beta = get_CAPM(st_returns, bm_returns, 0.035)
+            self.assertAlmostEqual(volatility[start], np.std(st_returns, ddof=1) * 250 ** 0.5)
+            self.assertAlmostEqual(beta[start], expected_beta)
+            self.assertAlmostEqual(alpha[start], expected_alpha)
+            self.assertAlmostEqual(information_ratio[start], get_information_ratio(st_returns, bm_returns))
+
+    def test_rolling_max_drawdown(self):
+        """
+        Test rolling max drawdown against pairwise comparison within each window.
+        """
+        c_values = get_cumulative_value(self.st_returns)
+        for window in [1, 7, 60, 500]:
+            max_drawdown = get_rolling_max_drawdown(c_values, window)
+            self.assertEqual(len(max_drawdown), len(c_values) - window + 1)
+            for start in range(0, len(max_drawdown), 13):
+                values = c_values[start:start + window]
+                expected = max(1 - v / max(values[:i + 1]) for i, v in enumerate(values))
+                self.assertAlmostEqual(max_drawdown[start], expected)
+        self.assertEqual(len(get_rolling_max_drawdown(c_values[:10], 60)), 0)
+
+    def test_rolling_stability(self):
+        """
+        Test rolling variance of values far from zero against per window deviations.
+        """
+        window = 60
+        values = 1e8 + self.st_returns
+        volatility = get_rolling_volatility(values, window)
+        for start in [0, 7, 100, 440]:
+            expected = np.std(values[start:start + window], ddof=1) * 250 ** 0.5
+            self.assertAlmostEqual(volatility[start] / expected, 1, places=6)
+
+    def test_trade_values(self):
+        """
+        Test trade values against day by day position comparison.
+        """
+        random_state = np.random.RandomState(1)
+        amounts = random_state.randint(0, 3, (20, 5)) * random_state.randint(0, 2, (20, 5)) * 100
+        prices = random_state.uniform(10, 20, (20, 5))
+        buy_value, sell_value = 0, 0
+        for day in range(1, 20):
+            for column in range(5):
+                amount_diff = amounts[day, column] - amounts[day - 1, column]
+                if amount_diff > 0:
+                    buy_value += amount_diff * prices[day, column]
+                elif amount_diff < 0:
+                    sell_value -= amount_diff * prices[day, column]
+        expected_buy_value, expected_sell_value = get_trade_values(amounts, prices)
+        self.assertAlmostEqual(buy_value, expected_buy_value)
+        self.assertAlmostEqual(sell_value, expected_sell_value)
@@ -0,0 +1,35 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+from unittest import TestCase
+from utils.dict import LazyDict
+
+
+class TestLazyDict(TestCase):
+
+    def setUp(self):
+        self.calls = list()
+
+        def _loader():
+            self.calls.append(1)
+            return {'THOST_FTDC_D_Buy': '0', 'THOST_FTDC_D_Sell': '1'}
+
+        self.table = LazyDict(_loader)
+
+    def test_load_on_first_access(self):
+        """Loader runs once, on the first lookup."""
+        self.assertFalse(self.table.loaded)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.table['THOST_FTDC_D_Buy'], '0')
+        self.assertIn('THOST_FTDC_D_Sell', self.table)
+        self.assertEqual(len(self.table), 2)
+        self.assertTrue(self.table.loaded)
+        self.assertEqual(self.calls, [1])
+
+    def test_write_before_load(self):
+        """Writes before the first lookup are kept on top of loaded entries."""
+        self.table['THOST_FTDC_D_Buy'] = 'buy'
+        self.assertEqual(self.table.get('THOST_FTDC_D_Buy'), 'buy')
+        self.assertEqual(sorted(self.table.keys()), ['THOST_FTDC_D_Buy', 'THOST_FTDC_D_Sell'])
+        self.assertRaises(KeyError, lambda: self.table['missing'])
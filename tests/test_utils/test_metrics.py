@@ -0,0 +1,77 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import urllib2
+from unittest import TestCase
+from utils.metrics import CONTENT_TYPE, MetricFamily, MetricsRegistry, render_families, start_metrics_server
+from utils.tracing import Tracer
+
+
+class TestMetrics(TestCase):
+
+    def test_render_families(self):
+        """Families render as Prometheus text with escaped labels."""
+        text = render_families([MetricFamily('queue_depth', 'gauge', 'Queue depth.',
+                                             [('queue_depth', {'queue': 'a"b'}, 3), ('queue_depth', {}, None)])])
+        self.assertEqual(text, '# HELP queue_depth Queue depth.\n'
+                               '# TYPE queue_depth gauge\n'
+                               'queue_depth{queue="a\\"b"} 3.0\n'
+                               'queue_depth NaN\n')
+
+    def test_registry(self):
+        """Registry renders gauges, cache stats, traced latencies and collectors, skipping failed collectors."""
+        tracer = Tracer(enabled=True)
+        tracer.record('futures_broker.transact_minute', 0.002)
+        registry = MetricsRegistry(tracer=tracer)
+        registry.gauge('data_load_seconds', 'Load seconds.').set(1.5, stage='calendar')
+        cache = registry.cache('market_roller.daily')
+        cache.record(True)
+        cache.record(False)
+        cache.add(hits=2)
+
+        @registry.register_collector
+        def _failed():
+            raise ValueError
+
+        registry.register_collector(lambda: [MetricFamily('events_total', 'counter', 'Events.',
+                                                          [('events_total', {'event_type': 'on_bar'}, 7)])])
+        text = registry.render()
+        self.assertIn('data_load_seconds{stage="calendar"} 1.5', text)
+        self.assertIn('metadeal_cache_lookups_total{cache="market_roller.daily",result="hit"} 3.0', text)
+        self.assertIn('metadeal_cache_hit_ratio{cache="market_roller.daily"} 0.75', text)
+        self.assertIn('metadeal_latency_seconds_count{span="futures_broker.transact_minute"} 1.0', text)
+        self.assertIn('metadeal_latency_seconds{quantile="0.5",span="futures_broker.transact_minute"}', text)
+        self.assertIn('events_total{event_type="on_bar"} 7.0', text)
+
+    def test_latencies_across_dumps(self):
+        """Windowed dumps cover their own interval while exported latencies stay cumulative."""
+        tracer = Tracer(enabled=True)
+        registry = MetricsRegistry(tracer=tracer)
+        tracer.record('redis.hmget', 0.002)
+        self.assertEqual(tracer.dump(windowed=True)['redis.hmget']['count'], 1)
+        tracer.record('redis.hmget', 0.004)
+        tracer.record('redis.hmget', 0.004)
+        dumped = tracer.dump(windowed=True)['redis.hmget']
+        self.assertEqual(dumped['count'], 2)
+        self.assertAlmostEqual(dumped['min_us'], 4000, delta=4000 / 16.)
+        self.assertEqual(tracer.dump(windowed=True)['redis.hmget']['count'], 0)
+        text = registry.render()
+        self.assertIn('metadeal_latency_seconds_count{span="redis.hmget"} 3.0', text)
+        self.assertIn('metadeal_latency_seconds_sum{span="redis.hmget"} 0.01', text)
+
+    def test_metrics_server(self):
+        """The exporter serves the registry of its process at /metrics and nothing else."""
+        registry = MetricsRegistry()
+        registry.gauge('event_queue_depth', 'Queue depth.').set(2)
+        server = start_metrics_server(0, host='127.0.0.1', metrics_registry=registry)
+        try:
+            url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+            response = urllib2.urlopen(url + '/metrics')
+            self.assertEqual(response.info()['Content-Type'], CONTENT_TYPE)
+            self.assertIn('event_queue_depth 2.0', response.read())
+            with self.assertRaises(urllib2.HTTPError):
+                urllib2.urlopen(url + '/')
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,86 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+import time
+from threading import Event
+from unittest import TestCase
+from utils.refresh import RefreshedSet
+
+
+class TestRefreshedSet(TestCase):
+
+    def setUp(self):
+        self.loads = [['IF1809', 'IC1809']]
+        self.loading = Event()
+        self.release = Event()
+        self.release.set()
+
+        def _loader():
+            self.loading.set()
+            self.release.wait()
+            items = self.loads[0]
+            if isinstance(items, Exception):
+                raise items
+            return items
+
+        self.symbols = RefreshedSet('symbols', _loader, interval=3600, retry_interval=3600)
+
+    def tearDown(self):
+        self.release.set()
+        self.symbols.stop()
+
+    def test_prepare(self):
+        """Reads never load, prepare loads a frozenset and starts the refresher."""
+        self.assertIsNone(self.symbols.value)
+        self.assertFalse(self.symbols.loaded)
+        self.assertNotIn('IF1809', self.symbols)
+        self.assertEqual(len(self.symbols), 0)
+        self.assertFalse(self.loading.is_set())
+        self.assertTrue(self.symbols.prepare())
+        self.assertEqual(self.symbols.value, frozenset(['IF1809', 'IC1809']))
+        self.assertIn('IF1809', self.symbols)
+        self.assertTrue(self.symbols._refresher.is_alive())
+
+    def test_failed_prepare(self):
+        """A failed first load leaves nothing loaded, and the refresher retries it."""
+        self.loads[0] = ValueError('unavailable')
+        self.symbols.retry_interval = 0.05
+        self.assertFalse(self.symbols.prepare())
+        self.assertIsNone(self.symbols.value)
+        self.loads[0] = ['IF1809']
+        for _ in xrange(100):
+            if self.symbols.loaded:
+                break
+            time.sleep(0.05)
+        self.assertEqual(self.symbols.value, frozenset(['IF1809']))
+
+    def test_stale_while_revalidate(self):
+        """Readers get the last set while a refresh is running, and the new set once swapped."""
+        self.symbols.prepare()
+        old_value = self.symbols.value
+        self.loads[0] = ['IF1810']
+        self.loading.clear()
+        self.release.clear()
+        self.symbols._refreshed_at -= 3600
+        self.symbols.stop()
+        self.symbols.start()
+        self.assertTrue(self.loading.wait(5))
+        start = time.time()
+        self.assertIs(self.symbols.value, old_value)
+        self.assertLess(time.time() - start, 1)
+        self.assertFalse(self.symbols.refresh(blocking=False))
+        self.release.set()
+        for _ in xrange(100):
+            if self.symbols.value != old_value:
+                break
+            time.sleep(0.05)
+        self.assertEqual(self.symbols.value, frozenset(['IF1810']))
+
+    def test_failed_refresh(self):
+        """A failed refresh keeps the last set."""
+        self.symbols.prepare()
+        old_value = self.symbols.value
+        self.loads[0] = ValueError('unavailable')
+        self.assertFalse(self.symbols.refresh())
+        self.assertIs(self.symbols.value, old_value)
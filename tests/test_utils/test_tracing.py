@@ -0,0 +1,68 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File:
+# **********************************************************************************#
+from unittest import TestCase
+from utils.tracing import LatencyHistogram, Tracer
+
+
+class TestLatencyHistogram(TestCase):
+
+    def test_bucket_bounds(self):
+        """Every value falls in a bucket whose bounds contain it within the relative error."""
+        histogram = LatencyHistogram('test')
+        for value in [0, 1, 31, 32, 33, 63, 64, 1000, 123456, 10 ** 9]:
+            index = histogram._index(value)
+            self.assertLessEqual(histogram._lowest_value(index), value)
+            self.assertGreaterEqual(histogram._highest_value(index), value)
+            self.assertLessEqual(histogram._highest_value(index) - histogram._lowest_value(index),
+                                 max(value / 16, 1))
+
+    def test_percentile(self):
+        """Percentiles are within the bucket error of the exact ones."""
+        histogram = LatencyHistogram('test')
+        for value in range(1, 1001):
+            histogram.record(value / 1e6)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['count'], 1000)
+        self.assertEqual(snapshot['min_us'], 1)
+        self.assertEqual(snapshot['max_us'], 1000)
+        self.assertAlmostEqual(snapshot['p50_us'], 500, delta=500 / 16.)
+        self.assertAlmostEqual(snapshot['p99_us'], 990, delta=990 / 16.)
+        histogram.reset()
+        self.assertIsNone(histogram.percentile(50))
+
+
+class TestTracer(TestCase):
+
+    def test_disabled(self):
+        """A disabled tracer records nothing."""
+        tracer = Tracer()
+
+        @tracer.traced('func')
+        def _func(value):
+            return value
+
+        self.assertEqual(_func(1), 1)
+        with tracer.span('span'):
+            pass
+        self.assertEqual(tracer.snapshot(), {})
+
+    def test_enabled(self):
+        """Spans and traced calls record into their histograms, also when raising."""
+        tracer = Tracer(enabled=True)
+
+        @tracer.traced('func')
+        def _func(value):
+            if value is None:
+                raise ValueError
+            return value
+
+        self.assertEqual(_func(1), 1)
+        self.assertRaises(ValueError, _func, None)
+        with tracer.span('span'):
+            pass
+        snapshot = tracer.snapshot(reset=True)
+        self.assertEqual(snapshot['func']['count'], 2)
+        self.assertEqual(snapshot['span']['count'], 1)
+        self.assertEqual(tracer.snapshot()['func']['count'], 0)
@@ -3,6 +3,7 @@
 #     File: Custom dict structures for doing interesting things.
 # **********************************************************************************#
 from copy import deepcopy
+from threading import Lock
 
 
 class AttributeDict(dict):
@@ -56,6 +57,56 @@ class DefaultDict(dict):
         return self.__getitem__(key)
 
 
+class LazyDict(dict):
+
+    """
+    A dict filled by a loader on first access, so that a large generated table is only built when used.
+    Dict methods load it first; C-level copies such as dict(obj) read the unloaded storage, call load() before.
+    """
+    def __init__(self, loader):
+        """
+        Args:
+            loader(func): function without arguments returning the dict content.
+        """
+        super(LazyDict, self).__init__()
+        self._loader = loader
+        self._lock = Lock()
+
+    @property
+    def loaded(self):
+        return self._loader is None
+
+    def load(self):
+        """
+        Fill the dict by loader if not loaded yet.
+        """
+        if self._loader is not None:
+            with self._lock:
+                if self._loader is not None:
+                    dict.update(self, self._loader())
+                    self._loader = None
+        return self
+
+
+def _loading_method(name):
+    method = getattr(dict, name)
+
+    def _method(self, *args, **kwargs):
+        if self._loader is not None:
+            self.load()
+        return method(self, *args, **kwargs)
+
+    _method.__name__ = name
+    return _method
+
+
+for _name in ['__getitem__', '__setitem__', '__delitem__', '__contains__', '__iter__', '__len__', '__eq__',
+              '__ne__', '__repr__', 'get', 'has_key', 'keys', 'values', 'items', 'iterkeys', 'itervalues',
+              'iteritems', 'copy', 'pop', 'popitem', 'setdefault', 'update', 'clear']:
+    if hasattr(dict, _name):
+        setattr(LazyDict, _name, _loading_method(_name))
+
+
 def dict_map(func, obj):
     """
     Traversal map functions to a dict
@@ -74,5 +125,6 @@ __all__ = [
     'DefaultDict',
     'CompositeDict',
     'AttributeDict',
+    'LazyDict',
     'dict_map'
 ]
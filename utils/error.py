@@ -163,6 +163,8 @@ class Errors(object):
     INVALID_ORDER_OBJECT = TradingException(error(500, '[TradingException] INVALID order object.'))
     SWITCH_POSITION_FAILED = TradingException(error(500, '[TradingException] Switch position failed.'))
     INVALID_HISTORY_END_MINUTE = TradingException(error(500, '[TradingException]'))
+    INVALID_ORDER_ID_NODE = TradingException(error(500, '[TradingException] INVALID order id node.'))
+    ORDER_ID_NODES_EXHAUSTED = TradingException(error(500, '[TradingException] No free order id node.'))
 
     INVALID_ACCOUNT_TYPE = AccountException(error(500, '[AccountException] INVALID account type.'))
     INVALID_ACCOUNT_NAME = AccountException(error(500, '[AccountException] INVALID account name.'))
@@ -0,0 +1,248 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Operational metrics rendered in Prometheus text format.
+# **********************************************************************************#
+import logging
+import traceback
+from threading import Lock, Thread
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from collections import namedtuple
+from . tracing import tracer as default_tracer, SNAPSHOT_PERCENTILES
+
+
+METRIC_PREFIX = 'metadeal_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+MetricFamily = namedtuple('MetricFamily', ['name', 'metric_type', 'documentation', 'samples'])
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{{{}}}'.format(','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for key, value in sorted(labels.items())))
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def render_families(families):
+    """
+    Render metric families in Prometheus text exposition format.
+
+    Args:
+        families(list of MetricFamily): metric families
+
+    Returns:
+        string: exposition text
+    """
+    lines = list()
+    for family in families:
+        lines.append('# HELP {} {}'.format(family.name, family.documentation))
+        lines.append('# TYPE {} {}'.format(family.name, family.metric_type))
+        for name, labels, value in family.samples:
+            lines.append('{}{} {}'.format(name, _format_labels(labels), _format_value(value)))
+    return '\n'.join(lines) + '\n'
+
+
+class Gauge(object):
+    """
+    Gauge of labelled values set from outside.
+    """
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = dict()
+
+    def set(self, value, **labels):
+        self._values[tuple(sorted(labels.items()))] = value
+
+    def collect(self):
+        samples = [(self.name, dict(labels), value) for labels, value in sorted(self._values.items())]
+        return [MetricFamily(self.name, 'gauge', self.documentation, samples)]
+
+
+class CacheStats(object):
+    """
+    Hit and miss counters of one cache.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, hits=0, misses=0):
+        self.hits += hits
+        self.misses += misses
+
+    def record(self, hit):
+        """
+        Record one lookup.
+
+        Args:
+            hit(boolean): whether the lookup hit
+        """
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return hit
+
+    @property
+    def ratio(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else None
+
+
+class MetricsRegistry(object):
+    """
+    Metrics registry: gauges, cache stats and collector functions returning lists of MetricFamily.
+    """
+    def __init__(self, tracer=None, log=None):
+        """
+        Args:
+            tracer(Tracer): tracer whose latency histograms are exported as summaries
+            log(logger): logger of failed collectors, default the main logger
+        """
+        self.tracer = tracer
+        self.log = log or logging.getLogger('main')
+        self.gauges = dict()
+        self.caches = dict()
+        self.collectors = list()
+        self._lock = Lock()
+
+    def gauge(self, name, documentation):
+        """
+        Gauge of name, created if not exists.
+        """
+        with self._lock:
+            if name not in self.gauges:
+                self.gauges[name] = Gauge(name, documentation)
+            return self.gauges[name]
+
+    def cache(self, name):
+        """
+        Cache stats of name, created if not exists.
+        """
+        with self._lock:
+            if name not in self.caches:
+                self.caches[name] = CacheStats(name)
+            return self.caches[name]
+
+    def register_collector(self, collector):
+        """
+        Register collector.
+
+        Args:
+            collector(func): function without arguments returning list of MetricFamily
+        """
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+        return collector
+
+    def _collect_caches(self):
+        caches = sorted(self.caches.items())
+        lookups = [(METRIC_PREFIX + 'cache_lookups_total', {'cache': name, 'result': result}, count)
+                   for name, cache in caches for result, count in (('hit', cache.hits), ('miss', cache.misses))]
+        ratios = [(METRIC_PREFIX + 'cache_hit_ratio', {'cache': name}, cache.ratio) for name, cache in caches]
+        return [MetricFamily(METRIC_PREFIX + 'cache_lookups_total', 'counter', 'Cache lookups by result.', lookups),
+                MetricFamily(METRIC_PREFIX + 'cache_hit_ratio', 'gauge', 'Cache hit ratio.', ratios)]
+
+    def _collect_latencies(self):
+        name = METRIC_PREFIX + 'latency_seconds'
+        samples = list()
+        # summaries are cumulative: the tracing dumper logs windows against baselines, never resetting histograms
+        for span, summary in sorted(self.tracer.snapshot().items()):
+            for percentile in SNAPSHOT_PERCENTILES:
+                value = summary['p{}_us'.format(percentile).replace('.', '')]
+                samples.append((name, {'span': span, 'quantile': percentile / 100.},
+                                value / 1e6 if value is not None else None))
+            samples.append((name + '_sum', {'span': span}, summary['count'] * (summary['mean_us'] or 0) / 1e6))
+            samples.append((name + '_count', {'span': span}, summary['count']))
+        return [MetricFamily(name, 'summary', 'Traced latencies, recorded when tracing is enabled.', samples)]
+
+    def collect(self):
+        """
+        Collect all metric families, skipping failed collectors.
+
+        Returns:
+            list: MetricFamily
+        """
+        families = [family for _, gauge in sorted(self.gauges.items()) for family in gauge.collect()]
+        families += self._collect_caches()
+        if self.tracer is not None:
+            families += self._collect_latencies()
+        for collector in self.collectors:
+            try:
+                families += collector()
+            except Exception:
+                self.log.warn('[METRICS] collector {} failed: {}'.format(
+                    getattr(collector, '__name__', collector), traceback.format_exc()))
+        return families
+
+    def render(self):
+        """
+        Prometheus text of all metrics.
+        """
+        return render_families(self.collect())
+
+
+registry = MetricsRegistry(tracer=default_tracer)
+
+
+def start_metrics_server(port, host='', metrics_registry=None):
+    """
+    Serve the registry of this process over http on a daemon thread, for processes without a web server,
+    e.g. the trading process whose event engine, market roller and data portal collectors are registered
+    in its own memory only.
+
+    Args:
+        port(int): port to listen, 0 for any free port
+        host(string): host to bind, default all interfaces
+        metrics_registry(MetricsRegistry): registry to serve, default the process registry
+
+    Returns:
+        HTTPServer: running server, server_address tells the bound port and shutdown stops it
+    """
+    metrics_registry = metrics_registry or registry
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics_registry.render()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer((host, port), _MetricsHandler)
+    thread = Thread(target=server.serve_forever, name='metrics_server')
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+__all__ = [
+    'METRIC_PREFIX',
+    'CONTENT_TYPE',
+    'MetricFamily',
+    'render_families',
+    'Gauge',
+    'CacheStats',
+    'MetricsRegistry',
+    'registry',
+    'start_metrics_server'
+]
@@ -0,0 +1,169 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Immutable sets refreshed in background.
+# **********************************************************************************#
+import os
+import time
+import logging
+import traceback
+from threading import Thread, Lock, Event
+
+
+DEFAULT_RETRY_INTERVAL = 60
+
+
+class RefreshedSet(object):
+    """
+    Frozenset loaded by loader and refreshed by a daemon thread every interval seconds. Readers get the current
+    set without ever waiting or loading: a refresh builds a new frozenset and swaps it in by one assignment, a
+    stale set keeps being served while its refresh runs, and a failed refresh keeps the last set and is retried
+    later. Each process loads and starts its refresher at startup, see prepare; until a load succeeds, value is
+    None and readers decide how to handle a set not loaded yet.
+    """
+    def __init__(self, name, loader, interval, retry_interval=DEFAULT_RETRY_INTERVAL, log=None):
+        """
+        Args:
+            name(string): set name
+            loader(func): function without arguments returning an iterable of items
+            interval(float): seconds between refreshes
+            retry_interval(float): seconds before retrying a failed refresh
+            log(logger): logger of failed refreshes, default the main logger
+        """
+        self.name = name
+        self.loader = loader
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.log = log or logging.getLogger('main')
+        self._value = None
+        self._refreshed_at = None
+        self._failed_at = None
+        self._pid = None
+        self._lock = None
+        self._start_lock = None
+        self._stopped = None
+        self._refresher = None
+
+    def _ensure_process(self):
+        # threads and held locks do not survive fork, a forked process starts its own refresher
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._lock = Lock()
+        self._start_lock = Lock()
+        self._stopped = Event()
+        self._refresher = None
+
+    @property
+    def value(self):
+        """
+        Current frozenset, None if nothing is loaded yet.
+        """
+        return self._value
+
+    @property
+    def loaded(self):
+        """
+        Whether a set is loaded.
+        """
+        return self._value is not None
+
+    @property
+    def age(self):
+        """
+        Seconds since last successful refresh, None if never loaded.
+        """
+        return time.time() - self._refreshed_at if self._refreshed_at is not None else None
+
+    def _swap(self):
+        try:
+            value = frozenset(self.loader())
+        except Exception:
+            self._failed_at = time.time()
+            self.log.warn('[REFRESH] {} refresh failed, serving the last set: {}'.format(
+                self.name, traceback.format_exc()))
+            return False
+        self._value = value
+        self._refreshed_at = time.time()
+        self._failed_at = None
+        return True
+
+    def refresh(self, blocking=True):
+        """
+        Load and swap in a new set, keeping the current one if loading fails.
+
+        Args:
+            blocking(boolean): whether to wait for a refresh already running, else skip
+
+        Returns:
+            boolean: whether a new set is swapped in
+        """
+        self._ensure_process()
+        if not self._lock.acquire(blocking):
+            return False
+        try:
+            return self._swap()
+        finally:
+            self._lock.release()
+
+    def _next_wait(self):
+        if self._failed_at is not None:
+            return self.retry_interval
+        if self._refreshed_at is None:
+            return 0
+        return max(self.interval - self.age, 0)
+
+    def prepare(self):
+        """
+        Load once and start the daemon refresher of current process, called at process startup, e.g. in every
+        worker after fork. A failed load is logged and retried by the refresher.
+
+        Returns:
+            boolean: whether a set is loaded
+        """
+        self.refresh()
+        self.start()
+        return self.loaded
+
+    def start(self):
+        """
+        Start the daemon refresher of current process.
+        """
+        self._ensure_process()
+
+        def _run():
+            while not self._stopped.wait(self._next_wait()):
+                self.refresh(blocking=False)
+
+        with self._start_lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._stopped.clear()
+            self._refresher = Thread(target=_run, name='refresh-{}'.format(self.name))
+            self._refresher.daemon = True
+            self._refresher.start()
+
+    def stop(self):
+        if self._refresher is None:
+            return
+        self._stopped.set()
+        self._refresher.join()
+        self._refresher = None
+
+    def __contains__(self, item):
+        return self._value is not None and item in self._value
+
+    def __iter__(self):
+        return iter(self._value or ())
+
+    def __len__(self):
+        return len(self._value or ())
+
+    def __repr__(self):
+        return 'RefreshedSet({}, items={}, age={})'.format(
+            self.name, len(self._value) if self._value is not None else None, self.age)
+
+
+__all__ = [
+    'DEFAULT_RETRY_INTERVAL',
+    'RefreshedSet'
+]
@@ -0,0 +1,388 @@
+# -*- coding: UTF-8 -*-
+# **********************************************************************************#
+#     File: Latency tracing: HDR-style histograms, spans and periodic dumps.
+# **********************************************************************************#
+import logging
+from functools import wraps
+from timeit import default_timer
+from threading import Thread, Lock, Event
+
+
+DEFAULT_SIGNIFICANT_BITS = 5
+DEFAULT_MAX_SHIFT = 40
+DEFAULT_DUMP_INTERVAL = 60
+SNAPSHOT_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram(object):
+    """
+    HDR-style latency histogram of microseconds: values below 2 ** significant_bits have exact buckets, larger
+    values are bucketed by power of two, each power split into 2 ** (significant_bits - 1) linear sub buckets,
+    so the relative error is bounded by 2 ** (1 - significant_bits) with fixed memory.
+    """
+    def __init__(self, name, significant_bits=DEFAULT_SIGNIFICANT_BITS, max_shift=DEFAULT_MAX_SHIFT):
+        """
+        Args:
+            name(string): histogram name
+            significant_bits(int): significant bits of bucketed values
+            max_shift(int): maximum power of two above the exact buckets, larger values are clamped
+        """
+        self.name = name
+        self.significant_bits = significant_bits
+        self.max_shift = max_shift
+        self._sub_count = 1 << significant_bits
+        self._half_count = self._sub_count >> 1
+        self._max_index = (max_shift + 2) * self._half_count - 1
+        self._lock = Lock()
+        self.counts = [0] * (self._max_index + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        """
+        Bucket index of value.
+        """
+        if value < self._sub_count:
+            return value
+        shift = value.bit_length() - self.significant_bits
+        return min(shift * self._half_count + (value >> shift), self._max_index)
+
+    def _lowest_value(self, index):
+        """
+        Lowest value of bucket index.
+        """
+        if index < self._sub_count:
+            return index
+        shift = index // self._half_count - 1
+        return (index - shift * self._half_count) << shift
+
+    def _highest_value(self, index):
+        """
+        Highest value of bucket index.
+        """
+        if index < self._sub_count:
+            return index
+        shift = index // self._half_count - 1
+        return ((index - shift * self._half_count + 1) << shift) - 1
+
+    def record(self, seconds):
+        """
+        Record one latency.
+
+        Args:
+            seconds(float): latency in seconds
+        """
+        value = max(int(seconds * 1e6), 0)
+        index = self._index(value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+
+    def percentile(self, percentile):
+        """
+        Latency of percentile in microseconds, the highest value of the bucket holding it.
+
+        Args:
+            percentile(float): percentile in [0, 100]
+        """
+        if not self.count:
+            return None
+        target = max(1, int(round(self.count * percentile / 100.)))
+        accumulated = 0
+        for index, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= target:
+                return min(self._highest_value(index), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return float(self.total) / self.count if self.count else None
+
+    def snapshot(self):
+        """
+        Summary in microseconds.
+
+        Returns:
+            dict: count, mean, min, max and percentiles
+        """
+        with self._lock:
+            summary = {
+                'count': self.count,
+                'mean_us': self.mean,
+                'min_us': self.min,
+                'max_us': self.max,
+            }
+            for percentile in SNAPSHOT_PERCENTILES:
+                summary['p{}_us'.format(percentile).replace('.', '')] = self.percentile(percentile)
+        return summary
+
+    def copy(self):
+        """
+        Copy of the recorded latencies, a baseline for since.
+        """
+        histogram = LatencyHistogram(self.name, self.significant_bits, self.max_shift)
+        with self._lock:
+            histogram.counts = list(self.counts)
+            histogram.count, histogram.total, histogram.min, histogram.max = \
+                self.count, self.total, self.min, self.max
+        return histogram
+
+    def since(self, previous):
+        """
+        Histogram of the latencies recorded after previous, an earlier copy of this histogram. Its min and max
+        are bounded by its lowest and highest buckets. If this histogram was reset after previous, all its
+        latencies are taken.
+
+        Args:
+            previous(LatencyHistogram): earlier copy
+        """
+        histogram = self.copy()
+        if previous is None or previous.count > histogram.count:
+            return histogram
+        histogram.counts = [count - previous_count for count, previous_count in zip(histogram.counts, previous.counts)]
+        histogram.count -= previous.count
+        histogram.total -= previous.total
+        indices = [index for index, count in enumerate(histogram.counts) if count]
+        if indices:
+            histogram.min = max(histogram._lowest_value(indices[0]), histogram.min)
+            histogram.max = min(histogram._highest_value(indices[-1]), histogram.max)
+        else:
+            histogram.min = histogram.max = None
+        return histogram
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (self._max_index + 1)
+            self.count = 0
+            self.total = 0
+            self.min = None
+            self.max = None
+
+
+class _Span(object):
+    """
+    Timed span recording its latency on exit.
+    """
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = default_timer()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, default_timer() - self.start)
+        return False
+
+
+class _NullSpan(object):
+    """
+    Span of a disabled tracer, doing nothing.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer(object):
+    """
+    Tracer: latency histograms by name. A disabled tracer costs one attribute check per traced call.
+    """
+    def __init__(self, enabled=False, log=None):
+        """
+        Args:
+            enabled(boolean): whether to record latencies
+            log(logger): logger of dumps, default the main logger
+        """
+        self.enabled = enabled
+        self.log = log or logging.getLogger('main')
+        self.histograms = dict()
+        self._lock = Lock()
+        self._baselines = dict()
+        self._dumper = None
+        self._dumper_stopped = Event()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def histogram(self, name):
+        """
+        Histogram of name, created if not exists.
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram(name))
+        return histogram
+
+    def record(self, name, seconds):
+        """
+        Record one latency of name.
+
+        Args:
+            name(string): histogram name
+            seconds(float): latency in seconds
+        """
+        if self.enabled:
+            self.histogram(name).record(seconds)
+
+    def span(self, name):
+        """
+        Context manager timing its body into histogram name.
+
+        Examples:
+            >> with tracer.span('redis.hmget'):
+            >>     redis_client.hmget(collection, *keys)
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def traced(self, name=None):
+        """
+        Decorator timing each call into histogram name, default module.function.
+
+        Args:
+            name(string): histogram name
+        """
+        def decorator(func):
+            histogram_name = name or '{}.{}'.format(func.__module__.rsplit('.', 1)[-1], func.__name__)
+
+            @wraps(func)
+            def _traced(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = default_timer()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.histogram(histogram_name).record(default_timer() - start)
+            return _traced
+        return decorator
+
+    def snapshot(self, reset=False):
+        """
+        Summaries of all histograms.
+
+        Args:
+            reset(boolean): whether to reset histograms after snapshot
+
+        Returns:
+            dict: name --> summary
+        """
+        summaries = dict()
+        for name, histogram in self.histograms.items():
+            summaries[name] = histogram.snapshot()
+            if reset:
+                histogram.reset()
+        return summaries
+
+    def interval_snapshot(self):
+        """
+        Summaries of the latencies recorded since the previous interval snapshot. Histograms are left
+        cumulative, for readers such as the metrics endpoint.
+
+        Returns:
+            dict: name --> summary
+        """
+        summaries = dict()
+        for name, histogram in list(self.histograms.items()):
+            current = histogram.copy()
+            summaries[name] = current.since(self._baselines.get(name)).snapshot()
+            self._baselines[name] = current
+        return summaries
+
+    def dump(self, windowed=False):
+        """
+        Log summaries of all recorded histograms.
+
+        Args:
+            windowed(boolean): whether to cover the latencies since the previous windowed dump only
+
+        Returns:
+            dict: name --> summary
+        """
+        summaries = self.interval_snapshot() if windowed else self.snapshot()
+        for name in sorted(summaries):
+            summary = summaries[name]
+            if not summary['count']:
+                continue
+            self.log.info('[TRACING] {} count: {} mean: {:.1f}us p50: {}us p90: {}us p99: {}us p999: {}us '
+                          'max: {}us'.format(name, summary['count'], summary['mean_us'], summary['p50_us'],
+                                             summary['p90_us'], summary['p99_us'], summary['p999_us'],
+                                             summary['max_us']))
+        return summaries
+
+    def start_dumper(self, interval=DEFAULT_DUMP_INTERVAL, windowed=True):
+        """
+        Dump histograms every interval seconds in a daemon thread, without resetting them.
+
+        Args:
+            interval(float): dump interval in seconds
+            windowed(boolean): whether each dump covers its own interval only
+        """
+        if self._dumper is not None and self._dumper.is_alive():
+            return
+
+        def _run():
+            while not self._dumper_stopped.wait(interval):
+                self.dump(windowed=windowed)
+
+        self._dumper_stopped.clear()
+        self._dumper = Thread(target=_run, name='tracing-dumper')
+        self._dumper.daemon = True
+        self._dumper.start()
+
+    def stop_dumper(self):
+        if self._dumper is None:
+            return
+        self._dumper_stopped.set()
+        self._dumper.join()
+        self._dumper = None
+
+
+tracer = Tracer()
+traced = tracer.traced
+span = tracer.span
+
+
+def enable_tracing(dump_interval=DEFAULT_DUMP_INTERVAL):
+    """
+    Enable the global tracer, dumping histograms every dump_interval seconds if positive.
+    """
+    tracer.enable()
+    if dump_interval and dump_interval > 0:
+        tracer.start_dumper(interval=dump_interval)
+    return tracer
+
+
+__all__ = [
+    'LatencyHistogram',
+    'Tracer',
+    'tracer',
+    'traced',
+    'span',
+    'enable_tracing'
+]